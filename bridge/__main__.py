@@ -34,12 +34,16 @@ def main() -> None:
     def shim_factory(upstream_base: str):
         return build_openwebui_shim(upstream_base, extra_routes=routes)
 
+    def inprocess_shim_factory():
+        return build_openwebui_shim(mcp_app=MCP_SERVER.sse_app(), extra_routes=routes)
+
     run(
         args,
         logger=logger,
         start_sse=_start_sse,
         run_stdio=_run_stdio,
         shim_factory=shim_factory,
+        inprocess_shim_factory=inprocess_shim_factory,
     )
 
 
@@ -21,6 +21,9 @@ from starlette.routing import Mount, Route
 
 from .api import make_routes, register_tools
 from .api.envelopes import envelope_ok
+from .backends.invoices_index import INDEX_CACHE
+from .backends.invoices_render_jobs import RENDER_FLIGHTS, get_render_queue
+from .backends.invoices_tool_limits import get_tool_limits
 from .utils.logging import configure_root
 from .web import register_routes
 
@@ -336,6 +339,10 @@ def build_api_app() -> Starlette:
                 "active_sse": _BRIDGE_STATE.active_sse_id,
                 "connects": _BRIDGE_STATE.connects,
                 "last_init_ts": _BRIDGE_STATE.last_init_ts,
+                "index_cache": INDEX_CACHE.stats(),
+                "render_queue": get_render_queue().stats(),
+                "render_coalescing": RENDER_FLIGHTS.stats(),
+                "tool_concurrency": get_tool_limits().stats(),
             }
         return JSONResponse(envelope_ok(payload))
 
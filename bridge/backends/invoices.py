@@ -1,9 +1,16 @@
 """MCP backend for invoice creation and LaTeX rendering."""
 from __future__ import annotations
 
+import base64
+import binascii
+import hashlib
 import json
 import logging
+import multiprocessing
+import re
 import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import date
 from pathlib import Path
 from typing import Any, Dict, Literal
@@ -13,7 +20,14 @@ from mcp.server.fastmcp.exceptions import ToolError
 from pydantic import ValidationError
 
 from ..utils.config import ENABLE_WRITES, get_pdflatex_path
-from ..utils.logging import record_write_attempt
+from ..utils.logging import enforce_batch_limit, record_write_attempt
+from .invoices_index import (  # noqa: F401 - re-exported for existing callers
+    SortKey,
+    _filter_index_entries,
+    _sort_index_entries,
+    coerce_total,
+    is_valid_sort_key,
+)
 from .invoices_models import (
     Invoice,
     LineItem,
@@ -21,19 +35,35 @@ from .invoices_models import (
     PaymentStatus,
     _DATE_STYLE_DEFAULTS,
 )
-from .invoices_storage import (
-    build_index,
-    ensure_structure,
-    get_invoice_root,
-    next_invoice_number,
-    save_index,
-    save_invoice,
-    with_index_lock,
-    load_invoice,
+from .invoices_latex_format import LatexFormat, ensure_format, static_preamble
+from .invoices_preview import render_preview_html
+from .invoices_rebuild import resolve_workers
+from .invoices_render_cache import (
+    cached_pdf,
+    invalidate_render,
+    pdflatex_version,
+    record_render,
+    render_cache_key,
+)
+from .invoices_render_jobs import RENDER_FLIGHTS, RenderQueueFull, get_render_queue
+from .invoices_render_scratch import (
+    keep_render_sources,
+    persist_aux,
+    persist_file,
+    persist_sources,
+    render_scratch_root,
+    restore_aux,
+    scratch_build_dir,
 )
+from .invoices_storage import ensure_structure, get_invoice_root
+from .invoices_tool_limits import get_tool_limits
+from .invoices_template import TEMPLATE_CACHE, ParsedTemplate
+from .invoices_store import get_store
 
 _LOGGER = logging.getLogger("bridge.backends.invoices")
 _TEMPLATE_PATH = Path(__file__).resolve().parents[2] / "templates" / "invoice.tex"
+# Merged multi-invoice PDFs live under .mad_invoice/merged/<selection-hash>/.
+MERGED_DIRNAME = "merged"
 
 # Discover pdflatex once at module load
 _PDFLATEX_PATH = get_pdflatex_path()
@@ -53,15 +83,6 @@ def _require_writes_enabled() -> None:
         )
 
 
-def _load_index_payload() -> dict[str, object]:
-    index_path = get_invoice_root() / "index.json"
-    try:
-        with index_path.open("r", encoding="utf-8") as handle:
-            return json.load(handle)
-    except FileNotFoundError:
-        return {"count": 0, "invoices": []}
-
-
 def _normalize_sort(sort_by: str | None, direction: str | None) -> tuple[str, str]:
     allowed_sort = {"invoice_date", "customer", "invoice_number", "total"}
     normalized_sort = sort_by if sort_by in allowed_sort else "invoice_date"
@@ -69,15 +90,6 @@ def _normalize_sort(sort_by: str | None, direction: str | None) -> tuple[str, st
     return normalized_sort, normalized_direction
 
 
-def coerce_total(entry: dict) -> float:
-    """Convert an invoice entry's ``total`` field to a float safely."""
-
-    try:
-        return float(entry.get("total", 0) or 0)
-    except (TypeError, ValueError):
-        return 0.0
-
-
 def _validate_limit(limit: int | None) -> int:
     try:
         parsed = int(limit) if limit is not None else DEFAULT_LIST_LIMIT
@@ -102,6 +114,32 @@ def _validate_offset(offset: int | None) -> int:
     return parsed
 
 
+def _encode_cursor(sort_by: str, direction: str, key: SortKey) -> str:
+    payload = json.dumps({"s": sort_by, "d": direction, "k": list(key)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str, sort_by: str, direction: str) -> SortKey:
+    """Decode an opaque list_invoices cursor and check it matches the requested sort."""
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        key = payload["k"]
+        cursor_sort, cursor_direction = payload["s"], payload["d"]
+    except (binascii.Error, UnicodeError, ValueError, TypeError, KeyError) as exc:
+        raise ToolError("Invalid cursor") from exc
+
+    if (cursor_sort, cursor_direction) != (sort_by, direction):
+        raise ToolError(
+            "cursor was issued for a different sort order; "
+            f"expected sort_by={cursor_sort!r}, direction={cursor_direction!r}"
+        )
+    if not isinstance(key, list) or not is_valid_sort_key(sort_by, key):
+        raise ToolError("Invalid cursor")
+    return tuple(key)
+
+
 def get_invoice(invoice_id: str) -> Invoice:
     """Load an invoice by id with consistent error handling."""
 
@@ -110,72 +148,13 @@ def get_invoice(invoice_id: str) -> Invoice:
         raise ToolError("invoice_id is required")
 
     try:
-        return load_invoice(normalized_id)
+        return get_store().load_invoice(normalized_id)
     except FileNotFoundError as exc:
         raise ToolError(f"Invoice {normalized_id} not found") from exc
     except (json.JSONDecodeError, ValidationError) as exc:
         raise ToolError(f"Invoice {normalized_id} is invalid") from exc
 
 
-def _sort_index_entries(entries: list[dict], sort_by: str, direction: str) -> list[dict]:
-    key_funcs = {
-        "invoice_date": lambda entry: (
-            str(entry.get("invoice_date", "")),
-            str(entry.get("invoice_number", "")),
-        ),
-        "customer": lambda entry: (
-            str(entry.get("customer", "")).lower(),
-            str(entry.get("invoice_number", "")),
-        ),
-        "invoice_number": lambda entry: (str(entry.get("invoice_number", "")),),
-        "total": lambda entry: (
-            coerce_total(entry),
-            str(entry.get("invoice_number", "")),
-        ),
-    }
-
-    key_func = key_funcs.get(sort_by, key_funcs["invoice_date"])
-    reverse = direction == "desc"
-    return sorted(entries, key=key_func, reverse=reverse)
-
-
-def _filter_index_entries(
-    entries: list[dict],
-    *,
-    status: str | None = None,
-    payment_status: PaymentStatus | None = None,
-    customer_query: str | None = None,
-    invoice_date_from: date | None = None,
-    invoice_date_to: date | None = None,
-) -> list[dict]:
-    filtered: list[dict] = []
-    for entry in entries:
-        if status and entry.get("status") != status:
-            continue
-        if payment_status and entry.get("payment_status") != payment_status:
-            continue
-
-        if customer_query:
-            customer = str(entry.get("customer", ""))
-            if customer_query.lower() not in customer.lower():
-                continue
-
-        invoice_date_value = None
-        if invoice_date_from or invoice_date_to:
-            try:
-                invoice_date_value = date.fromisoformat(str(entry.get("invoice_date")))
-            except Exception:
-                continue
-
-        if invoice_date_from and invoice_date_value and invoice_date_value < invoice_date_from:
-            continue
-        if invoice_date_to and invoice_date_value and invoice_date_value > invoice_date_to:
-            continue
-
-        filtered.append(entry)
-    return filtered
-
-
 def _parse_iso_date(value: str | None, field_name: str) -> date | None:
     if not value:
         return None
@@ -197,31 +176,42 @@ def list_invoices_impl(
     sort_by: str | None = None,
     direction: str | None = None,
     include_total_count: bool = True,
+    cursor: str | None = None,
 ) -> Dict[str, Any]:
-    """List invoice summaries from index.json with filters and pagination."""
+    """List invoice summaries from the invoice index with filters and pagination.
 
-    index = _load_index_payload()
-    entries: list[dict] = index.get("invoices", []) if index else []
+    Pass ``next_cursor`` from a previous response as ``cursor`` to fetch the next page;
+    cursor pages stay stable when invoices are inserted mid-walk. ``offset`` paging
+    remains available but cannot be combined with a cursor.
+    """
 
     date_from = _parse_iso_date(invoice_date_from, "invoice_date_from")
     date_to = _parse_iso_date(invoice_date_to, "invoice_date_to")
 
-    filtered = _filter_index_entries(
-        entries,
+    normalized_sort, normalized_dir = _normalize_sort(sort_by, direction)
+
+    safe_limit = _validate_limit(limit)
+    safe_offset = _validate_offset(offset)
+
+    after = None
+    if cursor:
+        if safe_offset:
+            raise ToolError("Use either cursor or offset, not both")
+        after = _decode_cursor(cursor, normalized_sort, normalized_dir)
+
+    page = get_store().query_index(
         status=status,
         payment_status=payment_status,
         customer_query=customer_query,
         invoice_date_from=date_from,
         invoice_date_to=date_to,
+        sort_by=normalized_sort,
+        direction=normalized_dir,
+        limit=safe_limit,
+        offset=safe_offset,
+        after=after,
+        include_total_count=include_total_count,
     )
-
-    normalized_sort, normalized_dir = _normalize_sort(sort_by, direction)
-    sorted_entries = _sort_index_entries(filtered, normalized_sort, normalized_dir)
-
-    safe_limit = _validate_limit(limit)
-    safe_offset = _validate_offset(offset)
-
-    page = sorted_entries[safe_offset : safe_offset + safe_limit]
     summaries = [
         {
             "id": entry.get("id"),
@@ -233,12 +223,17 @@ def list_invoices_impl(
             "status": entry.get("status"),
             "payment_status": entry.get("payment_status"),
         }
-        for entry in page
+        for entry in page.entries
     ]
 
-    total_count = len(filtered) if include_total_count else None
-    has_more = safe_offset + safe_limit < len(filtered)
-    next_offset = safe_offset + safe_limit if has_more else None
+    total_count = page.total_count if include_total_count else None
+    has_more = page.has_more
+    next_offset = safe_offset + safe_limit if has_more and after is None else None
+    next_cursor = (
+        _encode_cursor(normalized_sort, normalized_dir, page.next_key)
+        if has_more and page.next_key is not None
+        else None
+    )
 
     return {
         "invoices": summaries,
@@ -247,6 +242,8 @@ def list_invoices_impl(
         "offset": safe_offset,
         "has_more": has_more,
         "next_offset": next_offset,
+        "cursor": cursor,
+        "next_cursor": next_cursor,
         "sort": {"by": normalized_sort, "direction": normalized_dir},
         "filters": {
             "status": status,
@@ -258,6 +255,27 @@ def list_invoices_impl(
     }
 
 
+def search_invoices_impl(query: str, limit: int = DEFAULT_LIST_LIMIT) -> Dict[str, Any]:
+    """Rank invoices by trigram similarity to ``query``.
+
+    Searches customer name, business_name, project and line-item descriptions via
+    the persistent search index, so no invoice files are loaded.
+    """
+
+    normalized_query = (query or "").strip()
+    if not normalized_query:
+        raise ToolError("query is required")
+    safe_limit = _validate_limit(limit)
+
+    ranked = get_store().search(normalized_query, limit=safe_limit)
+    return {
+        "query": normalized_query,
+        "ids": [invoice_id for invoice_id, _ in ranked],
+        "results": [{"id": invoice_id, "score": score} for invoice_id, score in ranked],
+        "limit": safe_limit,
+    }
+
+
 _LATEX_REPLACEMENTS = {
     "&": r"\&",
     "%": r"\%",
@@ -285,6 +303,16 @@ def _escape_multiline(text: str | None) -> str:
     return escaped.replace("\n", r"\\ " + "\n")
 
 
+def _party_lines(party: Party) -> list[str]:
+    """Name, optional trade/brand name and address lines of a party, unescaped."""
+
+    lines = [party.name]
+    if party.business_name:
+        lines.append(party.business_name)
+    lines.extend([party.street, f"{party.postal_code} {party.city}", party.country])
+    return [line for line in lines if line]
+
+
 def _format_party_name(party: Party) -> str:
     """Format the party name, optionally including a trade/brand name on the next line."""
 
@@ -295,15 +323,7 @@ def _format_party_name(party: Party) -> str:
 
 
 def _format_party_block(party: Party) -> str:
-    lines = [_format_party_name(party)]
-    lines.extend(
-        [
-            _escape_tex(party.street),
-            _escape_tex(f"{party.postal_code} {party.city}"),
-            _escape_tex(party.country),
-        ]
-    )
-    return r"\\ ".join(line for line in lines if line)
+    return r"\\ ".join(_escape_tex(line) for line in _party_lines(party))
 
 
 _CONTACT_LABELS: dict[str, dict[str, str]] = {
@@ -312,16 +332,20 @@ _CONTACT_LABELS: dict[str, dict[str, str]] = {
 }
 
 
-def _format_contact(party: Party, language: str) -> str:
+def _contact_lines(party: Party, language: str) -> list[str]:
     labels = _CONTACT_LABELS.get(language, _CONTACT_LABELS["de"])
-    parts = []
+    lines = []
     if party.email:
-        parts.append(f"{labels['email']}: {_escape_tex(party.email)}")
+        lines.append(f"{labels['email']}: {party.email}")
     if party.phone:
-        parts.append(f"{labels['phone']}: {_escape_tex(party.phone)}")
+        lines.append(f"{labels['phone']}: {party.phone}")
     if party.tax_id:
-        parts.append(f"{labels['tax_id']}: {_escape_tex(party.tax_id)}")
-    return r"\\ ".join(parts)
+        lines.append(f"{labels['tax_id']}: {party.tax_id}")
+    return lines
+
+
+def _format_contact(party: Party, language: str) -> str:
+    return r"\\ ".join(_escape_tex(line) for line in _contact_lines(party, language))
 
 
 def _format_date(value: date, language: str, date_style: str | None) -> str:
@@ -346,8 +370,7 @@ def _format_currency(value: float, currency: str, language: str | None = None) -
 
 
 def _format_quantity(item: LineItem) -> str:
-    unit = _escape_tex(item.unit) if item.unit else ""
-    return f"{item.quantity:g} {unit}".strip()
+    return f"{item.quantity:g} {item.unit or ''}".strip()
 
 
 def _format_item_rows(invoice: Invoice) -> str:
@@ -357,7 +380,7 @@ def _format_item_rows(invoice: Invoice) -> str:
             [
                 str(idx),
                 _escape_tex(item.description),
-                _format_quantity(item),
+                _escape_tex(_format_quantity(item)),
                 _format_currency(item.unit_price, invoice.currency, invoice.language),
                 _format_currency(item.total, invoice.currency, invoice.language),
             ]
@@ -391,25 +414,22 @@ _VAT_LABELS: dict[str, dict[str, str]] = {
 }
 
 
-def _invoice_replacements(invoice: Invoice) -> Dict[str, str]:
-    project_line = ""
-    if invoice.project:
-        project_line = f"Projekt: {_escape_tex(invoice.project)}\\\\"
+def _invoice_terms(invoice: Invoice) -> Dict[str, str]:
+    """Language- and VAT-dependent wording of an invoice, unescaped.
+
+    Shared by the LaTeX replacements and the HTML preview.
+    """
 
+    labels = _LABELS.get(invoice.language, _LABELS["de"])
     vat_labels = _VAT_LABELS.get(invoice.language, _VAT_LABELS["de"])
+    charges_vat = not invoice.small_business and invoice.vat_rate > 0
 
     small_business_note = (
         invoice.small_business_note if invoice.small_business else ""
     )
 
-    vat_line = ""
-    vat_amount = invoice.vat_amount()
-    if not invoice.small_business and invoice.vat_rate > 0:
-        vat_line = _format_currency(vat_amount, invoice.currency, invoice.language)
-
-    labels = _LABELS.get(invoice.language, _LABELS["de"])
     total_label = labels["TOTAL"]
-    if not invoice.small_business and invoice.vat_rate > 0:
+    if charges_vat:
         total_label = f"{labels['TOTAL']} ({vat_labels['total_suffix']})"
 
     footer_tax = invoice.footer_tax
@@ -417,10 +437,32 @@ def _invoice_replacements(invoice: Invoice) -> Dict[str, str]:
         tax_label = _CONTACT_LABELS.get(invoice.language, _CONTACT_LABELS["de"])[
             "tax_id"
         ]
-        footer_tax = f"{tax_label}: {_escape_tex(invoice.supplier.tax_id)}"
+        footer_tax = f"{tax_label}: {invoice.supplier.tax_id}"
     if not footer_tax:
         footer_tax = small_business_note
 
+    return {
+        "VAT_RATE": f"{invoice.vat_rate * 100:.1f}%" if charges_vat else "",
+        "VAT_AMOUNT": (
+            _format_currency(invoice.vat_amount(), invoice.currency, invoice.language)
+            if charges_vat
+            else ""
+        ),
+        "VAT_LABEL": vat_labels["vat"],
+        "TOTAL_LABEL": total_label,
+        "SMALL_BUSINESS_NOTE": small_business_note,
+        "FOOTER_TAX": footer_tax or "",
+        **{f"LABEL_{key}": value for key, value in labels.items()},
+    }
+
+
+def _invoice_replacements(invoice: Invoice) -> Dict[str, str]:
+    project_line = ""
+    if invoice.project:
+        project_line = f"Projekt: {_escape_tex(invoice.project)}\\\\"
+
+    terms = _invoice_terms(invoice)
+
     return {
         "SENDER_NAME": _format_party_name(invoice.supplier),
         "SENDER_BLOCK": _format_party_block(invoice.supplier),
@@ -436,72 +478,132 @@ def _invoice_replacements(invoice: Invoice) -> Dict[str, str]:
         "OUTRO_TEXT": _escape_multiline(invoice.outro_text),
         "ITEM_ROWS": _format_item_rows(invoice),
         "SUBTOTAL": _format_currency(invoice.subtotal(), invoice.currency, invoice.language),
-        "VAT_RATE": f"{invoice.vat_rate * 100:.1f}%" if vat_line else "",
-        "VAT_AMOUNT": vat_line,
-        "VAT_LABEL": vat_labels["vat"],
-        "TOTAL_LABEL": _escape_tex(total_label),
+        "VAT_RATE": terms["VAT_RATE"],
+        "VAT_AMOUNT": terms["VAT_AMOUNT"],
+        "VAT_LABEL": terms["VAT_LABEL"],
+        "TOTAL_LABEL": _escape_tex(terms["TOTAL_LABEL"]),
         "TOTAL": _format_currency(invoice.total(), invoice.currency, invoice.language),
-        "SMALL_BUSINESS_NOTE": _escape_multiline(small_business_note),
+        "SMALL_BUSINESS_NOTE": _escape_multiline(terms["SMALL_BUSINESS_NOTE"]),
         "PAYMENT_TERMS": _escape_multiline(invoice.payment_terms),
         "FOOTER_BANK": _escape_multiline(invoice.footer_bank or ""),
-        "FOOTER_TAX": _escape_multiline(footer_tax or ""),
-        "LABEL_INVOICE_TITLE": _escape_tex(labels["INVOICE_TITLE"]),
-        "LABEL_INVOICE_NUMBER": _escape_tex(labels["INVOICE_NUMBER"]),
-        "LABEL_INVOICE_DATE": _escape_tex(labels["INVOICE_DATE"]),
-        "LABEL_DUE_DATE": _escape_tex(labels["DUE_DATE"]),
-        "LABEL_SUBTOTAL": _escape_tex(labels["SUBTOTAL"]),
+        "FOOTER_TAX": _escape_multiline(terms["FOOTER_TAX"]),
+        "LABEL_INVOICE_TITLE": _escape_tex(terms["LABEL_INVOICE_TITLE"]),
+        "LABEL_INVOICE_NUMBER": _escape_tex(terms["LABEL_INVOICE_NUMBER"]),
+        "LABEL_INVOICE_DATE": _escape_tex(terms["LABEL_INVOICE_DATE"]),
+        "LABEL_DUE_DATE": _escape_tex(terms["LABEL_DUE_DATE"]),
+        "LABEL_SUBTOTAL": _escape_tex(terms["LABEL_SUBTOTAL"]),
     }
 
 
-def _render_invoice(invoice: Invoice, root: Path | None = None) -> dict[str, Any]:
-    if not _TEMPLATE_PATH.is_file():
-        raise ToolError(f"Template not found at {_TEMPLATE_PATH}")
+def _preview_context(invoice: Invoice) -> Dict[str, Any]:
+    """Unescaped counterpart of :func:`_invoice_replacements` for the HTML preview."""
 
-    ensure_structure(root)
-    build_dir = get_invoice_root(root) / "build" / invoice.id
-    build_dir.mkdir(parents=True, exist_ok=True)
+    terms = _invoice_terms(invoice)
+    language = invoice.language
+    return {
+        "language": language,
+        "labels": _LABELS.get(language, _LABELS["de"]),
+        "sender_name": [
+            line for line in (invoice.supplier.name, invoice.supplier.business_name) if line
+        ],
+        "sender_lines": _party_lines(invoice.supplier),
+        "sender_contact": _contact_lines(invoice.supplier, language),
+        "recipient_lines": _party_lines(invoice.customer),
+        "invoice_number": invoice.invoice_number,
+        "invoice_date": _format_date(invoice.invoice_date, language, invoice.date_style),
+        "due_date": _format_date(invoice.due_date, language, invoice.date_style),
+        "project": invoice.project,
+        "intro_text": invoice.intro_text,
+        "outro_text": invoice.outro_text,
+        "items": [
+            {
+                "position": idx,
+                "description": item.description,
+                "quantity": _format_quantity(item),
+                "unit_price": _format_currency(item.unit_price, invoice.currency, language),
+                "total": _format_currency(item.total, invoice.currency, language),
+            }
+            for idx, item in enumerate(invoice.items, start=1)
+        ],
+        "subtotal": _format_currency(invoice.subtotal(), invoice.currency, language),
+        "vat_label": terms["VAT_LABEL"],
+        "vat_rate": terms["VAT_RATE"],
+        "vat_amount": terms["VAT_AMOUNT"],
+        "total_label": terms["TOTAL_LABEL"],
+        "total": _format_currency(invoice.total(), invoice.currency, language),
+        "small_business_note": terms["SMALL_BUSINESS_NOTE"],
+        "payment_terms": invoice.payment_terms,
+        "footer_bank": invoice.footer_bank or "",
+        "footer_tax": terms["FOOTER_TAX"],
+    }
 
-    replacements = _invoice_replacements(invoice)
-    tex_source = _TEMPLATE_PATH.read_text(encoding="utf-8")
-    for key, value in replacements.items():
-        tex_source = tex_source.replace(f"%%{key}%%", value)
-    # Handle conditional VAT line placeholder
-    if "%%VAT_LINE%%" in tex_source:
-        vat_line = ""
-        if replacements.get("VAT_AMOUNT"):
-            vat_label = replacements.get("VAT_LABEL", "USt")
-            vat_line = (
-                f"{vat_label} ({replacements['VAT_RATE']}): & "
-                f"{replacements['VAT_AMOUNT']}\\\\"
-            )
-        tex_source = tex_source.replace("%%VAT_LINE%%", vat_line)
 
-    tex_path = build_dir / "invoice.tex"
-    pdf_path = build_dir / "invoice.pdf"
-    tex_path.write_text(tex_source, encoding="utf-8")
+def invoice_preview_html(invoice: Invoice) -> str:
+    """Render the invoice as a standalone HTML page with print CSS (no pdflatex)."""
 
-    # Check if pdflatex is available
-    if not _PDFLATEX_PATH:
-        error_msg = (
-            "pdflatex not found. Please install TeX Live 2024+ or use one of these options:\n"
-            "  1. Install TeX Live: https://tug.org/texlive/\n"
-            "  2. Set PDFLATEX_PATH environment variable to your pdflatex binary\n"
-            "  3. Use Docker: docker run -v $(pwd)/.mad_invoice:/app/.mad_invoice mad-invoice-mcp\n"
-            "  4. For Debian/Ubuntu: apt-get install texlive-latex-base texlive-latex-extra"
-        )
-        raise ToolError(error_msg)
+    return render_preview_html(_preview_context(invoice))
+
+
+def preview_invoice_html_impl(invoice_id: str) -> Dict[str, Any]:
+    """Shared helper behind the preview tool and ``/invoices/{id}/preview``."""
+
+    invoice = get_invoice(invoice_id)
+    return {"invoice_id": invoice.id, "html": invoice_preview_html(invoice)}
+
+
+# Upper bound for pdflatex passes; \pageref{LastPage} settles after two.
+MAX_LATEX_PASSES = 3
+
+
+def _read_aux(path: Path) -> bytes | None:
+    try:
+        return path.read_bytes()
+    except FileNotFoundError:
+        return None
 
+
+def _run_pdflatex(
+    build_dir: Path,
+    tex_name: str,
+    *,
+    jobname: str | None = None,
+    fmt: LatexFormat | None = None,
+) -> int:
+    """Run pdflatex until the .aux file is stable; return the number of passes.
+
+    Like latexmk, a pass is repeated only when it created or changed the .aux file
+    (labels such as LastPage), so re-rendering an invoice whose page references
+    are unchanged needs a single pass. With ``fmt`` the run starts from the
+    precompiled preamble format.
+    """
+
+    command = [_PDFLATEX_PATH, "-interaction=nonstopmode"]
+    if fmt is not None:
+        command.append(f"-fmt={fmt.name}")
+    if jobname is not None:
+        command.append(f"-jobname={jobname}")
+    command.append(tex_name)
+
+    aux_path = build_dir / f"{jobname or Path(tex_name).stem}.aux"
+    previous = _read_aux(aux_path)
     last_result: subprocess.CompletedProcess[str] | None = None
+    passes = 0
     try:
-        for _ in range(2):
+        while passes < MAX_LATEX_PASSES:
             last_result = subprocess.run(
-                [_PDFLATEX_PATH, "-interaction=nonstopmode", tex_path.name],
+                command,
                 cwd=build_dir,
+                env=fmt.environment() if fmt is not None else None,
                 capture_output=True,
                 encoding='utf-8',
                 errors='replace',
                 check=True,
             )
+            passes += 1
+            current = _read_aux(aux_path)
+            if previous is not None and current == previous:
+                break
+            previous = current
     except FileNotFoundError as exc:
         error_msg = (
             f"pdflatex not found at: {_PDFLATEX_PATH}\n"
@@ -513,18 +615,200 @@ def _render_invoice(invoice: Invoice, root: Path | None = None) -> dict[str, Any
         raise ToolError(f"pdflatex failed with exit code {exc.returncode}") from exc
 
     if last_result is not None:
-        _LOGGER.debug("pdflatex output", extra={"stdout": last_result.stdout})
+        _LOGGER.debug("pdflatex output", extra={"stdout": last_result.stdout, "passes": passes})
+    return passes
+
+
+def _compile_invoice_tex(
+    build_dir: Path,
+    tex_path: Path,
+    tex_source: str,
+    template_source: str,
+    engine_version: str,
+    root: Path | None,
+) -> tuple[int, bool]:
+    """Compile ``tex_path``, preferring the precompiled preamble format.
+
+    With a format, only the source after the static preamble is compiled (as
+    ``invoice.body.tex`` under the ``invoice`` job name). Returns the number of
+    passes and whether the format was used.
+    """
+
+    fmt = ensure_format(_PDFLATEX_PATH, template_source, engine_version, root)
+    if fmt is not None and tex_source.startswith(fmt.preamble):
+        body_path = tex_path.with_name(f"{tex_path.stem}.body.tex")
+        body_path.write_text(tex_source[len(fmt.preamble) :], encoding="utf-8")
+        try:
+            return _run_pdflatex(build_dir, body_path.name, jobname=tex_path.stem, fmt=fmt), True
+        except ToolError:
+            _LOGGER.warning("Render with precompiled preamble failed; retrying with full source")
+    return _run_pdflatex(build_dir, tex_path.name), False
+
+
+def _require_pdflatex() -> None:
+    if not _PDFLATEX_PATH:
+        error_msg = (
+            "pdflatex not found. Please install TeX Live 2024+ or use one of these options:\n"
+            "  1. Install TeX Live: https://tug.org/texlive/\n"
+            "  2. Set PDFLATEX_PATH environment variable to your pdflatex binary\n"
+            "  3. Use Docker: docker run -v $(pwd)/.mad_invoice:/app/.mad_invoice mad-invoice-mcp\n"
+            "  4. For Debian/Ubuntu: apt-get install texlive-latex-base texlive-latex-extra"
+        )
+        raise ToolError(error_msg)
+
+
+# Every key _invoice_replacements() returns, plus the derived VAT_LINE.
+_TEMPLATE_KEYS = frozenset(
+    {
+        "SENDER_NAME",
+        "SENDER_BLOCK",
+        "SENDER_CONTACT",
+        "RECIPIENT_BLOCK",
+        "INVOICE_NUMBER",
+        "INVOICE_DATE",
+        "PROJECT_LINE",
+        "DUE_DATE",
+        "INTRO_TEXT",
+        "OUTRO_TEXT",
+        "ITEM_ROWS",
+        "SUBTOTAL",
+        "VAT_RATE",
+        "VAT_AMOUNT",
+        "VAT_LABEL",
+        "TOTAL_LABEL",
+        "TOTAL",
+        "SMALL_BUSINESS_NOTE",
+        "PAYMENT_TERMS",
+        "FOOTER_BANK",
+        "FOOTER_TAX",
+        "LABEL_INVOICE_TITLE",
+        "LABEL_INVOICE_NUMBER",
+        "LABEL_INVOICE_DATE",
+        "LABEL_DUE_DATE",
+        "LABEL_SUBTOTAL",
+        "VAT_LINE",
+    }
+)
+
+
+def _load_template() -> ParsedTemplate:
+    try:
+        return TEMPLATE_CACHE.get(_TEMPLATE_PATH, _TEMPLATE_KEYS)
+    except FileNotFoundError as exc:
+        raise ToolError(f"Template not found at {_TEMPLATE_PATH}") from exc
+
+
+def _template_values(invoice: Invoice) -> Dict[str, str]:
+    """Placeholder values for one invoice, including the conditional VAT line."""
+
+    replacements = _invoice_replacements(invoice)
+    vat_line = ""
+    if replacements.get("VAT_AMOUNT"):
+        vat_label = replacements.get("VAT_LABEL", "USt")
+        vat_line = (
+            f"{vat_label} ({replacements['VAT_RATE']}): & "
+            f"{replacements['VAT_AMOUNT']}\\\\"
+        )
+    replacements["VAT_LINE"] = vat_line
+    return replacements
+
+
+def _render_invoice(invoice: Invoice, root: Path | None = None) -> dict[str, Any]:
+    template = _load_template()
+
+    ensure_structure(root)
+    build_dir = get_invoice_root(root) / "build" / invoice.id
+    build_dir.mkdir(parents=True, exist_ok=True)
+
+    tex_source = template.render(_template_values(invoice))
+
+    # Check if pdflatex is available
+    _require_pdflatex()
+
+    engine_version = pdflatex_version(_PDFLATEX_PATH)
+    cache_key = render_cache_key(tex_source, template.data, engine_version)
+
+    def _build() -> dict[str, Any]:
+        return _build_pdf(
+            invoice.id, build_dir, tex_source, template.source, engine_version, cache_key, root
+        )
+
+    # Concurrent requests for the same content share one pdflatex run.
+    return RENDER_FLIGHTS.run(invoice.id, cache_key, _build)
+
+
+def _build_pdf(
+    invoice_id: str,
+    build_dir: Path,
+    tex_source: str,
+    template_source: str,
+    engine_version: str,
+    cache_key: str,
+    root: Path | None,
+    stem: str = "invoice",
+) -> dict[str, Any]:
+    """Return the cached PDF for ``cache_key`` or compile ``tex_source`` for ``build_dir``.
+
+    With a render scratch directory configured, pdflatex runs there and only the
+    PDF and the ``.aux`` (plus the other intermediates, if kept) land in
+    ``build_dir``; ``tex_path`` is then ``None``.
+    """
+
+    tex_path = build_dir / f"{stem}.tex"
+    pdf_path = build_dir / f"{stem}.pdf"
+    scratch_root = render_scratch_root()
+    keep_sources = scratch_root is None or keep_render_sources()
+    if cached_pdf(build_dir, cache_key) == pdf_path and (
+        not keep_sources or tex_path.is_file()
+    ):
+        return {
+            "invoice_id": invoice_id,
+            "tex_path": str(tex_path) if keep_sources else None,
+            "pdf_path": str(pdf_path),
+            "cached": True,
+            "passes": 0,
+            "precompiled_preamble": False,
+        }
+
+    invalidate_render(build_dir)
+    if scratch_root is None:
+        tex_path.write_text(tex_source, encoding="utf-8")
+        passes, precompiled = _compile_invoice_tex(
+            build_dir, tex_path, tex_source, template_source, engine_version, root
+        )
+    else:
+        with scratch_build_dir(invoice_id, scratch_root) as work_dir:
+            work_tex = work_dir / tex_path.name
+            work_tex.write_text(tex_source, encoding="utf-8")
+            restore_aux(build_dir, work_dir, stem)
+            try:
+                passes, precompiled = _compile_invoice_tex(
+                    work_dir, work_tex, tex_source, template_source, engine_version, root
+                )
+                work_pdf = work_dir / pdf_path.name
+                if work_pdf.is_file():
+                    persist_file(work_pdf, pdf_path)
+                    persist_aux(work_dir, build_dir, stem)
+            finally:
+                if keep_sources:
+                    persist_sources(work_dir, build_dir)
+
+    if pdf_path.is_file():
+        record_render(build_dir, cache_key, pdf_path)
     return {
-        "invoice_id": invoice.id,
-        "tex_path": str(tex_path),
+        "invoice_id": invoice_id,
+        "tex_path": str(tex_path) if keep_sources else None,
         "pdf_path": str(pdf_path),
+        "cached": False,
+        "passes": passes,
+        "precompiled_preamble": precompiled,
     }
 
 
 def update_invoice_status_impl(
     invoice_id: str, payment_status: PaymentStatus, status: str | None = None
 ) -> Dict[str, Any]:
-    """Shared helper to update invoice statuses and rebuild index."""
+    """Shared helper to update invoice statuses and refresh the index entry."""
 
     _require_writes_enabled()
     record_write_attempt()
@@ -545,15 +829,13 @@ def update_invoice_status_impl(
     except Exception as exc:  # pydantic validation error
         raise ToolError(f"Failed to update invoice: {exc}") from exc
 
-    with with_index_lock():
-        save_invoice(updated)
-        index = build_index()
-        save_index(index)
+    store = get_store()
+    store.save_invoice(updated)
 
     return {
         "invoice": updated.model_dump(mode="json"),
-        "invoice_path": str(get_invoice_root() / "invoices" / f"{updated.id}.json"),
-        "index_path": str(get_invoice_root() / "index.json"),
+        "invoice_path": store.invoice_location(updated.id),
+        "index_path": store.index_location(),
     }
 
 
@@ -606,17 +888,13 @@ def update_invoice_draft_impl(invoice_id: str, invoice: Invoice) -> Dict[str, An
         }
     )
 
-    with with_index_lock():
-        save_invoice(enforced_invoice)
-        index = build_index()
-        save_index(index)
+    store = get_store()
+    store.save_invoice(enforced_invoice)
 
     return {
         "invoice": enforced_invoice.model_dump(mode="json"),
-        "invoice_path": str(
-            get_invoice_root() / "invoices" / f"{enforced_invoice.id}.json"
-        ),
-        "index_path": str(get_invoice_root() / "index.json"),
+        "invoice_path": store.invoice_location(enforced_invoice.id),
+        "index_path": store.index_location(),
     }
 
 
@@ -636,34 +914,342 @@ def delete_invoice_draft_impl(invoice_id: str) -> Dict[str, Any]:
             "Only drafts (status='draft') can be deleted."
         )
 
-    invoice_path = get_invoice_root() / "invoices" / f"{invoice_id}.json"
-
-    with with_index_lock():
-        invoice_path.unlink(missing_ok=True)
-        index = build_index()
-        save_index(index)
+    store = get_store()
+    store.delete_invoice(invoice_id)
 
     return {
         "deleted_invoice_id": invoice_id,
-        "deleted_path": str(invoice_path),
-        "index_path": str(get_invoice_root() / "index.json"),
+        "deleted_path": store.invoice_location(invoice_id),
+        "index_path": store.index_location(),
+    }
+
+
+def rebuild_invoice_index_impl(workers: int = 1) -> Dict[str, Any]:
+    """Rebuild the invoice index from the stored invoices (repair operation).
+
+    ``workers`` > 1 validates invoice files in that many processes; 0 uses every core.
+    Invalid files are skipped and listed under ``errors``.
+    """
+
+    _require_writes_enabled()
+    record_write_attempt()
+
+    try:
+        requested = int(workers)
+    except (TypeError, ValueError) as exc:
+        raise ToolError("workers must be an integer") from exc
+    safe_workers = resolve_workers(requested)
+
+    store = get_store()
+    index = store.rebuild_index(workers=safe_workers)
+
+    return {
+        "count": index["count"],
+        "index_path": store.index_location(),
+        "errors": index.get("errors", []),
+        "workers": safe_workers,
     }
 
 
-def render_invoice_pdf_impl(invoice_id: str) -> Dict[str, Any]:
-    """Shared helper to render an invoice to PDF."""
+def render_invoice_pdf_impl(invoice_id: str, background: bool = False) -> Dict[str, Any]:
+    """Shared helper to render an invoice to PDF.
+
+    With ``background=True`` the render is queued on the render worker pool and
+    the job (see ``get_render_job_impl``) is returned immediately.
+    """
 
     _require_writes_enabled()
     record_write_attempt()
     invoice = get_invoice(invoice_id)
-    return _render_invoice(invoice)
+    if not background:
+        return _render_invoice(invoice)
+
+    try:
+        # Reload when the job starts so edits made while it was queued are rendered.
+        job = get_render_queue().submit(
+            invoice.id, lambda: _render_invoice(get_invoice(invoice.id))
+        )
+    except RenderQueueFull as exc:
+        raise ToolError(str(exc)) from exc
+    return job.to_dict()
+
+
+def select_invoice_ids(
+    invoice_ids: list[str] | None = None,
+    *,
+    status: str | None = None,
+    payment_status: PaymentStatus | None = None,
+    customer_query: str | None = None,
+    invoice_date_from: str | None = None,
+    invoice_date_to: str | None = None,
+) -> list[str]:
+    """Resolve an explicit id list or list_invoices-style filters to invoice ids.
+
+    Explicit ids keep their order (duplicates dropped); filter matches come back in
+    invoice number order. At least one id or filter is required.
+    """
+
+    filters = (status, payment_status, customer_query, invoice_date_from, invoice_date_to)
+    if invoice_ids:
+        if any(filters):
+            raise ToolError("Pass either invoice_ids or filters, not both")
+        normalized = [str(invoice_id).strip() for invoice_id in invoice_ids]
+        if not all(normalized):
+            raise ToolError("invoice_ids must not contain empty ids")
+        return list(dict.fromkeys(normalized))
+    if not any(filters):
+        raise ToolError("Pass invoice_ids or at least one filter")
+
+    store = get_store()
+    page = store.query_index(
+        status=status,
+        payment_status=payment_status,
+        customer_query=customer_query,
+        invoice_date_from=_parse_iso_date(invoice_date_from, "invoice_date_from"),
+        invoice_date_to=_parse_iso_date(invoice_date_to, "invoice_date_to"),
+        sort_by="invoice_number",
+        direction="asc",
+        limit=None,
+        include_total_count=False,
+    )
+    return [str(entry["id"]) for entry in page.entries]
+
+
+def _init_render_worker(pdflatex_path: str | None) -> None:
+    # Use the parent's pdflatex so discovery and PDFLATEX_PATH overrides agree.
+    global _PDFLATEX_PATH
+    _PDFLATEX_PATH = pdflatex_path
+
+
+def _render_one(invoice_id: str) -> dict[str, Any]:
+    """Render one invoice for a bulk run, reporting failures instead of raising."""
+
+    try:
+        return {"status": "ok", **_render_invoice(get_invoice(invoice_id))}
+    except Exception as exc:  # noqa: BLE001 - one bad invoice must not abort the batch
+        return {"invoice_id": invoice_id, "status": "error", "error": str(exc) or type(exc).__name__}
+
+
+def render_invoices(invoice_ids: list[str], *, workers: int = 1) -> dict[str, Any]:
+    """Render many invoices, in parallel worker processes when ``workers > 1``.
+
+    Every invoice renders in its own ``build/<id>/`` directory and ids are unique,
+    so workers never share intermediate files. The preamble format is prepared
+    once up front instead of racing in every worker. Results keep input order.
+    """
+
+    _require_pdflatex()
+    if invoice_ids:
+        ensure_format(
+            _PDFLATEX_PATH, _load_template().source, pdflatex_version(_PDFLATEX_PATH)
+        )
+
+    start = time.perf_counter()
+    pool_size = min(workers, len(invoice_ids))
+    if pool_size > 1:
+        # spawn: forking a threaded server process can deadlock on inherited locks.
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            max_workers=pool_size,
+            mp_context=context,
+            initializer=_init_render_worker,
+            initargs=(_PDFLATEX_PATH,),
+        ) as pool:
+            results = list(pool.map(_render_one, invoice_ids))
+    else:
+        results = [_render_one(invoice_id) for invoice_id in invoice_ids]
+
+    failed = sum(1 for result in results if result["status"] == "error")
+    return {
+        "count": len(results),
+        "rendered": sum(1 for result in results if result["status"] == "ok" and not result["cached"]),
+        "cached": sum(1 for result in results if result["status"] == "ok" and result["cached"]),
+        "failed": failed,
+        "workers": max(pool_size, 1),
+        "duration_s": round(time.perf_counter() - start, 3),
+        "results": results,
+    }
+
+
+_BEGIN_DOCUMENT = "\\begin{document}"
+_END_DOCUMENT = "\\end{document}"
+_LABEL_REFERENCE = re.compile(r"\\(label|ref|pageref)\{([^}]*)\}")
+
+
+def _merged_tex_source(template: ParsedTemplate, invoices: list[Invoice]) -> str:
+    """One document holding every invoice as its own page group.
+
+    The template's static preamble is emitted once. Each invoice then gets its
+    header definitions, a page counter reset to 1 and its labels suffixed with its
+    position, so ``\\pageref{LastPage}`` ("Seite 1 von 2") counts that invoice's
+    pages only.
+    """
+
+    preamble = static_preamble(template.source)
+    if not preamble:
+        raise ToolError(
+            "Merged rendering needs a template that starts with a static \\documentclass preamble"
+        )
+    parts = [preamble, _BEGIN_DOCUMENT, "\n"]
+    for position, invoice in enumerate(invoices, start=1):
+        rendered = template.render(_template_values(invoice))
+        begin = rendered.find(_BEGIN_DOCUMENT)
+        end = rendered.rfind(_END_DOCUMENT)
+        if begin < 0 or end < begin:
+            raise ToolError(
+                "Merged rendering needs \\begin{document} and \\end{document} in the template"
+            )
+        group = rendered[len(preamble) : begin] + rendered[begin + len(_BEGIN_DOCUMENT) : end]
+        group = _LABEL_REFERENCE.sub(
+            lambda match: f"\\{match.group(1)}{{{match.group(2)}-{position}}}", group
+        )
+        parts.append(f"% {invoice.id}\n\\clearpage\n\\setcounter{{page}}{{1}}\n{group}")
+    parts.append(f"{_END_DOCUMENT}\n")
+    return "".join(parts)
+
+
+def render_invoices_merged(invoice_ids: list[str]) -> dict[str, Any]:
+    """Render the invoices into a single PDF with one pdflatex run.
+
+    The output goes to ``merged/<hash of the ids>/statement.pdf`` and shares the
+    render cache, scratch directory and preamble format handling of single
+    renders. Invoices appear in the given order.
+    """
+
+    if not invoice_ids:
+        raise ToolError("No invoices selected")
+    template = _load_template()
+    tex_source = _merged_tex_source(template, [get_invoice(invoice_id) for invoice_id in invoice_ids])
+    _require_pdflatex()
+
+    start = time.perf_counter()
+    ensure_structure()
+    name = hashlib.sha256("\0".join(invoice_ids).encode("utf-8")).hexdigest()[:16]
+    build_dir = get_invoice_root() / MERGED_DIRNAME / name
+    build_dir.mkdir(parents=True, exist_ok=True)
+    engine_version = pdflatex_version(_PDFLATEX_PATH)
+    cache_key = render_cache_key(tex_source, template.data, engine_version)
+
+    def _build() -> dict[str, Any]:
+        return _build_pdf(
+            name, build_dir, tex_source, template.source, engine_version, cache_key, None,
+            stem="statement",
+        )
+
+    result = RENDER_FLIGHTS.run(f"{MERGED_DIRNAME}/{name}", cache_key, _build)
+    result.pop("invoice_id", None)
+    return {
+        "merged": True,
+        "count": len(invoice_ids),
+        "invoice_ids": list(invoice_ids),
+        **result,
+        "duration_s": round(time.perf_counter() - start, 3),
+    }
+
+
+def render_invoices_bulk_impl(
+    invoice_ids: list[str] | None = None,
+    *,
+    status: str | None = None,
+    payment_status: PaymentStatus | None = None,
+    customer_query: str | None = None,
+    invoice_date_from: str | None = None,
+    invoice_date_to: str | None = None,
+    workers: int = 1,
+    merge: bool = False,
+) -> Dict[str, Any]:
+    """Shared helper to render a batch of invoices selected by id or filter.
+
+    With ``merge`` the batch becomes one PDF (see :func:`render_invoices_merged`).
+    """
+
+    _require_writes_enabled()
+    record_write_attempt()
+    try:
+        requested = int(workers)
+    except (TypeError, ValueError) as exc:
+        raise ToolError("workers must be an integer") from exc
+
+    ids = select_invoice_ids(
+        invoice_ids,
+        status=status,
+        payment_status=payment_status,
+        customer_query=customer_query,
+        invoice_date_from=invoice_date_from,
+        invoice_date_to=invoice_date_to,
+    )
+    enforce_batch_limit(len(ids), counter="render_batch")
+    if merge:
+        return render_invoices_merged(ids)
+    return render_invoices(ids, workers=resolve_workers(requested))
+
+
+def get_render_job_impl(job_id: str) -> Dict[str, Any]:
+    """Return status, timings and result of a background render job."""
+
+    normalized_id = str(job_id).strip() if job_id is not None else ""
+    if not normalized_id:
+        raise ToolError("job_id is required")
+    job = get_render_queue().get(normalized_id)
+    if job is None:
+        raise ToolError(f"Render job {normalized_id} not found (unknown or expired)")
+    return job.to_dict()
+
+
+def create_invoice_draft_impl(invoice: Invoice) -> Dict[str, Any]:
+    """Persist ``invoice`` as a new draft under the next sequence number."""
+
+    _require_writes_enabled()
+    record_write_attempt()
+    ensure_structure()
+    store = get_store()
+
+    number = store.next_invoice_number()
+
+    enforced_invoice = invoice.model_copy(
+        update={"id": number, "invoice_number": number, "status": "draft"}
+    )
+
+    if store.invoice_exists(enforced_invoice.id):
+        raise ToolError(
+            f"Invoice {enforced_invoice.id} already exists at "
+            f"{store.invoice_location(enforced_invoice.id)}"
+        )
+
+    store.save_invoice(enforced_invoice)
+
+    return {
+        "invoice": enforced_invoice.model_dump(mode="json"),
+        "index_path": store.index_location(),
+        # Resolved after saving: the sharded layout files it under its year.
+        "invoice_path": store.invoice_location(enforced_invoice.id),
+    }
+
+
+def generate_invoice_number_impl(separator: str | None = "-") -> Dict[str, Any]:
+    """Reserve the next invoice number from the yearly sequence."""
+
+    _require_writes_enabled()
+    record_write_attempt()
+    store = get_store()
+    number = store.next_invoice_number(separator=separator)
+    return {
+        "invoice_number": number,
+        "sequence_path": store.sequence_location(),
+    }
+
+
+def get_invoice_payload_impl(invoice_id: str) -> Dict[str, Any]:
+    """Return the full invoice JSON payload for ``invoice_id``."""
+
+    return get_invoice(invoice_id).model_dump(mode="json")
 
 
 def register(server: FastMCP) -> None:
     """Register invoice tools."""
 
     @server.tool()
-    def list_invoices(
+    async def list_invoices(
         status: str | None = None,
         payment_status: PaymentStatus | None = None,
         customer_query: str | None = None,
@@ -674,9 +1260,16 @@ def register(server: FastMCP) -> None:
         sort_by: str | None = None,
         direction: str | None = None,
         include_total_count: bool = True,
+        cursor: str | None = None,
     ) -> Dict[str, Any]:
-        """Read-only listing of invoice summaries from index.json with filters/pagination."""
-        return list_invoices_impl(
+        """Read-only listing of invoice summaries from index.json with filters/pagination.
+
+        To page through everything, pass the returned next_cursor as cursor (keep the
+        same filters and sort) until next_cursor is null.
+        """
+        return await get_tool_limits().run(
+            "read",
+            list_invoices_impl,
             status=status,
             payment_status=payment_status,
             customer_query=customer_query,
@@ -687,17 +1280,29 @@ def register(server: FastMCP) -> None:
             sort_by=sort_by,
             direction=direction,
             include_total_count=include_total_count,
+            cursor=cursor,
         )
 
+    @server.tool()
+    async def search_invoices(query: str, limit: int = DEFAULT_LIST_LIMIT) -> Dict[str, Any]:
+        """Read-only full-text search over customer, project and line-item descriptions.
+
+        Returns invoice ids ranked by how many of the query's character trigrams they
+        contain (score 1.0 = every trigram matched), tolerating small typos. Use
+        get_invoice on the returned ids for details.
+        """
+        return await get_tool_limits().run("read", search_invoices_impl, query, limit)
+
     @server.tool(name="get_invoice")
-    def get_invoice_tool(invoice_id: str) -> Dict[str, Any]:
+    async def get_invoice_tool(invoice_id: str) -> Dict[str, Any]:
         """Read a full invoice JSON payload by id (read-only)."""
 
-        invoice = get_invoice(invoice_id)
-        return invoice.model_dump(mode="json")
+        return await get_tool_limits().run(
+            "read", get_invoice_payload_impl, invoice_id
+        )
 
     @server.tool()
-    def create_invoice_draft(invoice: Invoice) -> Dict[str, Any]:
+    async def create_invoice_draft(invoice: Invoice) -> Dict[str, Any]:
         """Persist a draft invoice to .mad_invoice/ and refresh the index.
 
         Input expectations for LLM callers:
@@ -711,50 +1316,86 @@ def register(server: FastMCP) -> None:
         values for those fields.
         """
 
-        _require_writes_enabled()
-        record_write_attempt()
-        ensure_structure()
+        return await get_tool_limits().run("write", create_invoice_draft_impl, invoice)
+
+    @server.tool()
+    async def render_invoice_pdf(invoice_id: str, background: bool = False) -> Dict[str, Any]:
+        """Render an invoice to PDF using the LaTeX template.
+
+        Resolves invoice JSON by id, fills `templates/invoice.tex`, and runs pdflatex.
+        Keeps the sender name on two lines when both name and business_name are provided.
+        Returns `cached: true` when the existing PDF already matches the invoice,
+        template and pdflatex version, in which case pdflatex is not run.
 
-        number = next_invoice_number()
+        background=True queues the render and returns a job (job_id, status) at once;
+        poll get_render_job(job_id) until status is "succeeded" or "failed".
+        """
 
-        enforced_invoice = invoice.model_copy(
-            update={"id": number, "invoice_number": number, "status": "draft"}
+        return await get_tool_limits().run(
+            "render", render_invoice_pdf_impl, invoice_id, background=background
         )
 
-        invoice_path = get_invoice_root() / "invoices" / f"{enforced_invoice.id}.json"
-        if invoice_path.exists():
-            raise ToolError(
-                f"Invoice {enforced_invoice.id} already exists at {invoice_path}"
-            )
+    @server.tool()
+    async def preview_invoice_html(invoice_id: str) -> Dict[str, Any]:
+        """Render an HTML preview of an invoice in milliseconds, without pdflatex.
 
-        with with_index_lock():
-            save_invoice(enforced_invoice)
-            index = build_index()
-            save_index(index)
+        Mirrors the PDF layout (A4 print CSS) for checking drafts; use
+        render_invoice_pdf for the final document. Returns {invoice_id, html}.
+        """
 
-        return {
-            "invoice": enforced_invoice.model_dump(mode="json"),
-            "index_path": str(get_invoice_root() / "index.json"),
-            "invoice_path": str(invoice_path),
-        }
+        return await get_tool_limits().run("read", preview_invoice_html_impl, invoice_id)
 
     @server.tool()
-    def render_invoice_pdf(invoice_id: str) -> Dict[str, Any]:
-        """Render an invoice to PDF using the LaTeX template.
+    async def render_invoices_bulk(
+        invoice_ids: list[str] | None = None,
+        status: str | None = None,
+        payment_status: PaymentStatus | None = None,
+        customer_query: str | None = None,
+        invoice_date_from: str | None = None,
+        invoice_date_to: str | None = None,
+        workers: int = 1,
+        merge: bool = False,
+    ) -> Dict[str, Any]:
+        """Render many invoices to PDF in one call.
 
-        Resolves invoice JSON by id, fills `templates/invoice.tex`, and runs pdflatex.
-        Keeps the sender name on two lines when both name and business_name are provided.
+        Select invoices either by invoice_ids or by list_invoices-style filters (not both).
+        workers > 1 renders in parallel processes (0 = all cores). Each invoice gets its
+        own entry in results with status "ok" (plus pdf_path, cached, passes) or "error".
+
+        merge=true instead renders the selection into one PDF (e.g. a monthly statement)
+        with a single pdflatex run, page numbers restarting per invoice; returns pdf_path.
         """
 
-        return render_invoice_pdf_impl(invoice_id)
+        return await get_tool_limits().run(
+            "render",
+            render_invoices_bulk_impl,
+            invoice_ids,
+            status=status,
+            payment_status=payment_status,
+            customer_query=customer_query,
+            invoice_date_from=invoice_date_from,
+            invoice_date_to=invoice_date_to,
+            workers=workers,
+            merge=merge,
+        )
+
+    @server.tool()
+    async def get_render_job(job_id: str) -> Dict[str, Any]:
+        """Report the state of a background render job.
+
+        Returns status (queued | running | succeeded | failed), queued_s/run_s timings,
+        pdf_path and the render result or error.
+        """
+
+        return await get_tool_limits().run("read", get_render_job_impl, job_id)
 
     @server.tool()
-    def update_invoice_status(
+    async def update_invoice_status(
         invoice_id: str,
         payment_status: PaymentStatus,
         status: str | None = None,
     ) -> Dict[str, Any]:
-        """Update invoice payment_status and optionally status, then rebuild index.
+        """Update invoice payment_status and optionally status, then refresh the index.
 
         payment_status must be one of: open | paid | overdue | cancelled.
         status is a free-form lifecycle flag (e.g., draft/final); pass when you need to change it.
@@ -762,10 +1403,12 @@ def register(server: FastMCP) -> None:
         Note: Cannot change from 'final' back to 'draft' (finalized invoices are immutable).
         """
 
-        return update_invoice_status_impl(invoice_id, payment_status, status)
+        return await get_tool_limits().run(
+            "write", update_invoice_status_impl, invoice_id, payment_status, status
+        )
 
     @server.tool()
-    def update_invoice_draft(invoice_id: str, invoice: Invoice) -> Dict[str, Any]:
+    async def update_invoice_draft(invoice_id: str, invoice: Invoice) -> Dict[str, Any]:
         """Update the complete content of a draft invoice.
 
         Allows editing all fields (parties, items, amounts, dates, etc.) of an invoice
@@ -779,13 +1422,15 @@ def register(server: FastMCP) -> None:
         Use this to correct mistakes or make changes before finalizing the invoice.
         """
 
-        return update_invoice_draft_impl(invoice_id, invoice)
+        return await get_tool_limits().run(
+            "write", update_invoice_draft_impl, invoice_id, invoice
+        )
 
     @server.tool()
-    def delete_invoice_draft(invoice_id: str) -> Dict[str, Any]:
+    async def delete_invoice_draft(invoice_id: str) -> Dict[str, Any]:
         """Delete a draft invoice completely.
 
-        Permanently removes an invoice and rebuilds the index.
+        Permanently removes an invoice and drops it from the index.
 
         Restrictions:
         - Only works for invoices with status='draft'
@@ -795,23 +1440,31 @@ def register(server: FastMCP) -> None:
         Use this to remove unwanted or mistaken draft invoices.
         """
 
-        return delete_invoice_draft_impl(invoice_id)
+        return await get_tool_limits().run("write", delete_invoice_draft_impl, invoice_id)
+
+    @server.tool()
+    async def rebuild_invoice_index(workers: int = 1) -> Dict[str, Any]:
+        """Rebuild index.json from every invoice file on disk.
+
+        Normal writes update the index incrementally. Use this repair operation after
+        restoring backups or editing invoice JSON files by hand.
+        - workers: processes used to validate files (default 1, 0 = all cores).
+        - Invalid invoice files are skipped and reported under errors.
+        """
+
+        return await get_tool_limits().run("write", rebuild_invoice_index_impl, workers)
 
     @server.tool()
-    def generate_invoice_number(separator: str | None = "-") -> Dict[str, Any]:
+    async def generate_invoice_number(separator: str | None = "-") -> Dict[str, Any]:
         """Return the next invoice number using a yearly counter (default: YYYY-####).
 
         - separator: defaults to "-", set to "" or null for no separator.
         - Counters are stored in .mad_invoice/sequence.json, one counter per year.
         """
 
-        _require_writes_enabled()
-        record_write_attempt()
-        number = next_invoice_number(separator=separator)
-        return {
-            "invoice_number": number,
-            "sequence_path": str(get_invoice_root() / "sequence.json"),
-        }
+        return await get_tool_limits().run(
+            "write", generate_invoice_number_impl, separator
+        )
 
     @server.tool()
     def get_invoice_template(
@@ -928,8 +1581,14 @@ def register(server: FastMCP) -> None:
 
 
 __all__ = [
+    "get_render_job_impl",
+    "rebuild_invoice_index_impl",
     "register",
     "render_invoice_pdf_impl",
+    "render_invoices",
+    "render_invoices_bulk_impl",
+    "search_invoices_impl",
+    "select_invoice_ids",
     "update_invoice_status_impl",
     "update_invoice_draft_impl",
     "delete_invoice_draft_impl",
@@ -0,0 +1,329 @@
+"""Optional binary index file (``index.bin``) read through ``mmap``.
+
+Enabled with ``MAD_INVOICE_INDEX_FORMAT=binary``. The file is written next to
+index.json (which stays the human-readable export) and contains:
+
+* a fixed header: magic, format version, entry count, string count, section offsets
+  and the (mtime, size, inode) signature of the index.json it was encoded from
+* a string table: ``uint32`` end offsets followed by one UTF-8 blob
+* one fixed-width record per entry, in index.json order
+* one ``uint32`` permutation per sort key, listing entry positions in ascending key order
+
+Record fields are ``uint32`` references into the string table. The lowest bit
+tags the referenced text as a plain string (0) or a JSON-encoded scalar (1), so
+``None``, booleans and numbers round-trip. ``total`` is stored as a float64 plus a
+reference used only when the original value was not a float.
+
+Readers only use the file while its recorded signature matches index.json, so a
+stale file can stay in place until it is re-encoded.
+"""
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Iterable, Optional
+
+from .invoices_columns import (
+    CATEGORICAL_FIELDS,
+    INDEX_FIELDS,
+    MISSING,
+    CategoricalColumn,
+    ColumnarIndex,
+)
+
+BINARY_INDEX_FILENAME = "index.bin"
+INDEX_FORMAT_ENV_VAR = "MAD_INVOICE_INDEX_FORMAT"
+BINARY_INDEX_VERSION = 2
+
+_MAGIC = b"MADINDEX"
+# magic, version, sort order count, entry count, string count,
+# string offsets, string blob, records and sort order section offsets,
+# source index.json mtime_ns, size and inode (all zero when unknown).
+_HEADER = struct.Struct("<8sHHIIQQQQQQQ")
+_REF_FIELDS = tuple(name for name in INDEX_FIELDS if name != "total")
+_REF_SLOTS = {name: slot for slot, name in enumerate(_REF_FIELDS)}
+# One reference per non-total field, the float total, the raw total reference and
+# a reference to a JSON object holding keys outside INDEX_FIELDS.
+_RECORD = struct.Struct(f"<{len(_REF_FIELDS)}IdII")
+_TOTAL_SLOT = len(_REF_FIELDS)
+_RAW_TOTAL_SLOT = _TOTAL_SLOT + 1
+_EXTRAS_SLOT = _TOTAL_SLOT + 2
+
+_REF_MISSING = 0xFFFFFFFF
+# Raw total reference meaning "the float64 column holds the original value".
+_REF_NATIVE_FLOAT = 0xFFFFFFFE
+
+# Written in this order; the header records how many are present.
+SORT_ORDERS = ("invoice_date", "customer", "invoice_number", "total", "due_date")
+
+
+def binary_index_enabled() -> bool:
+    return os.getenv(INDEX_FORMAT_ENV_VAR, "").strip().lower() == "binary"
+
+
+class _StringTable:
+    def __init__(self) -> None:
+        # Keyed by (type, value) so True, 1 and 1.0 get distinct references.
+        self.refs: dict[tuple[type, object], int] = {}
+        self.texts: list[bytes] = []
+
+    def ref(self, value: object) -> int:
+        if value is MISSING:
+            return _REF_MISSING
+        key = (type(value), value)
+        ref = self.refs.get(key)
+        if ref is None:
+            if type(value) is str:
+                tag, text = 0, value
+            else:
+                tag, text = 1, json.dumps(value)
+            ref = (len(self.texts) << 1) | tag
+            self.refs[key] = ref
+            self.texts.append(text.encode("utf-8"))
+        return ref
+
+
+def encode_binary_index(
+    entries: Iterable[Mapping[str, object]] | ColumnarIndex,
+    *,
+    source: Optional[tuple[int, int, int]] = None,
+) -> bytes:
+    """Serialize index entries (index.json ``invoices``) to the binary format.
+
+    ``source`` is the signature of the index.json the entries were read from.
+    """
+
+    if isinstance(entries, ColumnarIndex):
+        columns = entries
+    else:
+        columns = ColumnarIndex.from_entries(entries)
+    count = len(columns)
+    strings = _StringTable()
+
+    # Categorical columns need one string-table lookup per distinct value.
+    field_refs: list[list[int]] = []
+    for name in _REF_FIELDS:
+        column = columns.columns.get(name)
+        if column is None:
+            values = columns.ids if name == "id" else columns.invoice_numbers
+            field_refs.append([strings.ref(value) for value in values])
+        else:
+            ref_by_code = [strings.ref(value) for value in column.values]
+            field_refs.append([ref_by_code[code] for code in column.codes])
+    raw_total_refs = [_REF_NATIVE_FLOAT] * count
+    for pos, total in columns.raw_totals.items():
+        raw_total_refs[pos] = strings.ref(total)
+    extras_refs = [_REF_MISSING] * count
+    for pos, extra in columns.extras.items():
+        extras_refs[pos] = strings.ref(json.dumps(extra))
+
+    records = b"".join(
+        _RECORD.pack(*row) for row in zip(*field_refs, columns.totals, raw_total_refs, extras_refs)
+    )
+    orders = b"".join(
+        array("I", columns.sorted_positions(sort_by)).tobytes() for sort_by in SORT_ORDERS
+    )
+
+    ends = array("I")
+    offset = 0
+    for text in strings.texts:
+        offset += len(text)
+        ends.append(offset)
+    string_offsets = ends.tobytes()
+    blob = b"".join(strings.texts)
+
+    offsets_at = _HEADER.size
+    blob_at = offsets_at + len(string_offsets)
+    records_at = blob_at + len(blob)
+    orders_at = records_at + len(records)
+    header = _HEADER.pack(
+        _MAGIC,
+        BINARY_INDEX_VERSION,
+        len(SORT_ORDERS),
+        count,
+        len(strings.texts),
+        offsets_at,
+        blob_at,
+        records_at,
+        orders_at,
+        *(source or (0, 0, 0)),
+    )
+    return b"".join((header, string_offsets, blob, records, orders))
+
+
+def write_binary_index(
+    path: Path,
+    entries: Iterable[Mapping[str, object]] | ColumnarIndex,
+    *,
+    source: Optional[tuple[int, int, int]] = None,
+) -> None:
+    """Atomically replace ``path`` with the binary encoding of ``entries``."""
+
+    data = encode_binary_index(entries, source=source)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(data)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+class BinaryIndex:
+    """Read-only view of an index.bin file; rows are decoded on demand."""
+
+    __slots__ = ("path", "count", "source", "_map", "_ends", "_blob_at", "_records_at", "_orders", "_cache")
+
+    def __init__(self, path: Path, buffer: mmap.mmap | bytes):
+        if len(buffer) < _HEADER.size:
+            raise ValueError(f"{path} is too short for an index header")
+        (
+            magic,
+            version,
+            order_count,
+            count,
+            string_count,
+            offsets_at,
+            blob_at,
+            records_at,
+            orders_at,
+            *source,
+        ) = _HEADER.unpack_from(buffer, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a binary invoice index")
+        if version != BINARY_INDEX_VERSION:
+            raise ValueError(f"Unsupported binary index version {version} in {path}")
+
+        view = memoryview(buffer)
+        self.path = path
+        self.count = count
+        # Signature of the index.json this file was encoded from, if recorded.
+        self.source: Optional[tuple[int, int, int]] = tuple(source) if any(source) else None
+        self._map = buffer
+        self._ends = view[offsets_at : offsets_at + 4 * string_count].cast("I")
+        self._blob_at = blob_at
+        self._records_at = records_at
+        self._orders = {
+            sort_by: view[orders_at + 4 * count * slot : orders_at + 4 * count * (slot + 1)].cast("I")
+            for slot, sort_by in enumerate(SORT_ORDERS[:order_count])
+        }
+        self._cache: dict[int, object] = {}
+
+    @classmethod
+    def open(cls, path: Path) -> "BinaryIndex":
+        with path.open("rb") as handle:
+            if os.fstat(handle.fileno()).st_size == 0:
+                return cls(path, b"")
+            buffer = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(path, buffer)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _text(self, index: int) -> str:
+        start = self._ends[index - 1] if index else 0
+        end = self._ends[index]
+        return bytes(self._map[self._blob_at + start : self._blob_at + end]).decode("utf-8")
+
+    def _value(self, ref: int) -> object:
+        if ref == _REF_MISSING:
+            return MISSING
+        cached = self._cache.get(ref, MISSING)
+        if cached is not MISSING:
+            return cached
+        text = self._text(ref >> 1)
+        value = json.loads(text) if ref & 1 else text
+        if len(self._cache) < 4096:
+            self._cache[ref] = value
+        return value
+
+    def _record(self, pos: int) -> tuple:
+        if not 0 <= pos < self.count:
+            raise IndexError(pos)
+        return _RECORD.unpack_from(self._map, self._records_at + pos * _RECORD.size)
+
+    def entry(self, pos: int) -> dict[str, object]:
+        """Decode entry ``pos`` into the dict stored in index.json."""
+
+        record = self._record(pos)
+        entry: dict[str, object] = {}
+        for name in INDEX_FIELDS:
+            if name == "total":
+                raw = record[_RAW_TOTAL_SLOT]
+                value = record[_TOTAL_SLOT] if raw == _REF_NATIVE_FLOAT else self._value(raw)
+            else:
+                value = self._value(record[_REF_SLOTS[name]])
+            if value is not MISSING:
+                entry[name] = value
+        if record[_EXTRAS_SLOT] != _REF_MISSING:
+            entry.update(json.loads(self._value(record[_EXTRAS_SLOT])))  # type: ignore[arg-type]
+        return entry
+
+    def order(self, sort_by: str) -> memoryview | None:
+        """Entry positions in ascending ``sort_by`` order, or ``None`` if not stored."""
+
+        return self._orders.get(sort_by)
+
+    def to_columns(self) -> ColumnarIndex:
+        """Decode every record into a :class:`ColumnarIndex` (used for filtered queries)."""
+
+        records = list(
+            _RECORD.iter_unpack(self._map[self._records_at : self._records_at + self.count * _RECORD.size])
+        )
+        slots = list(zip(*records)) if records else [()] * (_EXTRAS_SLOT + 1)
+
+        def _decode_all(refs: Iterable[int]) -> list[object]:
+            return [self._value(ref) for ref in refs]
+
+        columns: dict[str, CategoricalColumn] = {}
+        for name in CATEGORICAL_FIELDS:
+            values: list[object] = []
+            by_ref: dict[int, int] = {}
+            codes: list[int] = []
+            for ref in slots[_REF_SLOTS[name]]:
+                code = by_ref.get(ref)
+                if code is None:
+                    code = by_ref[ref] = len(values)
+                    values.append(self._value(ref))
+                codes.append(code)
+            columns[name] = CategoricalColumn(
+                values=values, codes=array("H" if len(values) <= 0xFFFF else "I", codes)
+            )
+
+        raw_totals = {
+            pos: self._value(ref)
+            for pos, ref in enumerate(slots[_RAW_TOTAL_SLOT])
+            if ref != _REF_NATIVE_FLOAT
+        }
+        extras = {
+            pos: json.loads(self._value(ref))  # type: ignore[arg-type]
+            for pos, ref in enumerate(slots[_EXTRAS_SLOT])
+            if ref != _REF_MISSING
+        }
+        return ColumnarIndex.from_columns(
+            ids=_decode_all(slots[_REF_SLOTS["id"]]),
+            invoice_numbers=_decode_all(slots[_REF_SLOTS["invoice_number"]]),
+            totals=array("d", slots[_TOTAL_SLOT]),
+            columns=columns,
+            raw_totals=raw_totals,
+            extras=extras,
+        )
+
+
+__all__ = [
+    "BINARY_INDEX_FILENAME",
+    "BinaryIndex",
+    "INDEX_FORMAT_ENV_VAR",
+    "SORT_ORDERS",
+    "binary_index_enabled",
+    "encode_binary_index",
+    "write_binary_index",
+]
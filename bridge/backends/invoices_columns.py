@@ -0,0 +1,346 @@
+"""Columnar in-memory representation of index.json entries.
+
+Each index field is stored once per column instead of once per entry dict:
+repeated values (status, dates, customer, currency, ...) are interned and
+addressed through compact integer code arrays, totals live in a float array and
+invoice dates additionally get an ordinal column for range filters. Callers read
+entries through :class:`IndexRow`, a ``__slots__`` mapping view over one position.
+"""
+from __future__ import annotations
+
+import sys
+from array import array
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Callable, Iterable, Iterator
+
+# Field order of Invoice.to_index_entry(); rows iterate their keys in this order.
+INDEX_FIELDS = (
+    "id",
+    "invoice_number",
+    "status",
+    "invoice_date",
+    "due_date",
+    "customer",
+    "total",
+    "currency",
+    "payment_status",
+    "vat_rate",
+    "small_business",
+    "language",
+    "date_style",
+)
+
+_FIELD_SET = frozenset(INDEX_FIELDS)
+CATEGORICAL_FIELDS = tuple(
+    name for name in INDEX_FIELDS if name not in ("id", "invoice_number", "total")
+)
+
+
+class _Missing:
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return "<missing>"
+
+
+# Placeholder for keys an entry does not have; rows raise KeyError for it.
+MISSING = _Missing()
+
+
+def _as_str(value: object) -> str:
+    """``str(entry.get(key, ""))`` for a stored column value."""
+
+    if value is MISSING:
+        return ""
+    return value if type(value) is str else str(value)
+
+
+def _coerce_total(value: object) -> float:
+    if value is MISSING:
+        return 0.0
+    try:
+        return float(value or 0)  # type: ignore[arg-type]
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _date_ordinal(value: object) -> int:
+    """Ordinal of an ISO date value, or -1 when it does not parse."""
+
+    try:
+        return date.fromisoformat(str(value)).toordinal()
+    except ValueError:
+        return -1
+
+
+@dataclass(slots=True)
+class CategoricalColumn:
+    """Distinct values plus one small integer code per entry."""
+
+    values: list[object]
+    codes: array
+
+    @classmethod
+    def build(cls, raw: Iterable[object]) -> "CategoricalColumn":
+        values: list[object] = []
+        # Key on the type as well so True, 1 and 1.0 stay distinct values.
+        lookup: dict[tuple[type, object], int] = {}
+        codes: list[int] = []
+        for value in raw:
+            key = (type(value), value)
+            code = lookup.get(key)
+            if code is None:
+                code = len(values)
+                lookup[key] = code
+                values.append(sys.intern(value) if type(value) is str else value)
+            codes.append(code)
+        return cls(values=values, codes=array("H" if len(values) <= 0xFFFF else "I", codes))
+
+    def value(self, pos: int) -> object:
+        return self.values[self.codes[pos]]
+
+    def derive(self, func: Callable[[object], object]) -> list[object]:
+        """Apply ``func`` once per distinct value; index the result by code."""
+
+        return [func(value) for value in self.values]
+
+    def codes_where(self, predicate: Callable[[object], bool]) -> set[int]:
+        return {code for code, value in enumerate(self.values) if predicate(value)}
+
+
+@dataclass(slots=True)
+class ColumnarIndex:
+    """Index entries stored column by column, addressed by entry position."""
+
+    ids: list[object]
+    invoice_numbers: list[object]
+    # str() forms of ids/numbers used in sort keys; they share the stored str objects.
+    id_keys: list[str]
+    number_keys: list[str]
+    totals: array
+    columns: dict[str, CategoricalColumn]
+    invoice_date_ordinals: array
+    # Totals that are not plain floats (or missing), kept verbatim for round-trips.
+    raw_totals: dict[int, object] = field(default_factory=dict)
+    # Keys outside INDEX_FIELDS, per position.
+    extras: dict[int, dict[str, object]] = field(default_factory=dict)
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[Mapping[str, object]]) -> "ColumnarIndex":
+        ids: list[object] = []
+        numbers: list[object] = []
+        totals = array("d")
+        raw_totals: dict[int, object] = {}
+        extras: dict[int, dict[str, object]] = {}
+        raw_columns: dict[str, list[object]] = {name: [] for name in CATEGORICAL_FIELDS}
+
+        for pos, entry in enumerate(entries):
+            ids.append(entry.get("id", MISSING))
+            numbers.append(entry.get("invoice_number", MISSING))
+            total = entry.get("total", MISSING)
+            totals.append(_coerce_total(total))
+            if type(total) is not float:
+                raw_totals[pos] = total
+            for name, column in raw_columns.items():
+                column.append(entry.get(name, MISSING))
+            if not _FIELD_SET.issuperset(entry):
+                extras[pos] = {
+                    key: value for key, value in entry.items() if key not in _FIELD_SET
+                }
+
+        return cls.from_columns(
+            ids=ids,
+            invoice_numbers=numbers,
+            totals=totals,
+            columns={name: CategoricalColumn.build(values) for name, values in raw_columns.items()},
+            raw_totals=raw_totals,
+            extras=extras,
+        )
+
+    @classmethod
+    def from_columns(
+        cls,
+        *,
+        ids: list[object],
+        invoice_numbers: list[object],
+        totals: array,
+        columns: dict[str, CategoricalColumn],
+        raw_totals: dict[int, object],
+        extras: dict[int, dict[str, object]],
+    ) -> "ColumnarIndex":
+        """Assemble an index from already decoded columns, deriving the key columns."""
+
+        date_column = columns["invoice_date"]
+        ordinal_by_code = date_column.derive(_date_ordinal)
+        return cls(
+            ids=ids,
+            invoice_numbers=invoice_numbers,
+            id_keys=[_as_str(value) for value in ids],
+            number_keys=[_as_str(value) for value in invoice_numbers],
+            totals=totals,
+            columns=columns,
+            invoice_date_ordinals=array("i", (ordinal_by_code[code] for code in date_column.codes)),
+            raw_totals=raw_totals,
+            extras=extras,
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def value(self, name: str, pos: int) -> object:
+        """Return the stored value of ``name`` for entry ``pos`` (``MISSING`` if absent)."""
+
+        if name == "id":
+            return self.ids[pos]
+        if name == "invoice_number":
+            return self.invoice_numbers[pos]
+        if name == "total":
+            if pos in self.raw_totals:
+                return self.raw_totals[pos]
+            return self.totals[pos]
+        column = self.columns.get(name)
+        if column is not None:
+            return column.value(pos)
+        extra = self.extras.get(pos)
+        if extra is not None and name in extra:
+            return extra[name]
+        return MISSING
+
+    def row(self, pos: int) -> "IndexRow":
+        return IndexRow(self, pos)
+
+    def rows(self, positions: Iterable[int] | None = None) -> list["IndexRow"]:
+        if positions is None:
+            positions = range(len(self))
+        return [IndexRow(self, pos) for pos in positions]
+
+    def to_dicts(self) -> list[dict[str, object]]:
+        return [IndexRow(self, pos).to_dict() for pos in range(len(self))]
+
+    def _primary_column(self, sort_by: str) -> tuple[CategoricalColumn, list[object]]:
+        """Categorical column behind a date/customer sort plus its per-code sort value."""
+
+        if sort_by == "customer":
+            column = self.columns["customer"]
+            return column, column.derive(lambda value: _as_str(value).lower())
+        column = self.columns["due_date" if sort_by == "due_date" else "invoice_date"]
+        return column, column.derive(_as_str)
+
+    def sort_key(self, sort_by: str) -> Callable[[int], tuple[object, ...]]:
+        """Per-position key equal to ``index_sort_key(sort_by)`` on the entry dict."""
+
+        ids = self.id_keys
+        numbers = self.number_keys
+        if sort_by == "invoice_number":
+            return lambda pos: (numbers[pos], ids[pos])
+        if sort_by == "total":
+            totals = self.totals
+            return lambda pos: (totals[pos], numbers[pos], ids[pos])
+
+        column, primary = self._primary_column(sort_by)
+        codes = column.codes
+        return lambda pos: (primary[codes[pos]], numbers[pos], ids[pos])
+
+    def sorted_positions(
+        self,
+        sort_by: str,
+        direction: str = "asc",
+        positions: Iterable[int] | None = None,
+    ) -> list[int]:
+        """Order ``positions`` (default: all) by ``sort_by``.
+
+        Sorts are stable, so one pass per key component from least to most significant
+        compares plain strings/floats instead of building a tuple per entry.
+        """
+
+        ordered = list(range(len(self)) if positions is None else positions)
+        reverse = direction == "desc"
+        ordered.sort(key=self.id_keys.__getitem__, reverse=reverse)
+        ordered.sort(key=self.number_keys.__getitem__, reverse=reverse)
+        if sort_by == "invoice_number":
+            return ordered
+        if sort_by == "total":
+            ordered.sort(key=self.totals.__getitem__, reverse=reverse)
+            return ordered
+
+        column, primary = self._primary_column(sort_by)
+        # Rank distinct sort values once so the final pass compares small ints.
+        rank_of = {value: rank for rank, value in enumerate(sorted(set(primary)))}
+        rank_by_code = [rank_of[value] for value in primary]
+        codes = column.codes
+        ordered.sort(key=lambda pos: rank_by_code[codes[pos]], reverse=reverse)
+        return ordered
+
+    def filter_positions(
+        self,
+        *,
+        status: str | None = None,
+        payment_status: str | None = None,
+        customer_query: str | None = None,
+        invoice_date_from: date | None = None,
+        invoice_date_to: date | None = None,
+    ) -> list[int]:
+        """Positions matching every filter, in entry order, by scanning code arrays."""
+
+        positions: Iterable[int] = range(len(self))
+        for name, wanted in (("status", status), ("payment_status", payment_status)):
+            if wanted:
+                column = self.columns[name]
+                allowed = column.codes_where(lambda value: value == wanted)
+                codes = column.codes
+                positions = [pos for pos in positions if codes[pos] in allowed]
+        if customer_query:
+            needle = customer_query.lower()
+            column = self.columns["customer"]
+            allowed = column.codes_where(lambda value: needle in _as_str(value).lower())
+            codes = column.codes
+            positions = [pos for pos in positions if codes[pos] in allowed]
+        if invoice_date_from or invoice_date_to:
+            lo = invoice_date_from.toordinal() if invoice_date_from else 0
+            hi = invoice_date_to.toordinal() if invoice_date_to else sys.maxsize
+            ordinals = self.invoice_date_ordinals
+            positions = [pos for pos in positions if ordinals[pos] >= 0 and lo <= ordinals[pos] <= hi]
+        return list(positions)
+
+
+class IndexRow(Mapping):
+    """Read-only mapping view of one entry in a :class:`ColumnarIndex`."""
+
+    __slots__ = ("_index", "_pos")
+
+    def __init__(self, index: ColumnarIndex, pos: int):
+        self._index = index
+        self._pos = pos
+
+    def __getitem__(self, key: str) -> object:
+        value = self._index.value(key, self._pos)
+        if value is MISSING:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        for name in INDEX_FIELDS:
+            if self._index.value(name, self._pos) is not MISSING:
+                yield name
+        yield from self._index.extras.get(self._pos, ())
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def to_dict(self) -> dict[str, object]:
+        return {key: self[key] for key in self}
+
+    def __repr__(self) -> str:
+        return f"IndexRow({self.to_dict()!r})"
+
+
+__all__ = [
+    "CATEGORICAL_FIELDS",
+    "INDEX_FIELDS",
+    "MISSING",
+    "CategoricalColumn",
+    "ColumnarIndex",
+    "IndexRow",
+]
@@ -0,0 +1,692 @@
+"""Index cache and query helpers shared by MCP tools, the web UI and storage engines."""
+from __future__ import annotations
+
+import json
+import logging
+import threading
+from bisect import bisect_left, bisect_right
+from array import array
+from collections.abc import Mapping
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from itertools import islice
+from typing import Callable, Iterable, Iterator, Optional, Sequence
+
+from .invoices_binindex import (
+    BINARY_INDEX_FILENAME,
+    BinaryIndex,
+    binary_index_enabled,
+    write_binary_index,
+)
+from .invoices_columns import MISSING, ColumnarIndex, IndexRow
+from .invoices_models import PaymentStatus
+from .invoices_storage import (
+    INDEX_FILENAME,
+    IndexSignature as _Signature,
+    get_invoice_root,
+    parsed_index,
+)
+
+_LOGGER = logging.getLogger("bridge.backends.invoices_index")
+
+SortKey = tuple[object, ...]
+
+# Filtered result sets at most 1/N of the index are sorted directly instead of
+# walking a full pre-sorted view.
+_SPARSE_CANDIDATE_RATIO = 8
+
+
+def coerce_total(entry: dict) -> float:
+    """Convert an invoice entry's ``total`` field to a float safely."""
+
+    try:
+        return float(entry.get("total", 0) or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+# Every key ends with the invoice id so keys are unique and usable as cursors.
+_SORT_KEY_FUNCS: dict[str, Callable[[dict], SortKey]] = {
+    "invoice_date": lambda entry: (
+        str(entry.get("invoice_date", "")),
+        str(entry.get("invoice_number", "")),
+        str(entry.get("id", "")),
+    ),
+    "customer": lambda entry: (
+        str(entry.get("customer", "")).lower(),
+        str(entry.get("invoice_number", "")),
+        str(entry.get("id", "")),
+    ),
+    "invoice_number": lambda entry: (
+        str(entry.get("invoice_number", "")),
+        str(entry.get("id", "")),
+    ),
+    "total": lambda entry: (
+        coerce_total(entry),
+        str(entry.get("invoice_number", "")),
+        str(entry.get("id", "")),
+    ),
+    "due_date": lambda entry: (
+        str(entry.get("due_date", "")),
+        str(entry.get("invoice_number", "")),
+        str(entry.get("id", "")),
+    ),
+}
+
+
+# Types of the components of each sort key, for validating client-supplied cursors.
+_SORT_KEY_TYPES: dict[str, tuple[type | tuple[type, ...], ...]] = {
+    "invoice_date": (str, str, str),
+    "customer": (str, str, str),
+    "invoice_number": (str, str),
+    "total": ((int, float), str, str),
+    "due_date": (str, str, str),
+}
+
+
+def is_valid_sort_key(sort_by: str, key: Sequence[object]) -> bool:
+    """Whether ``key`` has the shape of a sort key for ``sort_by`` (e.g. from a cursor)."""
+
+    types = _SORT_KEY_TYPES.get(sort_by, _SORT_KEY_TYPES["invoice_date"])
+    return len(key) == len(types) and all(
+        isinstance(value, expected) and not isinstance(value, bool)
+        for value, expected in zip(key, types)
+    )
+
+
+def _lowered(value: object) -> str:
+    return "" if value is MISSING else str(value).lower()
+
+
+def index_sort_key(sort_by: str) -> Callable[[dict], SortKey]:
+    """Return the key function used to order index entries for ``sort_by``."""
+
+    return _SORT_KEY_FUNCS.get(sort_by, _SORT_KEY_FUNCS["invoice_date"])
+
+
+@dataclass(slots=True)
+class IndexPage:
+    """One page of index entries returned by a storage engine query."""
+
+    entries: list[Mapping[str, object]]
+    total_count: int | None
+    has_more: bool
+    next_key: SortKey | None = None
+
+
+@dataclass(slots=True)
+class SortedView:
+    """Entry positions pre-sorted ascending by one sort key.
+
+    Keys are recomputed from the columns on demand (for cursor bisects and the
+    last entry of a page) instead of being stored for every entry.
+    """
+
+    positions: array
+    key: Callable[[int], SortKey]
+
+    @classmethod
+    def build(cls, columns: ColumnarIndex, sort_by: str) -> "SortedView":
+        return cls(
+            positions=array("I", columns.sorted_positions(sort_by)),
+            key=columns.sort_key(sort_by),
+        )
+
+    def walk(self, direction: str, after: SortKey | None = None) -> Iterator[int]:
+        """Yield positions in ``direction`` order, starting just past ``after``."""
+
+        positions = self.positions
+        if direction == "desc":
+            start = len(positions) if after is None else bisect_left(positions, after, key=self.key)
+            for idx in range(start - 1, -1, -1):
+                yield positions[idx]
+        else:
+            start = 0 if after is None else bisect_right(positions, after, key=self.key)
+            for idx in range(start, len(positions)):
+                yield positions[idx]
+
+
+@dataclass(slots=True)
+class SecondaryIndexes:
+    """Filter structures over one snapshot's entries, addressed by entry position.
+
+    Equality filters are id-sets per value, the invoice date is a sorted ordinal column
+    searched with bisect, and customer names are grouped by their lowercased form so a
+    substring query scans distinct names instead of every entry.
+    """
+
+    by_status: dict[object, frozenset[int]]
+    by_payment_status: dict[object, frozenset[int]]
+    date_ordinals: list[int]
+    date_positions: list[int]
+    by_customer: dict[str, frozenset[int]]
+
+    @staticmethod
+    def _group(values: list[object], codes: Iterable[int]) -> dict[object, frozenset[int]]:
+        grouped: dict[object, set[int]] = {}
+        for pos, code in enumerate(codes):
+            grouped.setdefault(values[code], set()).add(pos)
+        return {key: frozenset(value) for key, value in grouped.items()}
+
+    @classmethod
+    def build(cls, columns: ColumnarIndex) -> "SecondaryIndexes":
+        status = columns.columns["status"]
+        payment_status = columns.columns["payment_status"]
+        customer = columns.columns["customer"]
+        dated = sorted(
+            (ordinal, pos)
+            for pos, ordinal in enumerate(columns.invoice_date_ordinals)
+            if ordinal >= 0
+        )
+        return cls(
+            by_status=cls._group(status.values, status.codes),
+            by_payment_status=cls._group(payment_status.values, payment_status.codes),
+            date_ordinals=[ordinal for ordinal, _ in dated],
+            date_positions=[pos for _, pos in dated],
+            by_customer=cls._group(customer.derive(_lowered), customer.codes),  # type: ignore[arg-type]
+        )
+
+    def candidates(
+        self,
+        *,
+        status: str | None = None,
+        payment_status: str | None = None,
+        customer_query: str | None = None,
+        invoice_date_from: date | None = None,
+        invoice_date_to: date | None = None,
+    ) -> set[int] | frozenset[int] | None:
+        """Return positions matching every given filter, or ``None`` if none are set."""
+
+        sets: list[set[int] | frozenset[int]] = []
+        if status:
+            sets.append(self.by_status.get(status, frozenset()))
+        if payment_status:
+            sets.append(self.by_payment_status.get(payment_status, frozenset()))
+        if customer_query:
+            needle = customer_query.lower()
+            matched: set[int] = set()
+            for name, positions in self.by_customer.items():
+                if needle in name:
+                    matched.update(positions)
+            sets.append(matched)
+        if invoice_date_from or invoice_date_to:
+            lo = 0
+            hi = len(self.date_ordinals)
+            if invoice_date_from:
+                lo = bisect_left(self.date_ordinals, invoice_date_from.toordinal())
+            if invoice_date_to:
+                hi = bisect_right(self.date_ordinals, invoice_date_to.toordinal())
+            sets.append(set(self.date_positions[lo:hi]))
+
+        if not sets:
+            return None
+        sets.sort(key=len)
+        result = set(sets[0])
+        for other in sets[1:]:
+            result.intersection_update(other)
+            if not result:
+                break
+        return result
+
+
+class IndexSnapshot:
+    """One parsed version of the index held as columns, plus lazily built views.
+
+    The parsed entry dicts are dropped once the columns are built; ``payload``
+    re-materializes them on first access for callers that need the raw export.
+    Snapshots opened from index.bin keep the mapped file and only build columns
+    when a query needs them (filters); plain pages decode just their rows.
+    """
+
+    __slots__ = ("binary", "signature", "_columns", "_payload", "_views", "_secondary", "_lock")
+
+    def __init__(
+        self,
+        payload: dict[str, object] | None = None,
+        signature: _Signature | None = None,
+        *,
+        columns: ColumnarIndex | None = None,
+        binary: BinaryIndex | None = None,
+    ):
+        if columns is None and binary is None:
+            entries = (payload or {}).get("invoices", [])
+            columns = ColumnarIndex.from_entries(entries)  # type: ignore[arg-type]
+        self.binary = binary
+        self.signature = signature
+        self._columns = columns
+        self._payload: dict[str, object] | None = None
+        self._views: dict[str, SortedView] = {}
+        self._secondary: SecondaryIndexes | None = None
+        self._lock = threading.RLock()
+
+    @property
+    def columns(self) -> ColumnarIndex:
+        with self._lock:
+            if self._columns is None:
+                assert self.binary is not None
+                self._columns = self.binary.to_columns()
+            return self._columns
+
+    @property
+    def has_columns(self) -> bool:
+        return self._columns is not None
+
+    @property
+    def count(self) -> int:
+        if self._columns is None and self.binary is not None:
+            return self.binary.count
+        return len(self.columns)
+
+    @property
+    def payload(self) -> dict[str, object]:
+        with self._lock:
+            if self._payload is None:
+                self._payload = {"count": self.count, "invoices": self.columns.to_dicts()}
+            return self._payload
+
+    def sorted_view(self, sort_by: str) -> SortedView:
+        with self._lock:
+            view = self._views.get(sort_by)
+            if view is None:
+                columns = self.columns
+                stored = self.binary.order(sort_by) if self.binary is not None else None
+                if stored is not None:
+                    view = SortedView(positions=array("I", stored), key=columns.sort_key(sort_by))
+                else:
+                    view = SortedView.build(columns, sort_by)
+                self._views[sort_by] = view
+            return view
+
+    def secondary(self) -> SecondaryIndexes:
+        with self._lock:
+            if self._secondary is None:
+                self._secondary = SecondaryIndexes.build(self.columns)
+            return self._secondary
+
+
+class IndexCache:
+    """Cache parsed index payloads, revalidated with a cheap ``stat()`` per read.
+
+    index.json is replaced atomically by ``save_index``, so a changed mtime, size or
+    inode reliably signals a new version. Returned payloads are shared between
+    callers and must be treated as read-only.
+
+    With MAD_INVOICE_INDEX_FORMAT=binary, index.bin is used while the signature it
+    records matches index.json. Otherwise the read is answered from index.json and
+    index.bin is re-encoded from that snapshot on a background thread, outside the
+    index lock, so neither writers nor the reader wait for the encoding.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: dict[Path, IndexSnapshot] = {}
+        self._encoders: dict[Path, threading.Thread] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def snapshot(self, root: Optional[Path] = None) -> IndexSnapshot:
+        invoice_root = get_invoice_root(root)
+        index_path = invoice_root / INDEX_FILENAME
+        try:
+            st = index_path.stat()
+        except FileNotFoundError:
+            with self._lock:
+                self._entries.pop(index_path, None)
+            return IndexSnapshot(payload={"count": 0, "invoices": []})
+        signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+
+        binary_path = invoice_root / BINARY_INDEX_FILENAME
+        if binary_index_enabled():
+            snapshot = self._binary_snapshot(binary_path, signature)
+            if snapshot is not None:
+                return snapshot
+
+        snapshot = self._json_snapshot(root, index_path, signature)
+        if binary_index_enabled() and snapshot.signature is not None:
+            self._encode_binary(binary_path, snapshot)
+        return snapshot
+
+    def _json_snapshot(
+        self, root: Optional[Path], index_path: Path, signature: _Signature
+    ) -> IndexSnapshot:
+        with self._lock:
+            cached = self._entries.get(index_path)
+            if cached is not None and cached.signature == signature:
+                self.hits += 1
+                return cached
+
+        # A write from this process leaves its parsed index behind; only files
+        # written elsewhere are parsed.
+        payload = parsed_index(root, signature)
+        if payload is None:
+            try:
+                with index_path.open("r", encoding="utf-8") as handle:
+                    payload = json.load(handle)
+            except FileNotFoundError:
+                return IndexSnapshot(payload={"count": 0, "invoices": []})
+
+        snapshot = IndexSnapshot(payload=payload, signature=signature)
+        with self._lock:
+            self.misses += 1
+            self._entries[index_path] = snapshot
+        return snapshot
+
+    def _binary_snapshot(self, binary_path: Path, source: _Signature) -> IndexSnapshot | None:
+        """Snapshot backed by index.bin, or ``None`` if it is missing or stale."""
+
+        try:
+            st = binary_path.stat()
+        except FileNotFoundError:
+            return None
+        signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+
+        with self._lock:
+            cached = self._entries.get(binary_path)
+            if (
+                cached is not None
+                and cached.signature == signature
+                and cached.binary is not None
+                and cached.binary.source == source
+            ):
+                self.hits += 1
+                return cached
+
+        try:
+            binary = BinaryIndex.open(binary_path)
+        except (FileNotFoundError, ValueError):
+            return None
+        if binary.source != source:
+            return None
+
+        snapshot = IndexSnapshot(signature=signature, binary=binary)
+        with self._lock:
+            self.misses += 1
+            self._entries[binary_path] = snapshot
+        return snapshot
+
+    def _encode_binary(self, binary_path: Path, snapshot: IndexSnapshot) -> None:
+        """Start re-encoding index.bin from ``snapshot`` unless an encoding is running.
+
+        Encodings are not serialized with writes: one that finishes after index.json
+        moved on records an old signature and is simply ignored and redone.
+        """
+
+        with self._lock:
+            if binary_path in self._encoders:
+                return
+            thread = threading.Thread(
+                target=self._write_binary,
+                args=(binary_path, snapshot),
+                name="index-bin-encoder",
+            )
+            self._encoders[binary_path] = thread
+        thread.start()
+
+    def _write_binary(self, binary_path: Path, snapshot: IndexSnapshot) -> None:
+        try:
+            write_binary_index(binary_path, snapshot.columns, source=snapshot.signature)
+        except OSError:
+            _LOGGER.warning("Could not write %s", binary_path, exc_info=True)
+        finally:
+            with self._lock:
+                self._encoders.pop(binary_path, None)
+
+    def wait_for_binary(self, timeout: float | None = None) -> None:
+        """Block until running index.bin encodings finish (tests, benchmarks)."""
+
+        with self._lock:
+            threads = list(self._encoders.values())
+        for thread in threads:
+            thread.join(timeout)
+
+    def load(self, root: Optional[Path] = None) -> dict[str, object]:
+        return self.snapshot(root).payload
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "cached_indexes": len(self._entries),
+            }
+
+
+INDEX_CACHE = IndexCache()
+
+
+def _sort_index_entries(
+    entries: list[Mapping] | ColumnarIndex, sort_by: str, direction: str
+) -> list[Mapping]:
+    if isinstance(entries, ColumnarIndex):
+        return entries.rows(entries.sorted_positions(sort_by, direction))
+    reverse = direction == "desc"
+    return sorted(entries, key=index_sort_key(sort_by), reverse=reverse)
+
+
+def _entry_matcher(
+    *,
+    status: str | None = None,
+    payment_status: PaymentStatus | None = None,
+    customer_query: str | None = None,
+    invoice_date_from: date | None = None,
+    invoice_date_to: date | None = None,
+) -> Callable[[dict], bool] | None:
+    """Build a predicate for the given filters, or ``None`` when nothing is filtered."""
+
+    if not (status or payment_status or customer_query or invoice_date_from or invoice_date_to):
+        return None
+
+    needle = customer_query.lower() if customer_query else None
+
+    def _matches(entry: dict) -> bool:
+        if status and entry.get("status") != status:
+            return False
+        if payment_status and entry.get("payment_status") != payment_status:
+            return False
+
+        if needle and needle not in str(entry.get("customer", "")).lower():
+            return False
+
+        if invoice_date_from or invoice_date_to:
+            try:
+                invoice_date_value = date.fromisoformat(str(entry.get("invoice_date")))
+            except Exception:
+                return False
+            if invoice_date_from and invoice_date_value < invoice_date_from:
+                return False
+            if invoice_date_to and invoice_date_value > invoice_date_to:
+                return False
+
+        return True
+
+    return _matches
+
+
+def _filter_index_entries(
+    entries: list[Mapping] | ColumnarIndex,
+    *,
+    status: str | None = None,
+    payment_status: PaymentStatus | None = None,
+    customer_query: str | None = None,
+    invoice_date_from: date | None = None,
+    invoice_date_to: date | None = None,
+) -> list[Mapping]:
+    if isinstance(entries, ColumnarIndex):
+        return entries.rows(
+            entries.filter_positions(
+                status=status,
+                payment_status=payment_status,
+                customer_query=customer_query,
+                invoice_date_from=invoice_date_from,
+                invoice_date_to=invoice_date_to,
+            )
+        )
+    matches = _entry_matcher(
+        status=status,
+        payment_status=payment_status,
+        customer_query=customer_query,
+        invoice_date_from=invoice_date_from,
+        invoice_date_to=invoice_date_to,
+    )
+    if matches is None:
+        return list(entries)
+    return [entry for entry in entries if matches(entry)]
+
+
+def _query_binary_page(
+    binary: BinaryIndex,
+    *,
+    sort_by: str,
+    direction: str,
+    limit: int | None,
+    offset: int,
+    after: SortKey | None,
+    include_total_count: bool,
+) -> IndexPage | None:
+    """Serve an unfiltered page straight from index.bin's stored sort order.
+
+    Only the page's records (plus ~log2(n) records for a cursor bisect) are
+    decoded. Returns ``None`` when the file has no order for ``sort_by``.
+    """
+
+    order = binary.order(sort_by if sort_by in _SORT_KEY_FUNCS else "invoice_date")
+    if order is None:
+        return None
+
+    key_func = index_sort_key(sort_by)
+    count = len(order)
+    if direction == "desc":
+        end = count
+        if after is not None:
+            end = bisect_left(order, after, key=lambda pos: key_func(binary.entry(pos)))
+        first = end - 1 - offset
+        slots = range(first, -1 if limit is None else max(first - limit - 1, -1), -1)
+    else:
+        begin = 0
+        if after is not None:
+            begin = bisect_right(order, after, key=lambda pos: key_func(binary.entry(pos)))
+        first = begin + offset
+        slots = range(first, count if limit is None else min(first + limit + 1, count))
+
+    positions = [order[slot] for slot in slots]
+    has_more = limit is not None and len(positions) > limit
+    entries = [binary.entry(pos) for pos in positions[:limit]]
+    return IndexPage(
+        entries=entries,  # type: ignore[arg-type]
+        total_count=count if include_total_count else None,
+        has_more=has_more,
+        next_key=key_func(entries[-1]) if has_more else None,
+    )
+
+
+def query_index_snapshot(
+    snapshot: IndexSnapshot,
+    *,
+    status: str | None = None,
+    payment_status: PaymentStatus | None = None,
+    customer_query: str | None = None,
+    invoice_date_from: date | None = None,
+    invoice_date_to: date | None = None,
+    sort_by: str = "invoice_date",
+    direction: str = "desc",
+    limit: int | None,
+    offset: int = 0,
+    after: SortKey | None = None,
+    include_total_count: bool = True,
+) -> IndexPage:
+    """Page through a cached snapshot using its secondary indexes and sorted views.
+
+    ``limit=None`` returns every match from ``offset`` on, all from this snapshot.
+
+    Filters are answered by intersecting candidate position sets. Small candidate
+    sets are sorted directly; otherwise the pre-sorted view is walked, starting with a
+    binary search when ``after`` (a cursor key) is given.
+    """
+
+    filtered = status or payment_status or customer_query or invoice_date_from or invoice_date_to
+    if snapshot.binary is not None and not snapshot.has_columns and not filtered:
+        page = _query_binary_page(
+            snapshot.binary,
+            sort_by=sort_by,
+            direction=direction,
+            limit=limit,
+            offset=offset,
+            after=after,
+            include_total_count=include_total_count,
+        )
+        if page is not None:
+            return page
+
+    columns = snapshot.columns
+    candidates = snapshot.secondary().candidates(
+        status=status,
+        payment_status=payment_status,
+        customer_query=customer_query,
+        invoice_date_from=invoice_date_from,
+        invoice_date_to=invoice_date_to,
+    )
+
+    key_func = columns.sort_key(sort_by)
+    ordered: Iterable[int]
+    if candidates is not None and len(candidates) * _SPARSE_CANDIDATE_RATIO <= len(columns):
+        remaining: Iterable[int] = candidates
+        if after is not None:
+            descending = direction == "desc"
+            remaining = [
+                pos
+                for pos in candidates
+                if (key_func(pos) < after if descending else key_func(pos) > after)
+            ]
+        ordered = columns.sorted_positions(sort_by, direction, remaining)
+    else:
+        walk = snapshot.sorted_view(sort_by).walk(direction, after)
+        if candidates is None:
+            ordered = walk
+        else:
+            ordered = (pos for pos in walk if pos in candidates)
+
+    stop = None if limit is None else offset + limit + 1
+    positions = list(islice(ordered, offset, stop))
+    has_more = limit is not None and len(positions) > limit
+    if has_more:
+        del positions[limit:]
+
+    total_count = None
+    if include_total_count:
+        total_count = len(columns) if candidates is None else len(candidates)
+
+    return IndexPage(
+        entries=[IndexRow(columns, pos) for pos in positions],
+        total_count=total_count,
+        has_more=has_more,
+        next_key=key_func(positions[-1]) if has_more else None,
+    )
+
+
+def load_index_payload(root: Optional[Path] = None) -> dict[str, object]:
+    """Return the parsed index.json for ``root``, reusing the shared cache."""
+
+    return INDEX_CACHE.load(root)
+
+
+__all__ = [
+    "INDEX_CACHE",
+    "IndexCache",
+    "IndexPage",
+    "IndexSnapshot",
+    "SecondaryIndexes",
+    "SortKey",
+    "is_valid_sort_key",
+    "SortedView",
+    "coerce_total",
+    "index_sort_key",
+    "load_index_payload",
+    "query_index_snapshot",
+]
@@ -0,0 +1,209 @@
+"""Precompiled pdflatex format for the static part of the invoice preamble.
+
+Loading scrartcl, babel, fontenc, lmodern, microtype and the other packages of
+``templates/invoice.tex`` dominates a render. The template's leading lines up to
+the first ``%%PLACEHOLDER%%`` (or ``\\begin{document}``) never change between
+invoices, so they are dumped once into a ``.fmt`` file (the mylatexformat
+approach) cached under ``.mad_invoice/formats/``. Renders then compile only the
+remaining source on top of that format.
+
+The format name embeds a hash of the static preamble and the pdflatex version,
+so template edits and TeX upgrades produce a new format. A failed build is
+remembered next to the cache, and until it is retried renders fall back to the
+full source: after a day when pdflatex rejected the preamble, after a few
+minutes when the build timed out or pdflatex could not be started.
+Set ``MAD_INVOICE_PRECOMPILED_PREAMBLE=0`` to disable.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from .invoices_storage import get_invoice_root
+from .invoices_template import PLACEHOLDER_PATTERN
+
+PRECOMPILED_PREAMBLE_ENV_VAR = "MAD_INVOICE_PRECOMPILED_PREAMBLE"
+FORMATS_DIRNAME = "formats"
+
+_LOGGER = logging.getLogger("bridge.backends.invoices_latex_format")
+_BEGIN_DOCUMENT = "\\begin{document}"
+# Seconds before a failed format build is attempted again.
+RETRY_REJECTED_AFTER_S = 24 * 3600
+RETRY_ERROR_AFTER_S = 300
+
+
+def precompiled_preamble_enabled() -> bool:
+    value = os.getenv(PRECOMPILED_PREAMBLE_ENV_VAR, "").strip().lower()
+    return value not in {"0", "false", "no", "off"}
+
+
+def static_preamble(template_source: str) -> str:
+    """Leading template lines that contain no placeholder, up to ``\\begin{document}``.
+
+    Returns an empty string when the template does not start with such a block.
+    """
+
+    lines = template_source.splitlines(keepends=True)
+    static: list[str] = []
+    for line in lines:
+        if PLACEHOLDER_PATTERN.search(line) or line.lstrip().startswith(_BEGIN_DOCUMENT):
+            break
+        static.append(line)
+    preamble = "".join(static)
+    if "\\documentclass" not in preamble:
+        return ""
+    return preamble
+
+
+@dataclass(frozen=True, slots=True)
+class LatexFormat:
+    """A dumped format: pass ``-fmt=<name>`` with ``TEXFORMATS`` including ``directory``."""
+
+    name: str
+    directory: Path
+    preamble: str
+
+    @property
+    def path(self) -> Path:
+        return self.directory / f"{self.name}.fmt"
+
+    def environment(self) -> dict[str, str]:
+        # The trailing separator keeps kpathsea's default search path.
+        return {**os.environ, "TEXFORMATS": f"{self.directory}{os.pathsep}"}
+
+
+def _formats_dir(root: Optional[Path]) -> Path:
+    return get_invoice_root(root) / FORMATS_DIRNAME
+
+
+def _format_name(preamble: str, engine_version: str) -> str:
+    digest = hashlib.sha256()
+    digest.update(engine_version.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(preamble.encode("utf-8"))
+    return f"invoice-preamble-{digest.hexdigest()[:16]}"
+
+
+def _build_format(pdflatex: str, fmt: LatexFormat) -> Optional[bool]:
+    """Dump the format to ``fmt.path``; ``True`` on success.
+
+    Returns ``False`` when pdflatex rejected the preamble and ``None`` on errors
+    that may go away (timeout, pdflatex not runnable).
+    """
+
+    fmt.directory.mkdir(parents=True, exist_ok=True)
+    scratch = Path(tempfile.mkdtemp(dir=fmt.directory, prefix=f".{fmt.name}."))
+    try:
+        (scratch / "preamble.tex").write_text(fmt.preamble + "\n\\dump\n", encoding="utf-8")
+        result = subprocess.run(
+            [
+                pdflatex,
+                "-ini",
+                "-interaction=nonstopmode",
+                f"-jobname={fmt.name}",
+                "&pdflatex",
+                "preamble.tex",
+            ],
+            cwd=scratch,
+            capture_output=True,
+            encoding="utf-8",
+            errors="replace",
+            timeout=300,
+        )
+        built = scratch / f"{fmt.name}.fmt"
+        if result.returncode != 0 or not built.is_file():
+            _LOGGER.warning(
+                "Building the invoice preamble format failed; rendering without it",
+                extra={"stdout": result.stdout[-2000:], "returncode": result.returncode},
+            )
+            return False
+        os.replace(built, fmt.path)
+        return True
+    except (OSError, subprocess.SubprocessError) as exc:
+        _LOGGER.warning("Building the invoice preamble format failed: %s", exc)
+        return None
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def _failed_marker(fmt: LatexFormat) -> Path:
+    return fmt.directory / f"{fmt.name}.failed"
+
+
+def _retry_pending(marker: Path) -> bool:
+    """Whether a recorded failure is still within its retry delay."""
+
+    try:
+        retry_at = float(json.loads(marker.read_text(encoding="utf-8"))["retry_at"])
+    except FileNotFoundError:
+        return False
+    except (OSError, ValueError, KeyError, TypeError):
+        # Markers from older versions carry no retry time: try again.
+        return False
+    return time.time() < retry_at
+
+
+def _record_failure(marker: Path, rejected: bool) -> None:
+    delay = RETRY_REJECTED_AFTER_S if rejected else RETRY_ERROR_AFTER_S
+    payload = {"reason": "rejected" if rejected else "error", "retry_at": time.time() + delay}
+    marker.parent.mkdir(parents=True, exist_ok=True)
+    marker.write_text(json.dumps(payload), encoding="utf-8")
+
+
+def ensure_format(
+    pdflatex: str,
+    template_source: str,
+    engine_version: str,
+    root: Optional[Path] = None,
+) -> Optional[LatexFormat]:
+    """Return the cached format for the template's static preamble, building it once.
+
+    Returns ``None`` when disabled, when the template has no static preamble, or
+    when building failed for this preamble and pdflatex version and the retry
+    delay has not passed yet.
+    """
+
+    if not precompiled_preamble_enabled():
+        return None
+    preamble = static_preamble(template_source)
+    if not preamble:
+        return None
+
+    fmt = LatexFormat(
+        name=_format_name(preamble, engine_version),
+        directory=_formats_dir(root),
+        preamble=preamble,
+    )
+    if fmt.path.is_file():
+        return fmt
+    failed_marker = _failed_marker(fmt)
+    if _retry_pending(failed_marker):
+        return None
+    # Concurrent builders each use their own scratch directory; the last rename wins.
+    built = _build_format(pdflatex, fmt)
+    if built:
+        failed_marker.unlink(missing_ok=True)
+        return fmt
+    _record_failure(failed_marker, rejected=built is False)
+    return None
+
+
+__all__ = [
+    "FORMATS_DIRNAME",
+    "LatexFormat",
+    "PRECOMPILED_PREAMBLE_ENV_VAR",
+    "RETRY_ERROR_AFTER_S",
+    "RETRY_REJECTED_AFTER_S",
+    "ensure_format",
+    "precompiled_preamble_enabled",
+    "static_preamble",
+]
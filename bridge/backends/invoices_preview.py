@@ -0,0 +1,35 @@
+"""HTML rendition of an invoice for instant previews, without pdflatex.
+
+``templates/invoice_preview.html`` mirrors the layout of ``templates/invoice.tex``
+(A4 page, same margins, blocks and wording) with print CSS, so a draft can be
+checked in the browser or printed. Values come from the same data model as the
+LaTeX replacements and are HTML-escaped by Jinja2. The PDF stays the final
+output.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Mapping
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+PREVIEW_TEMPLATE_NAME = "invoice_preview.html"
+
+_TEMPLATE_DIR = Path(__file__).resolve().parents[2] / "templates"
+# auto_reload re-reads the template when its mtime changes, like TEMPLATE_CACHE.
+_ENVIRONMENT = Environment(
+    loader=FileSystemLoader(str(_TEMPLATE_DIR)),
+    autoescape=select_autoescape(["html"]),
+    auto_reload=True,
+    trim_blocks=True,
+    lstrip_blocks=True,
+)
+
+
+def render_preview_html(context: Mapping[str, Any]) -> str:
+    """Render the preview template with ``context``."""
+
+    return _ENVIRONMENT.get_template(PREVIEW_TEMPLATE_NAME).render(**context)
+
+
+__all__ = ["PREVIEW_TEMPLATE_NAME", "render_preview_html"]
@@ -0,0 +1,94 @@
+"""Full index rebuilds, optionally fanned out over a process pool."""
+from __future__ import annotations
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from .invoices_search import invoice_trigrams
+from .invoices_storage import ensure_structure, iter_invoice_paths, load_invoice_by_path
+
+DEFAULT_CHUNK_SIZE = 256
+
+# (index entry, sorted search trigrams) per invoice, and (path, message) per bad file.
+_ChunkResult = tuple[list[tuple[dict[str, object], list[str]]], list[tuple[str, str]]]
+
+
+@dataclass(slots=True)
+class RebuildScan:
+    """Everything a full rebuild derives from the invoice files, in deterministic order."""
+
+    entries: list[dict[str, object]]
+    documents: dict[str, set[str]]
+    errors: list[dict[str, str]]
+
+
+def resolve_workers(workers: int | None) -> int:
+    """Map a requested worker count to a usable one (``0``/``None`` = all cores)."""
+
+    if not workers or workers < 0:
+        return os.cpu_count() or 1
+    return workers
+
+
+def _scan_chunk(paths: list[str]) -> _ChunkResult:
+    """Load and validate one chunk of invoice files (runs in worker processes)."""
+
+    results: list[tuple[dict[str, object], list[str]]] = []
+    errors: list[tuple[str, str]] = []
+    for name in paths:
+        try:
+            invoice = load_invoice_by_path(Path(name))
+        except (OSError, ValueError) as exc:
+            # json.JSONDecodeError and pydantic's ValidationError are ValueErrors.
+            summary = str(exc).splitlines()[0] if str(exc) else ""
+            errors.append((name, f"{type(exc).__name__}: {summary}"))
+            continue
+        results.append((invoice.to_index_entry(), sorted(invoice_trigrams(invoice))))
+    return results, errors
+
+
+def scan_invoices(
+    root: Optional[Path] = None,
+    *,
+    workers: int = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> RebuildScan:
+    """Read every invoice file and derive index entries and search documents.
+
+    With ``workers > 1`` the files are split into chunks and validated in a
+    ``ProcessPoolExecutor``. Chunks come back in submission order and entries are
+    sorted by id afterwards, so the result does not depend on scheduling.
+    Unreadable or invalid files are listed in ``errors`` instead of aborting.
+    """
+
+    ensure_structure(root)
+    paths = [str(path) for path in iter_invoice_paths(root)]
+    chunks = [paths[start : start + chunk_size] for start in range(0, len(paths), chunk_size)]
+
+    if workers > 1 and len(chunks) > 1:
+        # spawn: forking a threaded server process can deadlock on inherited locks.
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), mp_context=context) as pool:
+            outcomes = list(pool.map(_scan_chunk, chunks))
+    else:
+        outcomes = [_scan_chunk(chunk) for chunk in chunks]
+
+    entries: list[dict[str, object]] = []
+    documents: dict[str, set[str]] = {}
+    errors: list[dict[str, str]] = []
+    for results, chunk_errors in outcomes:
+        for entry, grams in results:
+            entries.append(entry)
+            documents[str(entry["id"])] = set(grams)
+        errors.extend({"path": path, "error": message} for path, message in chunk_errors)
+
+    entries.sort(key=lambda entry: entry["id"])
+    errors.sort(key=lambda error: error["path"])
+    return RebuildScan(entries=entries, documents=documents, errors=errors)
+
+
+__all__ = ["DEFAULT_CHUNK_SIZE", "RebuildScan", "resolve_workers", "scan_invoices"]
@@ -0,0 +1,115 @@
+"""Skip pdflatex when an invoice's rendered PDF is already up to date.
+
+Each successful render records a key in ``build/<id>/render.json``: a SHA-256
+over the generated TeX source, the template file and the pdflatex version. A
+later render with the same key reuses ``invoice.pdf`` as long as the file is
+still the one that render produced (same size and mtime).
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import subprocess
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+RENDER_MANIFEST_FILENAME = "render.json"
+RENDER_CACHE_VERSION = 1
+
+
+@lru_cache(maxsize=8)
+def _version_for(pdflatex_path: str, mtime_ns: int) -> str:
+    try:
+        result = subprocess.run(
+            [pdflatex_path, "--version"],
+            capture_output=True,
+            encoding="utf-8",
+            errors="replace",
+            timeout=30,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return f"{pdflatex_path}@{mtime_ns}"
+    first_line = result.stdout.strip().splitlines()[:1]
+    return first_line[0] if first_line else f"{pdflatex_path}@{mtime_ns}"
+
+
+def pdflatex_version(pdflatex_path: str) -> str:
+    """First line of ``pdflatex --version``; re-queried when the binary changes."""
+
+    try:
+        mtime_ns = os.stat(pdflatex_path).st_mtime_ns
+    except OSError:
+        mtime_ns = 0
+    return _version_for(pdflatex_path, mtime_ns)
+
+
+def render_cache_key(tex_source: str, template_bytes: bytes, engine_version: str) -> str:
+    digest = hashlib.sha256()
+    for part in (
+        str(RENDER_CACHE_VERSION).encode(),
+        tex_source.encode("utf-8"),
+        template_bytes,
+        engine_version.encode("utf-8"),
+    ):
+        # Length-prefix each part so boundaries cannot shift between inputs.
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def _manifest_path(build_dir: Path) -> Path:
+    return build_dir / RENDER_MANIFEST_FILENAME
+
+
+def cached_pdf(build_dir: Path, key: str) -> Optional[Path]:
+    """Return the PDF recorded for ``key`` if it is still on disk unchanged."""
+
+    try:
+        manifest = json.loads(_manifest_path(build_dir).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or manifest.get("key") != key:
+        return None
+
+    pdf_path = build_dir / str(manifest.get("pdf", ""))
+    try:
+        st = pdf_path.stat()
+    except OSError:
+        return None
+    if st.st_size != manifest.get("size") or st.st_mtime_ns != manifest.get("mtime_ns"):
+        return None
+    return pdf_path
+
+
+def record_render(build_dir: Path, key: str, pdf_path: Path) -> None:
+    """Remember that ``pdf_path`` was rendered from inputs hashing to ``key``."""
+
+    st = pdf_path.stat()
+    payload = {
+        "key": key,
+        "pdf": pdf_path.name,
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+    }
+    manifest = _manifest_path(build_dir)
+    tmp = manifest.with_name(f".{manifest.name}.tmp")
+    tmp.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    os.replace(tmp, manifest)
+
+
+def invalidate_render(build_dir: Path) -> None:
+    """Forget the recorded render, e.g. before pdflatex rewrites the PDF."""
+
+    _manifest_path(build_dir).unlink(missing_ok=True)
+
+
+__all__ = [
+    "RENDER_MANIFEST_FILENAME",
+    "cached_pdf",
+    "invalidate_render",
+    "pdflatex_version",
+    "record_render",
+    "render_cache_key",
+]
@@ -0,0 +1,293 @@
+"""Background render jobs on a bounded worker pool, and render coalescing.
+
+``render_invoice_pdf(background=True)`` and the web UI submit renders here and
+return immediately with a job id; ``get_render_job`` reports the job's status,
+timings and result. pdflatex runs as a subprocess, so worker threads spend their
+time waiting on it rather than holding the GIL.
+
+``MAD_INVOICE_RENDER_WORKERS`` (default 2) sets the pool size and
+``MAD_INVOICE_RENDER_QUEUE_LIMIT`` (default 64) caps queued plus running jobs;
+submissions beyond that are rejected instead of piling up.
+
+Every render, queued or not, goes through :data:`RENDER_FLIGHTS`, so a web click
+and an agent call rendering the same invoice content share one pdflatex run.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Literal, Optional
+
+from ..utils.config import env_positive_int
+
+RENDER_WORKERS_ENV_VAR = "MAD_INVOICE_RENDER_WORKERS"
+RENDER_QUEUE_LIMIT_ENV_VAR = "MAD_INVOICE_RENDER_QUEUE_LIMIT"
+DEFAULT_RENDER_WORKERS = 2
+DEFAULT_RENDER_QUEUE_LIMIT = 64
+# Finished jobs kept for get_render_job; the oldest are dropped first.
+FINISHED_JOB_HISTORY = 256
+
+JobStatus = Literal["queued", "running", "succeeded", "failed"]
+
+_LOGGER = logging.getLogger("bridge.backends.invoices_render_jobs")
+
+
+class RenderQueueFull(RuntimeError):
+    """Raised when the render queue already holds its maximum number of jobs."""
+
+
+@dataclass(slots=True)
+class RenderJob:
+    """One submitted render; timestamps are UNIX seconds."""
+
+    id: str
+    invoice_id: str
+    status: JobStatus = "queued"
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[dict[str, Any]] = None
+    error: Optional[str] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    def to_dict(self) -> dict[str, Any]:
+        queued_s = None
+        run_s = None
+        if self.started_at is not None:
+            queued_s = round(self.started_at - self.submitted_at, 3)
+            if self.finished_at is not None:
+                run_s = round(self.finished_at - self.started_at, 3)
+        return {
+            "job_id": self.id,
+            "invoice_id": self.invoice_id,
+            "status": self.status,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "queued_s": queued_s,
+            "run_s": run_s,
+            "pdf_path": (self.result or {}).get("pdf_path"),
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class RenderQueue:
+    """Thread pool plus a job table; ``stats()`` exposes depth and utilization."""
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="render")
+        self._lock = threading.Lock()
+        self._jobs: OrderedDict[str, RenderJob] = OrderedDict()
+        self._queued = 0
+        self._running = 0
+        self._submitted = 0
+        self._succeeded = 0
+        self._failed = 0
+        self._rejected = 0
+
+    def submit(self, invoice_id: str, render: Callable[[], dict[str, Any]]) -> RenderJob:
+        """Queue ``render`` for ``invoice_id``; raises :class:`RenderQueueFull` when at capacity."""
+
+        with self._lock:
+            if self._queued + self._running >= self.max_pending:
+                self._rejected += 1
+                raise RenderQueueFull(
+                    f"Render queue is full ({self.max_pending} jobs queued or running)"
+                )
+            job = RenderJob(id=uuid.uuid4().hex, invoice_id=invoice_id)
+            self._jobs[job.id] = job
+            self._queued += 1
+            self._submitted += 1
+        self._executor.submit(self._run, job, render)
+        return job
+
+    def _run(self, job: RenderJob, render: Callable[[], dict[str, Any]]) -> None:
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+            job.status = "running"
+            job.started_at = time.time()
+        try:
+            result = render()
+        except Exception as exc:  # noqa: BLE001 - reported through the job
+            _LOGGER.warning("Render job failed", extra={"job_id": job.id, "invoice_id": job.invoice_id})
+            outcome: tuple[JobStatus, Optional[dict[str, Any]], Optional[str]] = (
+                "failed",
+                None,
+                str(exc) or type(exc).__name__,
+            )
+        else:
+            outcome = ("succeeded", result, None)
+        with self._lock:
+            self._running -= 1
+            job.status, job.result, job.error = outcome
+            job.finished_at = time.time()
+            if job.status == "succeeded":
+                self._succeeded += 1
+            else:
+                self._failed += 1
+            self._prune()
+
+    def _prune(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[: max(0, len(finished) - FINISHED_JOB_HISTORY)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[RenderJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def wait(self, job_id: str, timeout: float | None = None, poll: float = 0.02) -> Optional[RenderJob]:
+        """Block until the job finishes (or ``timeout`` passes); mainly for tests and scripts."""
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            if job is None or job.done:
+                return job
+            if deadline is not None and time.monotonic() >= deadline:
+                return job
+            time.sleep(poll)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "queued": self._queued,
+                "running": self._running,
+                "utilization": round(self._running / self.workers, 3),
+                "submitted": self._submitted,
+                "succeeded": self._succeeded,
+                "failed": self._failed,
+                "rejected": self._rejected,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Optional[dict[str, Any]] = None
+        self.error: Optional[BaseException] = None
+
+
+class RenderSingleFlight:
+    """Coalesce concurrent renders of the same invoice content within this process.
+
+    Calls with the same ``(invoice_id, content_key)`` while one is running wait for
+    it and share its result instead of running pdflatex again. Calls for the same
+    invoice with different content run one after another, since they share
+    ``build/<id>/``.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._flights: dict[tuple[str, str], _Flight] = {}
+        self._invoice_locks: dict[str, tuple[threading.Lock, int]] = {}
+        self._leaders = 0
+        self._coalesced = 0
+
+    def run(
+        self, invoice_id: str, content_key: str, render: Callable[[], dict[str, Any]]
+    ) -> dict[str, Any]:
+        key = (invoice_id, content_key)
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                self._coalesced += 1
+                leader = False
+            else:
+                flight = self._flights[key] = _Flight()
+                self._leaders += 1
+                leader = True
+                invoice_lock, users = self._invoice_locks.get(invoice_id, (threading.Lock(), 0))
+                self._invoice_locks[invoice_id] = (invoice_lock, users + 1)
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return {**(flight.result or {}), "coalesced": True}
+
+        try:
+            with invoice_lock:
+                flight.result = render()
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                lock, users = self._invoice_locks[invoice_id]
+                if users == 1:
+                    del self._invoice_locks[invoice_id]
+                else:
+                    self._invoice_locks[invoice_id] = (lock, users - 1)
+            flight.done.set()
+        return {**flight.result, "coalesced": False}
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "in_flight": len(self._flights),
+                "renders": self._leaders,
+                "coalesced": self._coalesced,
+            }
+
+
+RENDER_FLIGHTS = RenderSingleFlight()
+
+_QUEUE: Optional[RenderQueue] = None
+_QUEUE_LOCK = threading.Lock()
+
+
+def get_render_queue() -> RenderQueue:
+    """Process-wide render queue, created on first use from the environment."""
+
+    global _QUEUE
+    with _QUEUE_LOCK:
+        if _QUEUE is None:
+            _QUEUE = RenderQueue(
+                workers=env_positive_int(RENDER_WORKERS_ENV_VAR, default=DEFAULT_RENDER_WORKERS),
+                max_pending=env_positive_int(
+                    RENDER_QUEUE_LIMIT_ENV_VAR, default=DEFAULT_RENDER_QUEUE_LIMIT
+                ),
+            )
+        return _QUEUE
+
+
+def reset_render_queue() -> None:
+    """Shut down the current queue so the next call re-reads the environment (tests)."""
+
+    global _QUEUE
+    with _QUEUE_LOCK:
+        queue, _QUEUE = _QUEUE, None
+    if queue is not None:
+        queue.shutdown(wait=True)
+
+
+__all__ = [
+    "RENDER_FLIGHTS",
+    "RenderJob",
+    "RenderQueue",
+    "RenderQueueFull",
+    "RenderSingleFlight",
+    "get_render_queue",
+    "reset_render_queue",
+]
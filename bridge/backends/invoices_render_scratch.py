@@ -0,0 +1,126 @@
+"""Compile invoices in a RAM-backed scratch directory and persist only the PDF.
+
+By default pdflatex runs in ``.mad_invoice/build/<id>/`` and leaves ``invoice.tex``,
+``.aux``, ``.log`` and ``.out`` next to the PDF, on the same volume as the data.
+On Docker bind mounts (notably on macOS hosts) and network storage every one of
+those writes is slow. With ``MAD_INVOICE_RENDER_SCRATCH`` set, each render runs
+in a fresh directory under ``/dev/shm`` (``1``/``tmpfs``) or under the given path,
+and only ``invoice.pdf`` is moved into ``build/<id>/`` with an atomic rename.
+The ``.aux`` file also travels between ``build/<id>/`` and the scratch directory,
+so re-renders whose page references did not move still need one pass.
+
+``MAD_INVOICE_KEEP_RENDER_SOURCES=1`` also copies the intermediates back, for
+debugging; they are copied even when pdflatex fails.
+"""
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+RENDER_SCRATCH_ENV_VAR = "MAD_INVOICE_RENDER_SCRATCH"
+KEEP_RENDER_SOURCES_ENV_VAR = "MAD_INVOICE_KEEP_RENDER_SOURCES"
+# Files pdflatex leaves behind that are worth keeping for debugging.
+INTERMEDIATE_SUFFIXES = (".tex", ".aux", ".log", ".out")
+
+_DEFAULT_TMPFS = Path("/dev/shm")
+_DISABLED = {"", "0", "false", "no", "off"}
+_DEFAULT_LOCATION = {"1", "true", "yes", "on", "tmpfs", "shm"}
+
+
+def render_scratch_root() -> Optional[Path]:
+    """Directory under which scratch renders run, or ``None`` to render in place.
+
+    ``/dev/shm`` is used when it exists and is writable, the system temp
+    directory otherwise.
+    """
+
+    value = os.getenv(RENDER_SCRATCH_ENV_VAR, "").strip()
+    if value.lower() in _DISABLED:
+        return None
+    if value.lower() in _DEFAULT_LOCATION:
+        if _DEFAULT_TMPFS.is_dir() and os.access(_DEFAULT_TMPFS, os.W_OK):
+            return _DEFAULT_TMPFS
+        return Path(tempfile.gettempdir())
+    return Path(value).expanduser()
+
+
+def keep_render_sources() -> bool:
+    value = os.getenv(KEEP_RENDER_SOURCES_ENV_VAR, "").strip().lower()
+    return value not in _DISABLED
+
+
+@contextmanager
+def scratch_build_dir(invoice_id: str, scratch_root: Path) -> Iterator[Path]:
+    """A private directory for one render, removed afterwards."""
+
+    scratch_root.mkdir(parents=True, exist_ok=True)
+    path = Path(tempfile.mkdtemp(dir=scratch_root, prefix=f"mad-invoice-{invoice_id}-"))
+    try:
+        yield path
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def persist_file(source: Path, target: Path) -> None:
+    """Place ``source`` at ``target`` atomically, also across filesystems.
+
+    The copy goes to a temporary file next to ``target`` first, so readers never
+    see a partially written PDF.
+    """
+
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.")
+    os.close(fd)
+    tmp = Path(tmp_name)
+    try:
+        shutil.copyfile(source, tmp)
+        os.replace(tmp, target)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def restore_aux(build_dir: Path, scratch_dir: Path, stem: str) -> None:
+    """Seed ``scratch_dir`` with the ``.aux`` of the previous render, if any."""
+
+    previous = build_dir / f"{stem}.aux"
+    if previous.is_file():
+        shutil.copyfile(previous, scratch_dir / previous.name)
+
+
+def persist_aux(scratch_dir: Path, build_dir: Path, stem: str) -> None:
+    """Keep the ``.aux`` written in ``scratch_dir`` for the next render."""
+
+    aux = scratch_dir / f"{stem}.aux"
+    if aux.is_file():
+        persist_file(aux, build_dir / aux.name)
+
+
+def persist_sources(scratch_dir: Path, build_dir: Path) -> list[Path]:
+    """Copy the render intermediates from ``scratch_dir`` into ``build_dir``."""
+
+    copied = []
+    for path in sorted(scratch_dir.iterdir()):
+        if path.is_file() and path.suffix in INTERMEDIATE_SUFFIXES:
+            target = build_dir / path.name
+            shutil.copyfile(path, target)
+            copied.append(target)
+    return copied
+
+
+__all__ = [
+    "INTERMEDIATE_SUFFIXES",
+    "KEEP_RENDER_SOURCES_ENV_VAR",
+    "RENDER_SCRATCH_ENV_VAR",
+    "keep_render_sources",
+    "persist_aux",
+    "persist_file",
+    "persist_sources",
+    "render_scratch_root",
+    "restore_aux",
+    "scratch_build_dir",
+]
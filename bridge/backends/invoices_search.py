@@ -0,0 +1,358 @@
+"""Persistent trigram index for free-text invoice search.
+
+``search_index.json`` holds each invoice's trigrams; the postings are derived
+when it is loaded. Saves append the changed invoice to ``search_index.journal``
+instead of rewriting the file, and the journal is folded back in once it grows.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import re
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, Optional
+
+from .invoices_models import Invoice
+from .invoices_storage import _write_json_atomic, get_invoice_root
+
+SEARCH_INDEX_FILENAME = "search_index.json"
+# Per-invoice changes since search_index.json was last written, one JSON line each.
+SEARCH_JOURNAL_FILENAME = "search_index.journal"
+SEARCH_INDEX_VERSION = 2
+DEFAULT_MIN_SCORE = 0.5
+# The journal is folded into search_index.json once it is larger than this and
+# than half of search_index.json.
+JOURNAL_COMPACT_MIN_BYTES = 256 * 1024
+
+_LOGGER = logging.getLogger("bridge.backends.invoices_search")
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _normalize(text: str) -> str:
+    return _WHITESPACE.sub(" ", text.lower()).strip()
+
+
+def trigrams(text: str) -> set[str]:
+    """Return the padded character trigrams of ``text`` (lowercased, whitespace collapsed)."""
+
+    normalized = _normalize(text)
+    if not normalized:
+        return set()
+    padded = f"  {normalized} "
+    return {padded[pos : pos + 3] for pos in range(len(padded) - 2)}
+
+
+def searchable_text(invoice: Invoice) -> list[str]:
+    """Fields covered by full-text search: customer, project and line items."""
+
+    fields = [invoice.customer.name]
+    if invoice.customer.business_name:
+        fields.append(invoice.customer.business_name)
+    if invoice.project:
+        fields.append(invoice.project)
+    fields.extend(item.description for item in invoice.items)
+    return fields
+
+
+def invoice_trigrams(invoice: Invoice) -> set[str]:
+    grams: set[str] = set()
+    for text in searchable_text(invoice):
+        grams.update(trigrams(text))
+    return grams
+
+
+def rank_hits(
+    hits: dict[str, int], query_size: int, *, limit: int, min_score: float = DEFAULT_MIN_SCORE
+) -> list[tuple[str, float]]:
+    """Turn per-invoice trigram hit counts into ``(id, score)`` pairs, best first.
+
+    The score is the share of query trigrams an invoice contains, so an exact
+    substring match scores 1.0 and typos degrade gracefully. Ties keep id order.
+    """
+
+    ranked = [
+        (invoice_id, round(count / query_size, 4))
+        for invoice_id, count in hits.items()
+        if count / query_size >= min_score
+    ]
+    ranked.sort(key=lambda pair: (-pair[1], pair[0]))
+    return ranked[:limit]
+
+
+@dataclass(slots=True)
+class SearchIndex:
+    """Inverted index from trigram to invoice ids, plus each invoice's trigrams for removal.
+
+    Instances are shared between readers and the journal replay, so every access
+    goes through ``lock``.
+    """
+
+    documents: dict[str, set[str]] = field(default_factory=dict)
+    postings: dict[str, set[str]] = field(default_factory=dict)
+    lock: threading.RLock = field(default_factory=threading.RLock, repr=False, compare=False)
+
+    def add(self, invoice: Invoice) -> None:
+        self.apply(invoice.id, invoice_trigrams(invoice))
+
+    def remove(self, invoice_id: str) -> None:
+        self.apply(invoice_id, None)
+
+    def apply(self, invoice_id: str, grams: set[str] | None) -> None:
+        """Set the trigrams of one invoice; ``None`` removes it."""
+
+        with self.lock:
+            previous = self.documents.pop(invoice_id, None) or set()
+            for gram in previous - (grams or set()):
+                ids = self.postings.get(gram)
+                if ids is None:
+                    continue
+                ids.discard(invoice_id)
+                if not ids:
+                    del self.postings[gram]
+            if grams is None:
+                return
+            self.documents[invoice_id] = grams
+            for gram in grams - previous:
+                self.postings.setdefault(gram, set()).add(invoice_id)
+
+    def trigrams_of(self, invoice_id: str) -> set[str] | None:
+        with self.lock:
+            return self.documents.get(invoice_id)
+
+    def search(
+        self, query: str, *, limit: int, min_score: float = DEFAULT_MIN_SCORE
+    ) -> list[tuple[str, float]]:
+        """Rank invoices by the share of query trigrams they contain."""
+
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+
+        hits: dict[str, int] = {}
+        with self.lock:
+            for gram in query_grams:
+                for invoice_id in self.postings.get(gram, ()):
+                    hits[invoice_id] = hits.get(invoice_id, 0) + 1
+        return rank_hits(hits, len(query_grams), limit=limit, min_score=min_score)
+
+    def to_payload(self) -> dict[str, object]:
+        # Postings are derived from the documents when the file is loaded.
+        with self.lock:
+            return {
+                "version": SEARCH_INDEX_VERSION,
+                "documents": {key: sorted(value) for key, value in self.documents.items()},
+            }
+
+    @classmethod
+    def from_payload(cls, payload: dict) -> "SearchIndex":
+        # Version 1 files also stored the postings; they are rebuilt from the documents.
+        if payload.get("version") not in {1, SEARCH_INDEX_VERSION}:
+            raise ValueError(f"Unsupported search index version: {payload.get('version')!r}")
+        return cls.from_documents(
+            {key: set(value) for key, value in payload.get("documents", {}).items()}
+        )
+
+    @classmethod
+    def build(cls, invoices: Iterable[Invoice]) -> "SearchIndex":
+        index = cls()
+        for invoice in invoices:
+            index.add(invoice)
+        return index
+
+    @classmethod
+    def from_documents(cls, documents: dict[str, set[str]]) -> "SearchIndex":
+        """Build from precomputed ``{invoice_id: trigrams}`` (e.g. a parallel rebuild scan)."""
+
+        postings: dict[str, set[str]] = {}
+        for invoice_id, grams in documents.items():
+            for gram in grams:
+                postings.setdefault(gram, set()).add(invoice_id)
+        return cls(documents=dict(documents), postings=postings)
+
+
+def _search_index_path(root: Optional[Path]) -> Path:
+    return get_invoice_root(root) / SEARCH_INDEX_FILENAME
+
+
+def _journal_path(root: Optional[Path]) -> Path:
+    return get_invoice_root(root) / SEARCH_JOURNAL_FILENAME
+
+
+@dataclass(slots=True)
+class _CachedSearchIndex:
+    signature: tuple[int, int, int]
+    index: SearchIndex
+    # Bytes of the journal already applied to ``index``.
+    journal_offset: int = 0
+
+
+class _SearchIndexCache:
+    """Keep the parsed search index per file and replay new journal lines into it.
+
+    A changed search_index.json (new inode, mtime or size) is reloaded in full;
+    otherwise only journal bytes appended since the last lookup are read.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: dict[Path, _CachedSearchIndex] = {}
+
+    def load(self, root: Optional[Path]) -> SearchIndex | None:
+        path = _search_index_path(root)
+        journal = _journal_path(root)
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return None
+        signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+
+        with self._lock:
+            cached = self._entries.get(path)
+            if cached is not None and cached.signature == signature:
+                if _replay_journal(cached, journal):
+                    return cached.index
+
+        try:
+            with path.open("r", encoding="utf-8") as handle:
+                cached = _CachedSearchIndex(signature, SearchIndex.from_payload(json.load(handle)))
+        except (FileNotFoundError, json.JSONDecodeError, ValueError):
+            return None
+
+        with self._lock:
+            _replay_journal(cached, journal)
+            self._entries[path] = cached
+        return cached.index
+
+
+def _replay_journal(cached: _CachedSearchIndex, journal: Path) -> bool:
+    """Apply journal lines past ``journal_offset``; ``False`` if the journal shrank."""
+
+    try:
+        size = journal.stat().st_size
+    except FileNotFoundError:
+        size = 0
+    if size < cached.journal_offset:
+        return False
+    if size == cached.journal_offset:
+        return True
+
+    with journal.open("rb") as handle:
+        handle.seek(cached.journal_offset)
+        data = handle.read(size - cached.journal_offset)
+    # A line still being appended by another process is picked up next time.
+    complete = data.rfind(b"\n") + 1
+    for line in data[:complete].splitlines():
+        try:
+            record = json.loads(line)
+            grams = record["trigrams"]
+            cached.index.apply(str(record["id"]), None if grams is None else set(grams))
+        except (json.JSONDecodeError, KeyError, TypeError):
+            _LOGGER.warning("Skipping unreadable search journal line in %s", journal)
+    cached.journal_offset += complete
+    return True
+
+
+_CACHE = _SearchIndexCache()
+
+
+def load_search_index(root: Optional[Path] = None) -> SearchIndex | None:
+    """Return the persisted search index, or ``None`` if it is missing or unreadable."""
+
+    return _CACHE.load(root)
+
+
+def save_search_index(index: SearchIndex, root: Optional[Path] = None) -> None:
+    """Write the whole index and drop the journal it supersedes."""
+
+    _write_json_atomic(_search_index_path(root), index.to_payload(), indent=None)
+    _journal_path(root).unlink(missing_ok=True)
+
+
+def _append_journal(root: Optional[Path], invoice_id: str, grams: set[str] | None) -> None:
+    record = {"id": invoice_id, "trigrams": None if grams is None else sorted(grams)}
+    journal = _journal_path(root)
+    with journal.open("a", encoding="utf-8") as handle:
+        handle.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    # Fold the journal back into search_index.json once it outgrows it.
+    try:
+        journal_size = journal.stat().st_size
+        base_size = _search_index_path(root).stat().st_size
+    except FileNotFoundError:
+        return
+    if journal_size > max(JOURNAL_COMPACT_MIN_BYTES, base_size // 2):
+        index = load_search_index(root)
+        if index is not None:
+            save_search_index(index, root)
+
+
+def update_search_index(
+    invoice: Invoice,
+    root: Optional[Path] = None,
+    *,
+    rebuild_from: Iterable[Invoice] | None = None,
+) -> None:
+    """Add or replace one invoice in the persisted search index.
+
+    Callers must hold ``with_index_lock``. Saves that leave the searchable text
+    unchanged (status or payment updates) do not touch the index; other changes
+    append one line to the journal. When no index exists yet it is built from
+    ``rebuild_from`` first, so older stores get a complete index on first write.
+    """
+
+    index = load_search_index(root)
+    if index is None:
+        index = SearchIndex.build(rebuild_from or ())
+        index.add(invoice)
+        save_search_index(index, root)
+        return
+
+    grams = invoice_trigrams(invoice)
+    if index.trigrams_of(invoice.id) == grams:
+        return
+    _append_journal(root, invoice.id, grams)
+
+
+def remove_from_search_index(
+    invoice_id: str,
+    root: Optional[Path] = None,
+    *,
+    rebuild_from: Iterable[Invoice] | None = None,
+) -> None:
+    """Drop one invoice from the persisted search index. Callers must hold ``with_index_lock``."""
+
+    index = load_search_index(root)
+    if index is None:
+        index = SearchIndex.build(rebuild_from or ())
+        index.remove(invoice_id)
+        save_search_index(index, root)
+        return
+
+    if index.trigrams_of(invoice_id) is not None:
+        _append_journal(root, invoice_id, None)
+
+
+def rebuild_search_index(invoices: Iterable[Invoice], root: Optional[Path] = None) -> SearchIndex:
+    index = SearchIndex.build(invoices)
+    save_search_index(index, root)
+    return index
+
+
+__all__ = [
+    "DEFAULT_MIN_SCORE",
+    "SEARCH_INDEX_FILENAME",
+    "SEARCH_JOURNAL_FILENAME",
+    "SearchIndex",
+    "invoice_trigrams",
+    "load_search_index",
+    "rank_hits",
+    "rebuild_search_index",
+    "remove_from_search_index",
+    "save_search_index",
+    "searchable_text",
+    "trigrams",
+    "update_search_index",
+]
@@ -0,0 +1,411 @@
+"""SQLite storage engine for invoices (opt-in via MAD_INVOICE_STORAGE=sqlite)."""
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date
+from pathlib import Path
+from typing import Iterator, Optional
+
+from .invoices_index import IndexPage, SortKey, index_sort_key
+from .invoices_models import Invoice, PaymentStatus
+from .invoices_search import invoice_trigrams, rank_hits, trigrams
+from .invoices_storage import (
+    ensure_structure,
+    get_invoice_root,
+    iter_invoice_paths,
+    load_invoice_by_path,
+)
+
+DATABASE_FILENAME = "invoices.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS invoices (
+    id TEXT PRIMARY KEY,
+    invoice_number TEXT NOT NULL,
+    status TEXT NOT NULL,
+    payment_status TEXT NOT NULL,
+    invoice_date TEXT NOT NULL,
+    due_date TEXT NOT NULL,
+    customer TEXT NOT NULL,
+    customer_lower TEXT NOT NULL,
+    total REAL NOT NULL,
+    currency TEXT NOT NULL,
+    vat_rate REAL NOT NULL,
+    small_business INTEGER NOT NULL,
+    language TEXT NOT NULL,
+    date_style TEXT,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS invoices_by_date ON invoices (invoice_date, invoice_number);
+CREATE INDEX IF NOT EXISTS invoices_by_number ON invoices (invoice_number);
+CREATE INDEX IF NOT EXISTS invoices_by_customer ON invoices (customer_lower, invoice_number);
+CREATE INDEX IF NOT EXISTS invoices_by_total ON invoices (total, invoice_number);
+CREATE INDEX IF NOT EXISTS invoices_by_status ON invoices (status, payment_status, invoice_date);
+CREATE TABLE IF NOT EXISTS search_trigrams (
+    trigram TEXT NOT NULL,
+    id TEXT NOT NULL,
+    PRIMARY KEY (trigram, id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS search_trigrams_by_id ON search_trigrams (id);
+CREATE TABLE IF NOT EXISTS sequence (
+    year TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+_INDEX_COLUMNS = (
+    "id",
+    "invoice_number",
+    "status",
+    "invoice_date",
+    "due_date",
+    "customer",
+    "total",
+    "currency",
+    "payment_status",
+    "vat_rate",
+    "small_business",
+    "language",
+    "date_style",
+)
+
+# Column tuples mirror the key functions in invoices_index.index_sort_key.
+_SORT_COLUMNS: dict[str, tuple[str, ...]] = {
+    "invoice_date": ("invoice_date", "invoice_number", "id"),
+    "customer": ("customer_lower", "invoice_number", "id"),
+    "invoice_number": ("invoice_number", "id"),
+    "total": ("total", "invoice_number", "id"),
+    "due_date": ("due_date", "invoice_number", "id"),
+}
+
+_LOCAL = threading.local()
+
+
+def get_database_path(root: Optional[Path] = None) -> Path:
+    return get_invoice_root(root) / DATABASE_FILENAME
+
+
+def _connect(db_path: Path) -> sqlite3.Connection:
+    """Return a per-thread connection for ``db_path``, creating the schema once."""
+
+    connections: dict[Path, sqlite3.Connection] | None = getattr(_LOCAL, "connections", None)
+    if connections is None:
+        connections = {}
+        _LOCAL.connections = connections
+
+    conn = connections.get(db_path)
+    if conn is not None:
+        return conn
+
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=5, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(_SCHEMA)
+    connections[db_path] = conn
+    return conn
+
+
+@contextmanager
+def _transaction(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    """Run statements in one write transaction (connections use autocommit mode)."""
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def _row_values(invoice: Invoice) -> tuple[object, ...]:
+    entry = invoice.to_index_entry()
+    return (
+        entry["id"],
+        entry["invoice_number"],
+        entry["status"],
+        entry["payment_status"],
+        entry["invoice_date"],
+        entry["due_date"],
+        entry["customer"],
+        str(entry["customer"]).lower(),
+        entry["total"],
+        entry["currency"],
+        entry["vat_rate"],
+        int(bool(entry["small_business"])),
+        entry["language"],
+        entry["date_style"],
+        json.dumps(invoice.model_dump(mode="json"), sort_keys=True),
+    )
+
+
+_UPSERT_SQL = """
+INSERT INTO invoices (
+    id, invoice_number, status, payment_status, invoice_date, due_date,
+    customer, customer_lower, total, currency, vat_rate, small_business,
+    language, date_style, payload
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(id) DO UPDATE SET
+    invoice_number = excluded.invoice_number,
+    status = excluded.status,
+    payment_status = excluded.payment_status,
+    invoice_date = excluded.invoice_date,
+    due_date = excluded.due_date,
+    customer = excluded.customer,
+    customer_lower = excluded.customer_lower,
+    total = excluded.total,
+    currency = excluded.currency,
+    vat_rate = excluded.vat_rate,
+    small_business = excluded.small_business,
+    language = excluded.language,
+    date_style = excluded.date_style,
+    payload = excluded.payload
+"""
+
+
+def _write_invoice(conn: sqlite3.Connection, invoice: Invoice) -> None:
+    """Upsert the invoice row and its search trigrams (call inside ``_transaction``)."""
+
+    conn.execute(_UPSERT_SQL, _row_values(invoice))
+    conn.execute("DELETE FROM search_trigrams WHERE id = ?", (invoice.id,))
+    conn.executemany(
+        "INSERT INTO search_trigrams (trigram, id) VALUES (?, ?)",
+        ((gram, invoice.id) for gram in invoice_trigrams(invoice)),
+    )
+
+
+def _entry_from_row(row: sqlite3.Row) -> dict[str, object]:
+    entry = {column: row[column] for column in _INDEX_COLUMNS}
+    entry["small_business"] = bool(entry["small_business"])
+    return entry
+
+
+class SqliteInvoiceStore:
+    """Invoice store backed by a single SQLite database in WAL mode.
+
+    The ``invoices`` table doubles as the index: summary columns are indexed for
+    filtering and sorting while the full invoice JSON lives in ``payload``.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, root: Optional[Path] = None):
+        self.root = root
+
+    @property
+    def database_path(self) -> Path:
+        return get_database_path(self.root)
+
+    def _conn(self) -> sqlite3.Connection:
+        ensure_structure(self.root)
+        return _connect(self.database_path)
+
+    def invoice_location(self, invoice_id: str) -> str:
+        return f"{self.database_path}#invoices/{invoice_id}"
+
+    def index_location(self) -> str:
+        return str(self.database_path)
+
+    def sequence_location(self) -> str:
+        return f"{self.database_path}#sequence"
+
+    def load_invoice(self, invoice_id: str) -> Invoice:
+        row = self._conn().execute(
+            "SELECT payload FROM invoices WHERE id = ?", (invoice_id,)
+        ).fetchone()
+        if row is None:
+            raise FileNotFoundError(f"Invoice {invoice_id} not found in {self.database_path}")
+        return Invoice.model_validate(json.loads(row["payload"]))
+
+    def invoice_exists(self, invoice_id: str) -> bool:
+        row = self._conn().execute(
+            "SELECT 1 FROM invoices WHERE id = ?", (invoice_id,)
+        ).fetchone()
+        return row is not None
+
+    def save_invoice(self, invoice: Invoice) -> None:
+        conn = self._conn()
+        with _transaction(conn):
+            _write_invoice(conn, invoice)
+
+    def delete_invoice(self, invoice_id: str) -> None:
+        conn = self._conn()
+        with _transaction(conn):
+            conn.execute("DELETE FROM invoices WHERE id = ?", (invoice_id,))
+            conn.execute("DELETE FROM search_trigrams WHERE id = ?", (invoice_id,))
+
+    def index_payload(self) -> dict[str, object]:
+        cols = ", ".join(_INDEX_COLUMNS)
+        rows = self._conn().execute(f"SELECT {cols} FROM invoices ORDER BY id").fetchall()
+        entries = [_entry_from_row(row) for row in rows]
+        return {"count": len(entries), "invoices": entries}
+
+    def invoice_count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM invoices").fetchone()[0]
+
+    def rebuild_index(self, workers: int = 1) -> dict[str, object]:
+        """Re-derive summary columns and search trigrams from the stored payloads (repair operation).
+
+        Runs as a single transaction; ``workers`` is accepted for interface parity.
+        """
+
+        conn = self._conn()
+        with _transaction(conn):
+            rows = conn.execute("SELECT payload FROM invoices").fetchall()
+            conn.execute("DELETE FROM search_trigrams")
+            for row in rows:
+                _write_invoice(conn, Invoice.model_validate(json.loads(row["payload"])))
+        return {**self.index_payload(), "errors": []}
+
+    def search(self, query: str, *, limit: int) -> list[tuple[str, float]]:
+        query_grams = sorted(trigrams(query))
+        if not query_grams:
+            return []
+        placeholders = ", ".join("?" * len(query_grams))
+        rows = self._conn().execute(
+            f"SELECT id, COUNT(*) FROM search_trigrams WHERE trigram IN ({placeholders}) GROUP BY id",
+            query_grams,
+        ).fetchall()
+        hits = {row[0]: row[1] for row in rows}
+        return rank_hits(hits, len(query_grams), limit=limit)
+
+    def query_index(
+        self,
+        *,
+        status: str | None = None,
+        payment_status: PaymentStatus | None = None,
+        customer_query: str | None = None,
+        invoice_date_from: date | None = None,
+        invoice_date_to: date | None = None,
+        sort_by: str = "invoice_date",
+        direction: str = "desc",
+        limit: int | None,
+        offset: int = 0,
+        after: SortKey | None = None,
+        include_total_count: bool = True,
+    ) -> IndexPage:
+        clauses: list[str] = []
+        params: list[object] = []
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if payment_status:
+            clauses.append("payment_status = ?")
+            params.append(payment_status)
+        if customer_query:
+            clauses.append("instr(customer_lower, ?) > 0")
+            params.append(customer_query.lower())
+        if invoice_date_from:
+            clauses.append("invoice_date >= ?")
+            params.append(invoice_date_from.isoformat())
+        if invoice_date_to:
+            clauses.append("invoice_date <= ?")
+            params.append(invoice_date_to.isoformat())
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        order = "DESC" if direction == "desc" else "ASC"
+        columns = _SORT_COLUMNS.get(sort_by, _SORT_COLUMNS["invoice_date"])
+        order_by = ", ".join(f"{column} {order}" for column in columns)
+
+        page_where = where
+        page_params = list(params)
+        if after is not None:
+            # Keyset pagination: continue strictly past the cursor's row value.
+            comparison = "<" if direction == "desc" else ">"
+            keyset = f"({', '.join(columns)}) {comparison} ({', '.join('?' * len(columns))})"
+            page_where = f"{where} AND {keyset}" if where else f" WHERE {keyset}"
+            page_params.extend(after)
+
+        conn = self._conn()
+        cols = ", ".join(_INDEX_COLUMNS)
+        rows = conn.execute(
+            f"SELECT {cols} FROM invoices{page_where} ORDER BY {order_by} LIMIT ? OFFSET ?",
+            # LIMIT -1 is unbounded in SQLite.
+            (*page_params, -1 if limit is None else limit + 1, offset),
+        ).fetchall()
+
+        total_count = None
+        if include_total_count and limit is None and offset == 0 and after is None:
+            total_count = len(rows)
+        elif include_total_count:
+            total_count = conn.execute(
+                f"SELECT COUNT(*) FROM invoices{where}", params
+            ).fetchone()[0]
+
+        entries = [_entry_from_row(row) for row in rows[:limit]]
+        has_more = limit is not None and len(rows) > limit
+        return IndexPage(
+            entries=entries,
+            total_count=total_count,
+            has_more=has_more,
+            next_key=index_sort_key(sort_by)(entries[-1]) if has_more else None,
+        )
+
+    def next_invoice_number(
+        self, year: int | None = None, separator: str | None = "-"
+    ) -> str:
+        year_str = str(year or date.today().year)
+        conn = self._conn()
+        with _transaction(conn):
+            conn.execute(
+                "INSERT INTO sequence (year, value) VALUES (?, 1) "
+                "ON CONFLICT(year) DO UPDATE SET value = value + 1",
+                (year_str,),
+            )
+            next_value = conn.execute(
+                "SELECT value FROM sequence WHERE year = ?", (year_str,)
+            ).fetchone()[0]
+
+        sep = "" if separator is None else separator
+        return f"{year_str}{sep}{next_value:04d}"
+
+
+def migrate_to_sqlite(root: Optional[Path] = None) -> dict[str, object]:
+    """Copy a JSON-file store (invoices + sequence.json) into the SQLite database.
+
+    The JSON files are left untouched. Existing rows with the same id are replaced,
+    and sequence counters never move backwards.
+    """
+
+    store = SqliteInvoiceStore(root)
+    conn = store._conn()
+
+    invoices = [load_invoice_by_path(path) for path in iter_invoice_paths(root)]
+
+    counters: dict[str, int] = {}
+    sequence_path = get_invoice_root(root) / "sequence.json"
+    if sequence_path.is_file():
+        with sequence_path.open("r", encoding="utf-8") as handle:
+            counters = {
+                str(year): int(value)
+                for year, value in json.load(handle).get("counters", {}).items()
+            }
+
+    with _transaction(conn):
+        for invoice in invoices:
+            _write_invoice(conn, invoice)
+        for year, value in counters.items():
+            conn.execute(
+                "INSERT INTO sequence (year, value) VALUES (?, ?) "
+                "ON CONFLICT(year) DO UPDATE SET value = max(value, excluded.value)",
+                (year, value),
+            )
+
+    return {
+        "database_path": str(store.database_path),
+        "invoices": len(invoices),
+        "sequence_years": sorted(counters),
+    }
+
+
+__all__ = [
+    "DATABASE_FILENAME",
+    "SqliteInvoiceStore",
+    "get_database_path",
+    "migrate_to_sqlite",
+]
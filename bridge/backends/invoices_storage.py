@@ -3,12 +3,16 @@ from __future__ import annotations
 
 import json
 import os
+import re
+import tempfile
+from bisect import bisect_left
 from datetime import date
 from pathlib import Path
 from typing import Iterator, Optional
 
 import portalocker
 
+from .invoices_binindex import BINARY_INDEX_FILENAME, binary_index_enabled, write_binary_index
 from .invoices_models import Invoice
 
 
@@ -16,6 +20,24 @@ INVOICE_ROOT_NAME = ".mad_invoice"
 INVOICES_DIRNAME = "invoices"
 INDEX_FILENAME = "index.json"
 SEQUENCE_FILENAME = "sequence.json"
+LAYOUT_ENV_VAR = "MAD_INVOICE_LAYOUT"
+# Created in invoices/ once a year shard exists, so id lookups in a flat store
+# never have to list the directory to find out.
+SHARD_MARKER_FILENAME = ".sharded"
+
+# Year shard directories under invoices/ (sharded layout: invoices/<year>/<id>.json).
+_SHARD_NAME = re.compile(r"^\d{4}$")
+_ID_YEAR = re.compile(r"^(\d{4})")
+# invoices/ directory -> (its mtime_ns when listed, shard directories).
+_SHARD_DIRS_CACHE: dict[Path, tuple[int, tuple[Path, ...]]] = {}
+
+# (st_mtime_ns, st_size, st_ino) of an index file. index.json is replaced
+# atomically, so every written version has a new signature.
+IndexSignature = tuple[int, int, int]
+# index.json path -> (signature, parsed index) as this process last wrote or read
+# it for an update. Writers replace the value instead of mutating it, so readers
+# may share it.
+_PARSED_INDEX: dict[Path, tuple[IndexSignature, dict[str, object]]] = {}
 
 
 def get_invoice_root(base_path: Optional[Path] = None) -> Path:
@@ -51,8 +73,82 @@ def ensure_structure(root: Optional[Path] = None) -> None:
     _ensure_directory(invoice_root / INVOICES_DIRNAME)
 
 
+def sharded_layout_enabled() -> bool:
+    return os.getenv(LAYOUT_ENV_VAR, "").strip().lower() == "sharded"
+
+
+def _invoices_dir(root: Optional[Path]) -> Path:
+    return get_invoice_root(root) / INVOICES_DIRNAME
+
+
+def _mark_sharded(invoices_dir: Path) -> None:
+    marker = invoices_dir / SHARD_MARKER_FILENAME
+    if not marker.exists():
+        try:
+            marker.touch()
+        except OSError:  # pragma: no cover - read-only store
+            pass
+
+
+def _shard_dirs(root: Optional[Path]) -> list[Path]:
+    """Year shard directories, cached until the mtime of invoices/ changes."""
+
+    invoices_dir = _invoices_dir(root)
+    try:
+        signature = invoices_dir.stat().st_mtime_ns
+    except FileNotFoundError:
+        return []
+    cached = _SHARD_DIRS_CACHE.get(invoices_dir)
+    if cached is not None and cached[0] == signature:
+        return list(cached[1])
+
+    shards = sorted(p for p in invoices_dir.iterdir() if _SHARD_NAME.match(p.name) and p.is_dir())
+    if shards:
+        _mark_sharded(invoices_dir)
+    _SHARD_DIRS_CACHE[invoices_dir] = (signature, tuple(shards))
+    return shards
+
+
+def _may_have_shards(root: Optional[Path]) -> bool:
+    return (
+        sharded_layout_enabled()
+        or (_invoices_dir(root) / SHARD_MARKER_FILENAME).exists()
+    )
+
+
+def _find_invoice_path(invoice_id: str, root: Optional[Path]) -> Optional[Path]:
+    """Locate an existing invoice file in the flat or the year-sharded layout.
+
+    Checks the flat location, then the shard named by the id's year prefix (ids
+    are YYYY-#### by default). Other shards are only searched when the store is
+    known to have shards, so a miss in a flat store costs a few ``stat()`` calls.
+    """
+
+    invoices_dir = _invoices_dir(root)
+    filename = f"{invoice_id}.json"
+    flat = invoices_dir / filename
+    if flat.is_file():
+        return flat
+
+    match = _ID_YEAR.match(invoice_id)
+    hinted = invoices_dir / match.group(1) / filename if match else None
+    if hinted is not None and hinted.is_file():
+        _mark_sharded(invoices_dir)
+        return hinted
+    if not _may_have_shards(root):
+        return None
+
+    for shard in reversed(_shard_dirs(root)):
+        candidate = shard / filename
+        if candidate != hinted and candidate.is_file():
+            return candidate
+    return None
+
+
 def _invoice_path(invoice_id: str, root: Optional[Path]) -> Path:
-    return get_invoice_root(root) / INVOICES_DIRNAME / f"{invoice_id}.json"
+    """Path of an existing invoice, or its flat location if it does not exist."""
+
+    return _find_invoice_path(invoice_id, root) or _invoices_dir(root) / f"{invoice_id}.json"
 
 
 def _index_path(root: Optional[Path]) -> Path:
@@ -75,17 +171,77 @@ def _write_json(path: Path, payload: dict) -> None:
         handle.write("\n")
 
 
+def _write_json_atomic(path: Path, payload: dict, *, indent: Optional[int] = 2) -> None:
+    """Write JSON via a temp file and rename so readers never see partial data.
+
+    ``indent=None`` writes compact JSON for large machine-only files.
+    """
+
+    _ensure_directory(path.parent)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    separators = None if indent is not None else (",", ":")
+    try:
+        # json.dumps (unlike json.dump) uses the C encoder for compact output.
+        text = json.dumps(payload, indent=indent, separators=separators, sort_keys=True)
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            handle.write(text)
+            handle.write("\n")
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
 def _json_ready(invoice: Invoice) -> dict:
     return invoice.model_dump(mode="json")
 
 
-def iter_invoice_paths(root: Optional[Path] = None) -> Iterator[Path]:
-    invoices_dir = get_invoice_root(root) / INVOICES_DIRNAME
+def invoice_shards(
+    root: Optional[Path] = None,
+    *,
+    invoice_date_from: Optional[date] = None,
+    invoice_date_to: Optional[date] = None,
+) -> list[Path]:
+    """Directories that can hold invoices dated within the given range.
+
+    Year shards outside the range are skipped. The flat ``invoices/`` directory is
+    always included because files there are not grouped by year.
+    """
+
+    invoices_dir = _invoices_dir(root)
     if not invoices_dir.exists():
-        return iter(())
+        return []
+    first = invoice_date_from.year if invoice_date_from else None
+    last = invoice_date_to.year if invoice_date_to else None
+    shards = [
+        shard
+        for shard in _shard_dirs(root)
+        if (first is None or int(shard.name) >= first) and (last is None or int(shard.name) <= last)
+    ]
+    return [invoices_dir, *shards]
+
+
+def iter_invoice_paths(
+    root: Optional[Path] = None,
+    *,
+    invoice_date_from: Optional[date] = None,
+    invoice_date_to: Optional[date] = None,
+) -> Iterator[Path]:
+    """Invoice files in both layouts, ordered by file name (invoice id).
+
+    With a date range, only the year shards overlapping it are listed (plus any
+    flat files); callers still filter by the invoice's own date.
+    """
 
-    paths = [p for p in invoices_dir.iterdir() if p.is_file() and p.suffix == ".json"]
-    paths.sort()
+    paths = [
+        path
+        for directory in invoice_shards(
+            root, invoice_date_from=invoice_date_from, invoice_date_to=invoice_date_to
+        )
+        for path in directory.iterdir()
+        if path.suffix == ".json" and path.is_file()
+    ]
+    paths.sort(key=lambda path: (path.name, str(path)))
     return iter(paths)
 
 
@@ -101,8 +257,21 @@ def load_invoice_by_path(path: Path) -> Invoice:
 
 
 def save_invoice(invoice: Invoice, root: Optional[Path] = None) -> None:
-    path = _invoice_path(invoice.id, root)
+    """Write the invoice file; in the sharded layout it moves with its invoice year."""
+
+    previous = _find_invoice_path(invoice.id, root)
+    if sharded_layout_enabled():
+        invoices_dir = _invoices_dir(root)
+        path = invoices_dir / f"{invoice.invoice_date.year:04d}" / f"{invoice.id}.json"
+        if not path.parent.is_dir():
+            _ensure_directory(path.parent)
+            _SHARD_DIRS_CACHE.pop(invoices_dir, None)
+        _mark_sharded(invoices_dir)
+    else:
+        path = previous or _invoices_dir(root) / f"{invoice.id}.json"
     _write_json(path, _json_ready(invoice))
+    if previous is not None and previous != path:
+        previous.unlink(missing_ok=True)
 
 
 def build_index(root: Optional[Path] = None) -> dict[str, object]:
@@ -117,8 +286,133 @@ def build_index(root: Optional[Path] = None) -> dict[str, object]:
     return {"count": len(entries), "invoices": entries}
 
 
-def save_index(index: dict[str, object], root: Optional[Path] = None) -> None:
-    _write_json(_index_path(root), index)
+def index_signature(path: Path) -> Optional[IndexSignature]:
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def parsed_index(root: Optional[Path], signature: IndexSignature) -> Optional[dict[str, object]]:
+    """The index this process last wrote, if index.json still has ``signature``.
+
+    Lets the index cache pick up a write without parsing the file again. The
+    returned dict is shared and must be treated as read-only.
+    """
+
+    state = _PARSED_INDEX.get(_index_path(root))
+    if state is not None and state[0] == signature:
+        return state[1]
+    return None
+
+
+def save_index(
+    index: dict[str, object], root: Optional[Path] = None, *, write_binary: bool = False
+) -> None:
+    """Write index.json as compact JSON.
+
+    The whole file is still serialized on every call, so single-entry writes cost
+    O(n) in the size of the index (roughly 0.1 s at 20k entries); only the parse
+    of the previous version is avoided. ``index`` is kept for the next update and for
+    the index cache and must not be mutated afterwards.
+
+    Single-entry writes leave index.bin as it is: it records the index.json it
+    was encoded from, so readers ignore it until the index cache re-encodes it in
+    the background. Rebuilds pass ``write_binary=True`` to write it right away
+    when MAD_INVOICE_INDEX_FORMAT=binary; with the JSON format it is removed.
+    """
+
+    index_path = _index_path(root)
+    _PARSED_INDEX.pop(index_path, None)
+    _write_json_atomic(index_path, index, indent=None)
+    signature = index_signature(index_path)
+    if signature is not None:
+        _PARSED_INDEX[index_path] = (signature, index)
+    binary_path = get_invoice_root(root) / BINARY_INDEX_FILENAME
+    if not binary_index_enabled():
+        binary_path.unlink(missing_ok=True)
+    elif write_binary:
+        write_binary_index(
+            binary_path, index.get("invoices", []), source=signature  # type: ignore[arg-type]
+        )
+
+
+def rebuild_index(root: Optional[Path] = None) -> dict[str, object]:
+    """Rebuild index.json from every invoice file (repair operation).
+
+    Callers must hold ``with_index_lock``.
+    """
+
+    index = build_index(root)
+    save_index(index, root, write_binary=True)
+    return index
+
+
+def _load_index_for_update(root: Optional[Path]) -> dict[str, object]:
+    """Current index, reusing this process's last write when index.json is unchanged."""
+
+    index_path = _index_path(root)
+    signature = index_signature(index_path)
+    if signature is not None:
+        index = parsed_index(root, signature)
+        if index is not None:
+            return index
+    try:
+        index = _read_json(index_path)
+    except (FileNotFoundError, json.JSONDecodeError):
+        # Missing or corrupt index: fall back to a full rebuild once.
+        return build_index(root)
+
+    entries = index.get("invoices")
+    if not isinstance(entries, list):
+        return build_index(root)
+    return index
+
+
+def _entry_position(entries: list[dict[str, object]], invoice_id: str) -> int:
+    return bisect_left(entries, invoice_id, key=lambda item: str(item.get("id", "")))
+
+
+def upsert_index_entry(entry: dict[str, object], root: Optional[Path] = None) -> dict[str, object]:
+    """Insert or replace a single index entry without rescanning invoice files.
+
+    The previous index is reused from memory when this process wrote it, but
+    index.json is rewritten in full (see :func:`save_index`). Callers must hold
+    ``with_index_lock``.
+    """
+
+    previous = _load_index_for_update(root)
+    entries = list(previous["invoices"])  # type: ignore[call-overload]
+    invoice_id = str(entry["id"])
+
+    pos = _entry_position(entries, invoice_id)
+    if pos < len(entries) and entries[pos].get("id") == invoice_id:
+        entries[pos] = entry
+    else:
+        entries.insert(pos, entry)
+
+    index = {**previous, "count": len(entries), "invoices": entries}
+    save_index(index, root)
+    return index
+
+
+def remove_index_entry(invoice_id: str, root: Optional[Path] = None) -> dict[str, object]:
+    """Remove a single index entry by id without rescanning invoice files.
+
+    Callers must hold ``with_index_lock``.
+    """
+
+    previous = _load_index_for_update(root)
+    entries = list(previous["invoices"])  # type: ignore[call-overload]
+
+    pos = _entry_position(entries, invoice_id)
+    if pos < len(entries) and entries[pos].get("id") == invoice_id:
+        del entries[pos]
+
+    index = {**previous, "count": len(entries), "invoices": entries}
+    save_index(index, root)
+    return index
 
 
 def next_invoice_number(
@@ -199,16 +493,70 @@ def with_sequence_lock(root: Optional[Path] = None):
     return _SequenceLock(root)
 
 
+def delete_invoice_file(invoice_id: str, root: Optional[Path] = None) -> Optional[Path]:
+    """Remove an invoice file from whichever layout holds it; returns the removed path."""
+
+    path = _find_invoice_path(invoice_id, root)
+    if path is not None:
+        path.unlink(missing_ok=True)
+    return path
+
+
+def shard_invoice_files(root: Optional[Path] = None) -> dict[str, object]:
+    """Move flat ``invoices/<id>.json`` files into ``invoices/<year>/`` in place.
+
+    The year comes from each file's ``invoice_date``. Moves are atomic renames and
+    lookups understand both layouts, so the store stays readable throughout and
+    the command can be re-run after an interruption. Files without a readable
+    date are left where they are and reported.
+    """
+
+    ensure_structure(root)
+    invoices_dir = _invoices_dir(root)
+    moved = 0
+    skipped: list[dict[str, str]] = []
+    with with_index_lock(root):
+        for path in sorted(invoices_dir.glob("*.json")):
+            try:
+                year = date.fromisoformat(str(_read_json(path)["invoice_date"])).year
+            except (OSError, ValueError, KeyError, TypeError) as exc:
+                skipped.append({"path": str(path), "error": f"{type(exc).__name__}: {exc}"})
+                continue
+            shard = invoices_dir / f"{year:04d}"
+            _ensure_directory(shard)
+            _mark_sharded(invoices_dir)
+            _SHARD_DIRS_CACHE.pop(invoices_dir, None)
+            os.replace(path, shard / path.name)
+            moved += 1
+
+    return {
+        "moved": moved,
+        "skipped": skipped,
+        "shards": [shard.name for shard in _shard_dirs(root)],
+    }
+
+
 __all__ = [
+    "IndexSignature",
+    "SHARD_MARKER_FILENAME",
     "build_index",
+    "delete_invoice_file",
     "ensure_structure",
     "get_invoice_root",
+    "index_signature",
+    "invoice_shards",
     "iter_invoice_paths",
     "load_invoice",
     "load_invoice_by_path",
     "next_invoice_number",
+    "parsed_index",
+    "rebuild_index",
+    "remove_index_entry",
     "save_index",
     "save_invoice",
+    "shard_invoice_files",
+    "sharded_layout_enabled",
+    "upsert_index_entry",
     "with_index_lock",
     "with_sequence_lock",
 ]
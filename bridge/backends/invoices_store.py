@@ -0,0 +1,230 @@
+"""Pluggable invoice storage engines selected via MAD_INVOICE_STORAGE."""
+from __future__ import annotations
+
+import os
+from datetime import date
+from pathlib import Path
+from typing import Iterator, Optional, Protocol
+
+from .invoices_index import (
+    INDEX_CACHE,
+    IndexPage,
+    SortKey,
+    load_index_payload,
+    query_index_snapshot,
+)
+from .invoices_models import Invoice, PaymentStatus
+from .invoices_rebuild import scan_invoices
+from .invoices_search import (
+    SearchIndex,
+    load_search_index,
+    remove_from_search_index,
+    save_search_index,
+    update_search_index,
+)
+from .invoices_sqlite import SqliteInvoiceStore
+from .invoices_storage import (
+    INDEX_FILENAME,
+    SEQUENCE_FILENAME,
+    _invoice_path,
+    delete_invoice_file,
+    get_invoice_root,
+    iter_invoice_paths,
+    load_invoice,
+    load_invoice_by_path,
+    next_invoice_number,
+    remove_index_entry,
+    save_index,
+    save_invoice,
+    upsert_index_entry,
+    with_index_lock,
+)
+
+STORAGE_ENV_VAR = "MAD_INVOICE_STORAGE"
+DEFAULT_STORAGE_ENGINE = "json"
+
+
+class InvoiceStore(Protocol):
+    """Operations the invoice tools need from a storage engine."""
+
+    name: str
+
+    def invoice_location(self, invoice_id: str) -> str: ...
+
+    def index_location(self) -> str: ...
+
+    def sequence_location(self) -> str: ...
+
+    def load_invoice(self, invoice_id: str) -> Invoice: ...
+
+    def invoice_exists(self, invoice_id: str) -> bool: ...
+
+    def save_invoice(self, invoice: Invoice) -> None: ...
+
+    def delete_invoice(self, invoice_id: str) -> None: ...
+
+    def index_payload(self) -> dict[str, object]: ...
+
+    def invoice_count(self) -> int: ...
+
+    def rebuild_index(self, workers: int = 1) -> dict[str, object]: ...
+
+    def query_index(
+        self,
+        *,
+        status: str | None = None,
+        payment_status: PaymentStatus | None = None,
+        customer_query: str | None = None,
+        invoice_date_from: date | None = None,
+        invoice_date_to: date | None = None,
+        sort_by: str = "invoice_date",
+        direction: str = "desc",
+        limit: int | None,
+        offset: int = 0,
+        after: SortKey | None = None,
+        include_total_count: bool = True,
+    ) -> IndexPage: ...
+
+    def search(self, query: str, *, limit: int) -> list[tuple[str, float]]: ...
+
+    def next_invoice_number(
+        self, year: int | None = None, separator: str | None = "-"
+    ) -> str: ...
+
+
+class FilesystemInvoiceStore:
+    """Default engine: one JSON file per invoice plus index.json and sequence.json."""
+
+    name = "json"
+
+    def __init__(self, root: Optional[Path] = None):
+        self.root = root
+
+    def _invoice_path(self, invoice_id: str) -> Path:
+        # Resolves both the flat and the year-sharded layout.
+        return _invoice_path(invoice_id, self.root)
+
+    def invoice_location(self, invoice_id: str) -> str:
+        return str(self._invoice_path(invoice_id))
+
+    def index_location(self) -> str:
+        return str(get_invoice_root(self.root) / INDEX_FILENAME)
+
+    def sequence_location(self) -> str:
+        return str(get_invoice_root(self.root) / SEQUENCE_FILENAME)
+
+    def load_invoice(self, invoice_id: str) -> Invoice:
+        return load_invoice(invoice_id, self.root)
+
+    def invoice_exists(self, invoice_id: str) -> bool:
+        return self._invoice_path(invoice_id).exists()
+
+    def _iter_invoices(self) -> Iterator[Invoice]:
+        for path in iter_invoice_paths(self.root):
+            yield load_invoice_by_path(path)
+
+    def save_invoice(self, invoice: Invoice) -> None:
+        with with_index_lock(self.root):
+            save_invoice(invoice, self.root)
+            upsert_index_entry(invoice.to_index_entry(), self.root)
+            update_search_index(invoice, self.root, rebuild_from=self._iter_invoices())
+
+    def delete_invoice(self, invoice_id: str) -> None:
+        with with_index_lock(self.root):
+            delete_invoice_file(invoice_id, self.root)
+            remove_index_entry(invoice_id, self.root)
+            remove_from_search_index(invoice_id, self.root, rebuild_from=self._iter_invoices())
+
+    def index_payload(self) -> dict[str, object]:
+        return load_index_payload(self.root)
+
+    def invoice_count(self) -> int:
+        return INDEX_CACHE.snapshot(self.root).count
+
+    def rebuild_index(self, workers: int = 1) -> dict[str, object]:
+        """Rebuild index.json and the search index from the invoice files.
+
+        ``workers > 1`` validates files in a process pool. Invalid files are skipped
+        and reported under ``errors`` (the written index.json has no such key).
+        """
+
+        with with_index_lock(self.root):
+            scan = scan_invoices(self.root, workers=workers)
+            index: dict[str, object] = {"count": len(scan.entries), "invoices": scan.entries}
+            save_index(index, self.root, write_binary=True)
+            save_search_index(SearchIndex.from_documents(scan.documents), self.root)
+        return {**index, "errors": scan.errors}
+
+    def search(self, query: str, *, limit: int) -> list[tuple[str, float]]:
+        index = load_search_index(self.root)
+        if index is None:
+            # Stores created before search existed: build and persist the index once.
+            with with_index_lock(self.root):
+                index = load_search_index(self.root)
+                if index is None:
+                    index = SearchIndex.build(self._iter_invoices())
+                    save_search_index(index, self.root)
+        return index.search(query, limit=limit)
+
+    def query_index(
+        self,
+        *,
+        status: str | None = None,
+        payment_status: PaymentStatus | None = None,
+        customer_query: str | None = None,
+        invoice_date_from: date | None = None,
+        invoice_date_to: date | None = None,
+        sort_by: str = "invoice_date",
+        direction: str = "desc",
+        limit: int | None,
+        offset: int = 0,
+        after: SortKey | None = None,
+        include_total_count: bool = True,
+    ) -> IndexPage:
+        return query_index_snapshot(
+            INDEX_CACHE.snapshot(self.root),
+            status=status,
+            payment_status=payment_status,
+            customer_query=customer_query,
+            invoice_date_from=invoice_date_from,
+            invoice_date_to=invoice_date_to,
+            sort_by=sort_by,
+            direction=direction,
+            limit=limit,
+            offset=offset,
+            after=after,
+            include_total_count=include_total_count,
+        )
+
+    def next_invoice_number(
+        self, year: int | None = None, separator: str | None = "-"
+    ) -> str:
+        return next_invoice_number(self.root, year=year, separator=separator)
+
+
+STORAGE_ENGINES: dict[str, type] = {
+    FilesystemInvoiceStore.name: FilesystemInvoiceStore,
+    SqliteInvoiceStore.name: SqliteInvoiceStore,
+}
+
+
+def get_store(root: Optional[Path] = None) -> InvoiceStore:
+    """Return the storage engine configured via MAD_INVOICE_STORAGE (default: json)."""
+
+    engine = os.getenv(STORAGE_ENV_VAR, "").strip().lower() or DEFAULT_STORAGE_ENGINE
+    try:
+        store_cls = STORAGE_ENGINES[engine]
+    except KeyError as exc:
+        allowed = ", ".join(sorted(STORAGE_ENGINES))
+        raise ValueError(f"Unknown {STORAGE_ENV_VAR}={engine!r} (expected one of: {allowed})") from exc
+    return store_cls(root)
+
+
+__all__ = [
+    "DEFAULT_STORAGE_ENGINE",
+    "FilesystemInvoiceStore",
+    "InvoiceStore",
+    "STORAGE_ENGINES",
+    "STORAGE_ENV_VAR",
+    "get_store",
+]
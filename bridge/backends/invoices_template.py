@@ -0,0 +1,123 @@
+"""Pre-parsed LaTeX invoice template with ``%%PLACEHOLDER%%`` slots.
+
+The template is read once, split into literal segments and placeholder slots and
+cached per path until its mtime or size changes. Rendering is then one
+``str.join`` over the segments, linear in the template size regardless of the
+number of placeholders, and substituted values are never rescanned for
+placeholders.
+"""
+from __future__ import annotations
+
+import logging
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Mapping
+
+PLACEHOLDER_PATTERN = re.compile(r"%%([A-Z_]+)%%")
+
+_LOGGER = logging.getLogger("bridge.backends.invoices_template")
+
+
+@dataclass(frozen=True, slots=True)
+class ParsedTemplate:
+    """Template split as ``literals[0] slot[0] literals[1] ... slot[n-1] literals[n]``."""
+
+    path: Path
+    data: bytes
+    literals: tuple[str, ...]
+    slots: tuple[str, ...]
+    # Placeholders in the template that no renderer value provides.
+    unknown: frozenset[str]
+    # Renderer values that the template never uses.
+    unused: frozenset[str]
+
+    @property
+    def source(self) -> str:
+        return self.data.decode("utf-8")
+
+    @property
+    def placeholders(self) -> frozenset[str]:
+        return frozenset(self.slots)
+
+    @classmethod
+    def parse(cls, path: Path, data: bytes, known: Iterable[str] = ()) -> "ParsedTemplate":
+        parts = PLACEHOLDER_PATTERN.split(data.decode("utf-8"))
+        literals = tuple(parts[0::2])
+        slots = tuple(parts[1::2])
+        known_keys = frozenset(known)
+        used = frozenset(slots)
+        return cls(
+            path=path,
+            data=data,
+            literals=literals,
+            slots=slots,
+            unknown=used - known_keys if known_keys else frozenset(),
+            unused=known_keys - used,
+        )
+
+    def render(self, values: Mapping[str, str]) -> str:
+        """Fill every slot; placeholders without a value are kept verbatim."""
+
+        pieces = [self.literals[0]]
+        for name, literal in zip(self.slots, self.literals[1:]):
+            value = values.get(name)
+            pieces.append(f"%%{name}%%" if value is None else value)
+            pieces.append(literal)
+        return "".join(pieces)
+
+
+class TemplateCache:
+    """Parsed templates per path, revalidated with one ``stat()`` per lookup."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: dict[tuple[Path, frozenset[str]], tuple[tuple[int, int], ParsedTemplate]] = {}
+        self._loads = 0
+
+    def get(self, path: Path, known: Iterable[str] = ()) -> ParsedTemplate:
+        """Return the parsed template, re-reading it when the file changed.
+
+        Placeholders without a value are logged as warnings (unused values at
+        debug level) each time the file is (re)loaded. Raises ``FileNotFoundError`` if the template is missing.
+        """
+
+        key = (path, frozenset(known))
+        st = path.stat()
+        signature = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and cached[0] == signature:
+                return cached[1]
+
+        template = ParsedTemplate.parse(path, path.read_bytes(), key[1])
+        if template.unknown:
+            _LOGGER.warning(
+                "Template %s has placeholders without values: %s",
+                path,
+                ", ".join(sorted(template.unknown)),
+            )
+        if template.unused:
+            # Expected for values that only feed derived ones (VAT_RATE -> VAT_LINE).
+            _LOGGER.debug(
+                "Template %s does not use: %s", path, ", ".join(sorted(template.unused))
+            )
+        with self._lock:
+            self._entries[key] = (signature, template)
+            self._loads += 1
+        return template
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "loads": self._loads}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+TEMPLATE_CACHE = TemplateCache()
+
+
+__all__ = ["PLACEHOLDER_PATTERN", "ParsedTemplate", "TEMPLATE_CACHE", "TemplateCache"]
@@ -0,0 +1,111 @@
+"""Per-class concurrency limits for the async MCP invoice tools.
+
+FastMCP runs synchronous tool functions inline on its event loop, so one slow
+``render_invoice_pdf`` or index-refreshing ``update_invoice_status`` used to stall
+the whole MCP session. The tools are ``async`` instead and hand their blocking
+store and render work to worker threads via ``anyio.to_thread``. Each tool class
+has its own limiter, so read-only calls never queue behind renders:
+
+* ``MAD_INVOICE_READ_CONCURRENCY`` (default 8): listing, search, get, preview
+* ``MAD_INVOICE_WRITE_CONCURRENCY`` (default 2): drafts, statuses, numbering, rebuilds
+* ``MAD_INVOICE_RENDER_CONCURRENCY`` (default 2): PDF renders
+"""
+from __future__ import annotations
+
+import functools
+import threading
+from typing import Any, Callable, Literal, Mapping, Optional, TypeVar
+
+import anyio
+import anyio.to_thread
+
+from ..utils.config import env_positive_int
+
+ToolClass = Literal["read", "write", "render"]
+
+CONCURRENCY_ENV_VARS: dict[ToolClass, str] = {
+    "read": "MAD_INVOICE_READ_CONCURRENCY",
+    "write": "MAD_INVOICE_WRITE_CONCURRENCY",
+    "render": "MAD_INVOICE_RENDER_CONCURRENCY",
+}
+DEFAULT_CONCURRENCY: dict[ToolClass, int] = {"read": 8, "write": 2, "render": 2}
+
+T = TypeVar("T")
+
+
+class ToolLimits:
+    """One ``anyio.CapacityLimiter`` per tool class, created on first use."""
+
+    def __init__(self, limits: Mapping[ToolClass, int]):
+        self.limits = dict(limits)
+        self._lock = threading.Lock()
+        self._limiters: dict[ToolClass, anyio.CapacityLimiter] = {}
+
+    def limiter(self, kind: ToolClass) -> anyio.CapacityLimiter:
+        with self._lock:
+            limiter = self._limiters.get(kind)
+            if limiter is None:
+                limiter = self._limiters[kind] = anyio.CapacityLimiter(self.limits[kind])
+            return limiter
+
+    async def run(self, kind: ToolClass, func: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+        """Run ``func`` on a worker thread once a ``kind`` slot is free."""
+
+        return await anyio.to_thread.run_sync(
+            functools.partial(func, *args, **kwargs), limiter=self.limiter(kind)
+        )
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        stats: dict[str, dict[str, int]] = {}
+        for kind, limit in self.limits.items():
+            with self._lock:
+                limiter = self._limiters.get(kind)
+            if limiter is None:
+                stats[kind] = {"limit": limit, "running": 0, "waiting": 0}
+                continue
+            current = limiter.statistics()
+            stats[kind] = {
+                "limit": limit,
+                "running": int(current.borrowed_tokens),
+                "waiting": current.tasks_waiting,
+            }
+        return stats
+
+
+_LIMITS: Optional[ToolLimits] = None
+_LIMITS_LOCK = threading.Lock()
+
+
+def get_tool_limits() -> ToolLimits:
+    """Process-wide tool limits, read from the environment on first use."""
+
+    global _LIMITS
+    with _LIMITS_LOCK:
+        if _LIMITS is None:
+            _LIMITS = ToolLimits(
+                {
+                    kind: env_positive_int(
+                        CONCURRENCY_ENV_VARS[kind], default=DEFAULT_CONCURRENCY[kind]
+                    )
+                    for kind in DEFAULT_CONCURRENCY
+                }
+            )
+        return _LIMITS
+
+
+def reset_tool_limits() -> None:
+    """Forget the current limits so the next call re-reads the environment (tests)."""
+
+    global _LIMITS
+    with _LIMITS_LOCK:
+        _LIMITS = None
+
+
+__all__ = [
+    "CONCURRENCY_ENV_VARS",
+    "DEFAULT_CONCURRENCY",
+    "ToolClass",
+    "ToolLimits",
+    "get_tool_limits",
+    "reset_tool_limits",
+]
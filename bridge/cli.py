@@ -13,6 +13,7 @@ from starlette.applications import Starlette
 from bridge.utils.config import ENABLE_WRITES
 
 ShimFactory = Callable[[str], Starlette]
+InProcessShimFactory = Callable[[], Starlette]
 StartSSE = Callable[[str, int], None]
 RunStdIO = Callable[[], None]
 
@@ -52,10 +53,31 @@ def build_parser() -> argparse.ArgumentParser:
         default=8081,
         help="Port for the optional OpenWebUI shim",
     )
+    parser.add_argument(
+        "--in-process",
+        action="store_true",
+        help=(
+            "Serve the MCP SSE endpoints inside the shim app on --shim-port "
+            "instead of proxying to a separate server on --mcp-port"
+        ),
+    )
     parser.add_argument("--debug", action="store_true", help="Enable debug logging")
     return parser
 
 
+def _serve_shim(app: Starlette, args: argparse.Namespace, logger: logging.Logger) -> None:
+    try:
+        uvicorn.run(app, host=args.shim_host, port=int(args.shim_port))
+    except OSError as exc:  # pragma: no cover - depends on local env
+        logger.error(
+            "Failed to start OpenWebUI shim on %s:%s: %s",
+            args.shim_host,
+            args.shim_port,
+            exc.strerror or exc,
+        )
+        raise SystemExit(1)
+
+
 def run(
     args: argparse.Namespace,
     *,
@@ -63,7 +85,8 @@ def run(
     start_sse: StartSSE,
     run_stdio: RunStdIO,
     shim_factory: ShimFactory,
-    ) -> None:
+    inprocess_shim_factory: InProcessShimFactory | None = None,
+) -> None:
     """Execute the CLI behaviour shared by legacy and modular entry points."""
 
     if args.debug:
@@ -105,7 +128,33 @@ def run(
     _validate_port(args.mcp_port, flag="--mcp-port")
     _validate_port(args.shim_port, flag="--shim-port")
 
-    if args.transport == "sse":
+    in_process = getattr(args, "in_process", False)
+
+    if args.transport == "sse" and in_process:
+        if inprocess_shim_factory is None:
+            logger.error("--in-process is not supported by this entry point.")
+            raise SystemExit(2)
+
+        _check_port_available(
+            args.shim_host,
+            args.shim_port,
+            label="OpenWebUI shim",
+            flag="--shim-port",
+        )
+
+        logger.debug("Transport: SSE in-process (shim and MCP share one app)")
+        if not ENABLE_WRITES:
+            logger.warning(
+                "Write-capable tools disabled (set MCP_ENABLE_WRITES=1 to enable writes)."
+            )
+        app = inprocess_shim_factory()
+        logger.debug(
+            "[Shim] OpenWebUI endpoint on http://%s:%s/openapi.json",
+            args.shim_host,
+            args.shim_port,
+        )
+        _serve_shim(app, args, logger)
+    elif args.transport == "sse":
         if args.mcp_host == args.shim_host and args.mcp_port == args.shim_port:
             logger.error(
                 "Shim port conflicts with MCP SSE port (%s:%s). Use --shim-port to separate them.",
@@ -153,16 +202,7 @@ def run(
             args.shim_host,
             args.shim_port,
         )
-        try:
-            uvicorn.run(app, host=args.shim_host, port=int(args.shim_port))
-        except OSError as exc:  # pragma: no cover - depends on local env
-            logger.error(
-                "Failed to start OpenWebUI shim on %s:%s: %s",
-                args.shim_host,
-                args.shim_port,
-                exc.strerror or exc,
-            )
-            raise SystemExit(1)
+        _serve_shim(app, args, logger)
     else:
         logger.debug("Transport: stdio")
         logger.debug("OpenWebUI shim disabled in stdio mode.")
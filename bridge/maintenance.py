@@ -0,0 +1,135 @@
+"""Offline maintenance commands for the invoice store.
+
+Usage::
+
+    python -m bridge.maintenance migrate-sqlite
+    python -m bridge.maintenance rebuild-index [--workers N]
+    python -m bridge.maintenance shard-invoices
+    python -m bridge.maintenance render-invoices [ID ...] [--status S] [--payment-status P]
+        [--customer Q] [--from DATE] [--to DATE] [--workers N] [--merge]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from typing import Callable, Sequence
+
+from mcp.server.fastmcp.exceptions import ToolError
+
+from bridge.backends.invoices import (
+    render_invoices,
+    render_invoices_merged,
+    select_invoice_ids,
+)
+from bridge.backends.invoices_rebuild import resolve_workers
+from bridge.backends.invoices_sqlite import migrate_to_sqlite
+from bridge.backends.invoices_storage import shard_invoice_files
+from bridge.backends.invoices_store import get_store
+
+
+def _cmd_migrate_sqlite(_: argparse.Namespace) -> dict[str, object]:
+    return migrate_to_sqlite()
+
+
+def _cmd_rebuild_index(args: argparse.Namespace) -> dict[str, object]:
+    store = get_store()
+    workers = resolve_workers(args.workers)
+    index = store.rebuild_index(workers=workers)
+    return {
+        "engine": store.name,
+        "count": index["count"],
+        "index_path": store.index_location(),
+        "errors": index.get("errors", []),
+        "workers": workers,
+    }
+
+
+def _cmd_shard_invoices(_: argparse.Namespace) -> dict[str, object]:
+    return shard_invoice_files()
+
+
+def _cmd_render_invoices(args: argparse.Namespace) -> dict[str, object]:
+    ids = select_invoice_ids(
+        args.invoice_ids,
+        status=args.status,
+        payment_status=args.payment_status,
+        customer_query=args.customer,
+        invoice_date_from=args.date_from,
+        invoice_date_to=args.date_to,
+    )
+    if args.merge:
+        return render_invoices_merged(ids)
+    return render_invoices(ids, workers=resolve_workers(args.workers))
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Create the argument parser for maintenance commands."""
+
+    parser = argparse.ArgumentParser(description="mad-invoice-mcp maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate = subparsers.add_parser(
+        "migrate-sqlite",
+        help="Copy the JSON-file store under MAD_INVOICE_ROOT into invoices.sqlite3",
+    )
+    migrate.set_defaults(handler=_cmd_migrate_sqlite)
+
+    rebuild = subparsers.add_parser(
+        "rebuild-index",
+        help="Rebuild the index of the configured storage engine from stored invoices",
+    )
+    rebuild.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Processes used to validate invoice files (default: 1, 0 = all cores)",
+    )
+    rebuild.set_defaults(handler=_cmd_rebuild_index)
+
+    shard = subparsers.add_parser(
+        "shard-invoices",
+        help="Move flat invoices/<id>.json files into invoices/<year>/ in place",
+    )
+    shard.set_defaults(handler=_cmd_shard_invoices)
+
+    render = subparsers.add_parser(
+        "render-invoices",
+        help="Render PDFs for the given invoice ids or for all invoices matching filters",
+    )
+    render.add_argument("invoice_ids", nargs="*", help="Invoice ids (omit to select by filters)")
+    render.add_argument("--status", help="draft or final")
+    render.add_argument("--payment-status", choices=["open", "paid", "overdue", "cancelled"])
+    render.add_argument("--customer", help="Case-insensitive customer name substring")
+    render.add_argument("--from", dest="date_from", help="Earliest invoice date (YYYY-MM-DD)")
+    render.add_argument("--to", dest="date_to", help="Latest invoice date (YYYY-MM-DD)")
+    render.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Parallel pdflatex processes (default: 1, 0 = all cores)",
+    )
+    render.add_argument(
+        "--merge",
+        action="store_true",
+        help="Render the selection into one PDF with a single pdflatex run",
+    )
+    render.set_defaults(handler=_cmd_render_invoices)
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    handler: Callable[[argparse.Namespace], dict[str, object]] = args.handler
+    try:
+        result = handler(args)
+    except ToolError as exc:
+        parser.exit(2, f"error: {exc}\n")
+    json.dump(result, sys.stdout, indent=2, sort_keys=True)
+    sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    raise SystemExit(main())
@@ -3,26 +3,118 @@ from __future__ import annotations
 
 import json
 import logging
-from typing import Any, Sequence
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Sequence
 
 import httpx
 from starlette.applications import Starlette
+from starlette.background import BackgroundTasks
 from starlette.requests import Request
-from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
-from starlette.routing import Route
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import BaseRoute, Route
+
+from bridge.utils.config import (
+    SHIM_MAX_CONNECTIONS,
+    SHIM_MAX_KEEPALIVE_CONNECTIONS,
+    SHIM_TIMEOUT_S,
+)
 
 logger = logging.getLogger("bridge.shim")
 
+# Idle upstream connections are closed after this many seconds.
+KEEPALIVE_EXPIRY_S = 30.0
+
+
+# Connection-scoped headers that must not be copied from the upstream response.
+_HOP_BY_HOP_HEADERS = frozenset(
+    {
+        "connection",
+        "keep-alive",
+        "proxy-authenticate",
+        "proxy-authorization",
+        "te",
+        "trailer",
+        "transfer-encoding",
+        "upgrade",
+    }
+)
+
+
+def _forwarded_headers(headers: httpx.Headers) -> dict[str, str]:
+    """Upstream response headers to pass through unchanged, minus hop-by-hop ones."""
+
+    return {
+        name: value
+        for name, value in headers.items()
+        if name.lower() not in _HOP_BY_HOP_HEADERS
+    }
+
+
+async def _send_initialized(
+    client: httpx.AsyncClient, url: str, params: dict[str, str]
+) -> None:
+    """Follow a successful ``initialize`` with the ``initialized`` notification."""
+
+    payload = json.dumps({"jsonrpc": "2.0", "method": "initialized", "params": {}})
+    try:
+        response = await client.post(
+            url,
+            content=payload,
+            headers={"content-type": "application/json"},
+            params=params,
+        )
+        await response.aclose()
+    except Exception:
+        pass  # Shim must remain permissive
+
+
+def build_upstream_client(
+    upstream_base: str, *, transport: httpx.AsyncBaseTransport | None = None
+) -> httpx.AsyncClient:
+    """Pooled keep-alive client for all requests the shim sends upstream.
+
+    Pool size and timeout come from ``MCP_SHIM_MAX_CONNECTIONS``,
+    ``MCP_SHIM_MAX_KEEPALIVE`` and ``MCP_SHIM_TIMEOUT``.
+    """
+
+    return httpx.AsyncClient(
+        base_url=upstream_base,
+        timeout=httpx.Timeout(SHIM_TIMEOUT_S),
+        limits=httpx.Limits(
+            max_connections=SHIM_MAX_CONNECTIONS,
+            max_keepalive_connections=SHIM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY_S,
+        ),
+        follow_redirects=True,
+        transport=transport,
+    )
+
 
 def build_openwebui_shim(
-    upstream_base: str, *, extra_routes: Sequence[Route] | None = None
+    upstream_base: str | None = None,
+    *,
+    mcp_app: Starlette | None = None,
+    extra_routes: Sequence[BaseRoute] | None = None,
+    transport: httpx.AsyncBaseTransport | None = None,
 ) -> Starlette:
     """Create a Starlette app exposing OpenWebUI-compatible MCP shim routes.
 
     OpenWebUI recognizes the x-openwebui-mcp extension and connects via MCP protocol.
-    The shim proxies SSE and messages endpoints to the upstream MCP server.
+    With ``upstream_base`` the shim proxies SSE and messages endpoints to the upstream
+    MCP server over one pooled client that lives as long as the app (see
+    :func:`build_upstream_client`). With ``mcp_app`` (the guarded SSE app) its routes
+    are mounted directly, so messages are dispatched in-process on the same event loop.
     """
 
+    if (upstream_base is None) == (mcp_app is None):
+        raise ValueError("Pass exactly one of upstream_base or mcp_app")
+
+    @asynccontextmanager
+    async def lifespan(app: Starlette) -> AsyncIterator[None]:
+        async with build_upstream_client(upstream_base, transport=transport) as client:
+            app.state.upstream = client
+            yield
+
     async def openapi_get(request: Request):
         """Return OpenAPI schema with x-openwebui-mcp extension."""
         client_ip = request.client.host if request.client else "unknown"
@@ -86,7 +178,7 @@ def build_openwebui_shim(
 
     async def sse_proxy(request: Request):
         """Proxy SSE connection to upstream MCP server."""
-        url = upstream_base + "/sse"
+        client: httpx.AsyncClient = request.app.state.upstream
         headers = {"accept": "text/event-stream"}
         params = dict(request.query_params)
         client_ip = request.client.host if request.client else "unknown"
@@ -95,12 +187,12 @@ def build_openwebui_shim(
 
         async def event_generator():
             try:
-                async with httpx.AsyncClient(timeout=None) as client:
-                    async with client.stream(
-                        "GET", url, params=params, headers=headers
-                    ) as upstream:
-                        async for chunk in upstream.aiter_bytes():
-                            yield chunk
+                # The stream stays open for the whole session: no read timeout.
+                async with client.stream(
+                    "GET", "/sse", params=params, headers=headers, timeout=None
+                ) as upstream:
+                    async for chunk in upstream.aiter_bytes():
+                        yield chunk
             finally:
                 logger.info("SSE disconnect client=%s ua=%s", client_ip, ua)
 
@@ -112,7 +204,8 @@ def build_openwebui_shim(
 
     async def messages_proxy(request: Request):
         """Proxy messages to upstream MCP server and handle initialization."""
-        url = upstream_base + request.url.path
+        client: httpx.AsyncClient = request.app.state.upstream
+        url = request.url.path
         data = await request.body()
         headers = {
             "content-type": request.headers.get("content-type", "application/json")
@@ -136,60 +229,70 @@ def build_openwebui_shim(
             "Proxying message client=%s ua=%s method=%s", client_ip, ua, method
         )
 
-        async with httpx.AsyncClient(timeout=120, follow_redirects=True) as client:
-            resp = await client.post(url, content=data, headers=headers, params=params)
-
-            # Send initialized notification after successful initialize
-            if should_send_initialized and resp.status_code < 400:
-                init_headers = {"content-type": "application/json"}
-                init_payload = json.dumps(
-                    {"jsonrpc": "2.0", "method": "initialized", "params": {}}
-                )
-                try:
-                    await client.post(
-                        url,
-                        content=init_payload,
-                        headers=init_headers,
-                        params=params,
-                    )
-                except Exception:
-                    pass  # Shim must remain permissive
-
-            if resp.status_code >= 500:
-                logger.error(
-                    "Upstream error status=%s client=%s ua=%s method=%s",
-                    resp.status_code,
-                    client_ip,
-                    ua,
-                    method,
-                )
-            elif resp.status_code >= 400:
-                logger.warning(
-                    "Upstream warning status=%s client=%s ua=%s method=%s",
-                    resp.status_code,
-                    client_ip,
-                    ua,
-                    method,
-                )
-
-            return PlainTextResponse(
-                resp.text,
-                status_code=resp.status_code,
-                headers={"content-type": resp.headers.get("content-type", "application/json")},
+        upstream_request = client.build_request(
+            "POST", url, content=data, headers=headers, params=params
+        )
+        resp = await client.send(upstream_request, stream=True)
+
+        if resp.status_code >= 500:
+            logger.error(
+                "Upstream error status=%s client=%s ua=%s method=%s",
+                resp.status_code,
+                client_ip,
+                ua,
+                method,
+            )
+        elif resp.status_code >= 400:
+            logger.warning(
+                "Upstream warning status=%s client=%s ua=%s method=%s",
+                resp.status_code,
+                client_ip,
+                ua,
+                method,
             )
 
-    routes = [
+        # Closing the upstream response returns its connection to the pool; the
+        # initialized notification goes out after the reply instead of before it.
+        background = BackgroundTasks()
+        background.add_task(resp.aclose)
+        if should_send_initialized and resp.status_code < 400:
+            background.add_task(_send_initialized, client, url, params)
+
+        async def body() -> AsyncIterator[bytes]:
+            try:
+                async for chunk in resp.aiter_raw():
+                    yield chunk
+            finally:
+                await resp.aclose()
+
+        return StreamingResponse(
+            body(),
+            status_code=resp.status_code,
+            headers=_forwarded_headers(resp.headers),
+            background=background,
+        )
+
+    routes: list[BaseRoute] = [
         Route("/openapi.json", openapi_get, methods=["GET"]),
         Route("/openapi.json", openapi_post, methods=["POST"]),
         Route("/health", health, methods=["GET"]),
         Route("/", root_post_ok, methods=["POST"]),
-        Route("/sse", sse_proxy, methods=["GET"]),
-        Route("/messages", messages_proxy, methods=["POST"]),
-        Route("/messages/", messages_proxy, methods=["POST"]),
     ]
+    if mcp_app is not None:
+        routes.extend(mcp_app.routes)
+    else:
+        routes.extend(
+            [
+                Route("/sse", sse_proxy, methods=["GET"]),
+                Route("/messages", messages_proxy, methods=["POST"]),
+                Route("/messages/", messages_proxy, methods=["POST"]),
+            ]
+        )
     if extra_routes:
         routes.extend(extra_routes)
-    return Starlette(debug=False, routes=routes)
+    return Starlette(
+        debug=False, routes=routes, lifespan=lifespan if mcp_app is None else None
+    )
 
 
-__all__ = ["build_openwebui_shim"]
+__all__ = ["build_openwebui_shim", "build_upstream_client"]
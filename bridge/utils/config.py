@@ -36,10 +36,22 @@ def _env_int(name: str, *, default: int) -> int:
     return _parse_int(os.getenv(name), default=default)
 
 
+def env_positive_int(name: str, *, default: int) -> int:
+    """Integer env var for sizes and limits; unset, invalid or values below 1 give ``default``."""
+
+    value = _env_int(name, default=default)
+    return value if value > 0 else default
+
+
 ENABLE_WRITES: Final[bool] = _env_bool("MCP_ENABLE_WRITES", default=False)
 MAX_WRITES_PER_REQUEST: Final[int] = _env_int("MCP_MAX_WRITES_PER_REQUEST", default=2)
 MAX_ITEMS_PER_BATCH: Final[int] = _env_int("MCP_MAX_ITEMS_PER_BATCH", default=256)
 
+# Upstream connection pool of the OpenWebUI shim; open SSE streams count too.
+SHIM_MAX_CONNECTIONS: Final[int] = _env_int("MCP_SHIM_MAX_CONNECTIONS", default=100)
+SHIM_MAX_KEEPALIVE_CONNECTIONS: Final[int] = _env_int("MCP_SHIM_MAX_KEEPALIVE", default=20)
+SHIM_TIMEOUT_S: Final[int] = _env_int("MCP_SHIM_TIMEOUT", default=120)
+
 _audit_log_env = os.getenv("MCP_AUDIT_LOG", "").strip()
 AUDIT_LOG_PATH: Final[Optional[Path]] = (
     Path(_audit_log_env).expanduser() if _audit_log_env else None
@@ -116,5 +128,9 @@ __all__ = [
     "ENABLE_WRITES",
     "MAX_ITEMS_PER_BATCH",
     "MAX_WRITES_PER_REQUEST",
+    "SHIM_MAX_CONNECTIONS",
+    "SHIM_MAX_KEEPALIVE_CONNECTIONS",
+    "SHIM_TIMEOUT_S",
+    "env_positive_int",
     "get_pdflatex_path",
 ]
@@ -1,21 +1,28 @@
-"""Minimal web UI for invoice overview and detail views."""
+"""Minimal web UI for invoice overview and detail views.
+
+Handlers are ``async`` but the store, index and render helpers block (file I/O,
+portalocker locks, index rebuilds), so they run via ``run_in_threadpool`` on
+Starlette's bounded worker threads. The event loop, which also serves the MCP
+SSE stream, never waits on them.
+"""
 from __future__ import annotations
 
-import json
 from pathlib import Path
 
 from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
 from starlette.requests import Request
-from starlette.responses import HTMLResponse, RedirectResponse, Response
+from starlette.responses import HTMLResponse, JSONResponse, RedirectResponse, Response
 from starlette.routing import Route
 from starlette.templating import Jinja2Templates
 
-from bridge.backends.invoices_storage import (
-    get_invoice_root,
-    load_invoice,
-)
+from bridge.backends.invoices_index import IndexPage
+from bridge.backends.invoices_models import Invoice
+from bridge.backends.invoices_render_jobs import get_render_queue
+from bridge.backends.invoices_storage import get_invoice_root
+from bridge.backends.invoices_store import get_store
 from bridge.backends.invoices import (
-    coerce_total,
+    invoice_preview_html,
     render_invoice_pdf_impl,
     update_invoice_status_impl,
     delete_invoice_draft_impl,
@@ -29,14 +36,6 @@ DEFAULT_SORT = "invoice_date"
 DEFAULT_DIRECTION = "desc"
 
 
-def _load_index_payload() -> dict:
-    index_path = get_invoice_root() / "index.json"
-    if index_path.is_file():
-        with index_path.open("r", encoding="utf-8") as handle:
-            return json.load(handle)
-    return {"count": 0, "invoices": []}
-
-
 def _normalize_sort(sort_by: str | None, direction: str | None) -> tuple[str, str]:
     allowed_sort = {"invoice_date", "due_date", "customer", "invoice_number", "total"}
     normalized_sort = sort_by if sort_by in allowed_sort else DEFAULT_SORT
@@ -44,73 +43,87 @@ def _normalize_sort(sort_by: str | None, direction: str | None) -> tuple[str, st
     return normalized_sort, normalized_direction
 
 
-def _sort_index_entries(entries: list[dict], sort_by: str, direction: str) -> list[dict]:
-    key_funcs = {
-        "invoice_date": lambda entry: (
-            str(entry.get("invoice_date", "")),
-            str(entry.get("invoice_number", "")),
-            str(entry.get("id", "")),
-        ),
-        "due_date": lambda entry: (
-            str(entry.get("due_date", "")),
-            str(entry.get("invoice_number", "")),
-            str(entry.get("id", "")),
-        ),
-        "customer": lambda entry: (
-            str(entry.get("customer", "")).lower(),
-            str(entry.get("invoice_number", "")),
-            str(entry.get("id", "")),
-        ),
-        "invoice_number": lambda entry: (
-            str(entry.get("invoice_number", "")),
-            str(entry.get("invoice_date", "")),
-            str(entry.get("id", "")),
-        ),
-        "total": lambda entry: (
-            coerce_total(entry),
-            str(entry.get("invoice_number", "")),
-            str(entry.get("id", "")),
-        ),
-    }
+_STATUS_FILTERS = ("draft", "final")
+_PAYMENT_STATUS_FILTERS = ("open", "paid", "overdue", "cancelled")
+
 
-    key_func = key_funcs.get(sort_by, key_funcs[DEFAULT_SORT])
-    reverse = direction == "desc"
-    return sorted(entries, key=key_func, reverse=reverse)
+def _query_overview(
+    status: str | None, payment_status: str | None, sort_by: str, direction: str
+) -> tuple[int, IndexPage]:
+    store = get_store()
+    # One unbounded query, so the rows and their count come from the same index
+    # version even if a save lands meanwhile.
+    page = store.query_index(
+        status=status,
+        payment_status=payment_status,
+        sort_by=sort_by,
+        direction=direction,
+        limit=None,
+    )
+    matched = page.total_count or 0
+    count = store.invoice_count() if status or payment_status else matched
+    return count, page
 
 
 async def invoices_overview(request: Request) -> HTMLResponse:
-    index = _load_index_payload()
     sort_by, direction = _normalize_sort(
         request.query_params.get("sort"), request.query_params.get("dir")
     )
-    sorted_invoices = _sort_index_entries(
-        index.get("invoices", []), sort_by=sort_by, direction=direction
+    status = request.query_params.get("status") or None
+    if status not in _STATUS_FILTERS:
+        status = None
+    payment_status = request.query_params.get("payment_status") or None
+    if payment_status not in _PAYMENT_STATUS_FILTERS:
+        payment_status = None
+
+    count, page = await run_in_threadpool(
+        _query_overview, status, payment_status, sort_by, direction
+    )
+    filter_query = "".join(
+        f"&{name}={value}"
+        for name, value in (("status", status), ("payment_status", payment_status))
+        if value
     )
     context = {
         "request": request,
-        "invoices": sorted_invoices,
-        "count": index.get("count", 0),
+        "invoices": page.entries,
+        "count": count,
+        "matched": page.total_count,
         "sort": sort_by,
         "direction": direction,
+        "status": status,
+        "payment_status": payment_status,
+        "status_filters": _STATUS_FILTERS,
+        "payment_status_filters": _PAYMENT_STATUS_FILTERS,
+        "filter_query": filter_query,
     }
     return _TEMPLATES.TemplateResponse("invoices_list.html", context)
 
 
+def _load_detail(invoice_id: str) -> tuple[Invoice, Path, bool]:
+    invoice = get_store().load_invoice(invoice_id)
+    pdf_path = get_invoice_root() / "build" / invoice_id / "invoice.pdf"
+    return invoice, pdf_path, pdf_path.is_file()
+
+
 async def invoice_detail(request: Request) -> Response:
     invoice_id = request.path_params.get("invoice_id")
     if not invoice_id:
         return HTMLResponse("Missing invoice id", status_code=400)
 
     try:
-        invoice = load_invoice(invoice_id)
+        invoice, pdf_path, pdf_exists = await run_in_threadpool(_load_detail, invoice_id)
     except FileNotFoundError:
         return HTMLResponse("Invoice not found", status_code=404)
     except Exception as exc:
         return HTMLResponse(f"Failed to load invoice: {exc}", status_code=500)
 
-    build_dir = get_invoice_root() / "build" / invoice_id
-    pdf_path = build_dir / "invoice.pdf"
-    pdf_exists = pdf_path.is_file()
+    render_job = None
+    job_id = request.query_params.get("render_job")
+    if job_id:
+        job = get_render_queue().get(job_id)
+        if job is not None and job.invoice_id == invoice_id:
+            render_job = job.to_dict()
 
     context = {
         "request": request,
@@ -118,21 +131,48 @@ async def invoice_detail(request: Request) -> Response:
         "items": invoice.items,
         "pdf_exists": pdf_exists,
         "pdf_path": pdf_path,
+        "render_job": render_job,
     }
     return _TEMPLATES.TemplateResponse("invoice_detail.html", context)
 
 
+async def invoice_preview(request: Request) -> Response:
+    invoice_id = request.path_params.get("invoice_id")
+    if not invoice_id:
+        return HTMLResponse("Missing invoice id", status_code=400)
+
+    try:
+        invoice = await run_in_threadpool(get_store().load_invoice, invoice_id)
+    except FileNotFoundError:
+        return HTMLResponse("Invoice not found", status_code=404)
+    except Exception as exc:
+        return HTMLResponse(f"Failed to load invoice: {exc}", status_code=500)
+
+    # Rendered straight from the invoice data; no pdflatex involved.
+    return HTMLResponse(invoice_preview_html(invoice))
+
+
 async def render_invoice(request: Request) -> Response:
     invoice_id = request.path_params.get("invoice_id")
     if not ENABLE_WRITES:
         return HTMLResponse("Writes disabled (set MCP_ENABLE_WRITES=1)", status_code=403)
     try:
-        render_invoice_pdf_impl(invoice_id)
+        job = await run_in_threadpool(render_invoice_pdf_impl, invoice_id, background=True)
     except WritesDisabled as exc:
         return HTMLResponse(str(exc), status_code=403)
     except Exception as exc:
         return HTMLResponse(f"Render failed: {exc}", status_code=500)
-    return RedirectResponse(url=f"/invoices/{invoice_id}", status_code=303)
+    # The detail page polls the job instead of holding this request open.
+    return RedirectResponse(
+        url=f"/invoices/{invoice_id}?render_job={job['job_id']}", status_code=303
+    )
+
+
+async def render_job_status(request: Request) -> Response:
+    job = get_render_queue().get(request.path_params.get("job_id", ""))
+    if job is None:
+        return JSONResponse({"error": "Render job not found"}, status_code=404)
+    return JSONResponse(job.to_dict())
 
 
 async def mark_paid(request: Request) -> Response:
@@ -140,7 +180,7 @@ async def mark_paid(request: Request) -> Response:
     if not ENABLE_WRITES:
         return HTMLResponse("Writes disabled (set MCP_ENABLE_WRITES=1)", status_code=403)
     try:
-        update_invoice_status_impl(invoice_id, payment_status="paid")
+        await run_in_threadpool(update_invoice_status_impl, invoice_id, payment_status="paid")
     except WritesDisabled as exc:
         return HTMLResponse(str(exc), status_code=403)
     except Exception as exc:
@@ -153,7 +193,9 @@ async def finalize_invoice(request: Request) -> Response:
     if not ENABLE_WRITES:
         return HTMLResponse("Writes disabled (set MCP_ENABLE_WRITES=1)", status_code=403)
     try:
-        update_invoice_status_impl(invoice_id, payment_status="open", status="final")
+        await run_in_threadpool(
+            update_invoice_status_impl, invoice_id, payment_status="open", status="final"
+        )
     except WritesDisabled as exc:
         return HTMLResponse(str(exc), status_code=403)
     except Exception as exc:
@@ -166,7 +208,7 @@ async def delete_draft(request: Request) -> Response:
     if not ENABLE_WRITES:
         return HTMLResponse("Writes disabled (set MCP_ENABLE_WRITES=1)", status_code=403)
     try:
-        delete_invoice_draft_impl(invoice_id)
+        await run_in_threadpool(delete_invoice_draft_impl, invoice_id)
     except WritesDisabled as exc:
         return HTMLResponse(str(exc), status_code=403)
     except Exception as exc:
@@ -178,7 +220,9 @@ def register_routes(app: Starlette) -> None:
     routes = [
         Route("/invoices", invoices_overview, methods=["GET"]),
         Route("/invoices/{invoice_id}", invoice_detail, methods=["GET"]),
+        Route("/invoices/{invoice_id}/preview", invoice_preview, methods=["GET"]),
         Route("/invoices/{invoice_id}/render", render_invoice, methods=["POST"]),
+        Route("/render-jobs/{job_id}", render_job_status, methods=["GET"]),
         Route("/invoices/{invoice_id}/mark-paid", mark_paid, methods=["POST"]),
         Route("/invoices/{invoice_id}/finalize", finalize_invoice, methods=["POST"]),
         Route("/invoices/{invoice_id}/delete", delete_draft, methods=["POST"]),
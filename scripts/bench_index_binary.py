@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Measure cold-start list latency for index.json versus index.bin.
+
+Writes N synthetic index entries (default 100000) to a temp MAD_INVOICE_ROOT in
+both formats, then times the first page of an unfiltered listing through a
+fresh IndexCache, as a newly started server would see it.
+
+Usage: python scripts/bench_index_binary.py [N]
+"""
+from __future__ import annotations
+
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from bridge.backends.invoices_binindex import BINARY_INDEX_FILENAME, write_binary_index
+from bridge.backends.invoices_index import IndexCache, query_index_snapshot
+from bridge.backends.invoices_storage import INDEX_FILENAME, index_signature
+from scripts.bench_index_columns import _index_json
+
+
+def _cold_page(index_format: str) -> float:
+    os.environ["MAD_INVOICE_INDEX_FORMAT"] = index_format
+    start = time.perf_counter()
+    snapshot = IndexCache().snapshot()
+    query_index_snapshot(snapshot, limit=20)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    root = Path(tempfile.mkdtemp(prefix="mad-invoice-bench-"))
+    os.environ["MAD_INVOICE_ROOT"] = str(root)
+
+    raw = _index_json(count)
+    (root / INDEX_FILENAME).write_text(raw, encoding="utf-8")
+    start = time.perf_counter()
+    write_binary_index(
+        root / BINARY_INDEX_FILENAME,
+        json.loads(raw)["invoices"],
+        source=index_signature(root / INDEX_FILENAME),
+    )
+    write_time = time.perf_counter() - start
+
+    print(f"entries: {count}")
+    print(f"index.json: {(root / INDEX_FILENAME).stat().st_size / 1e6:6.1f} MB")
+    print(f"index.bin:  {(root / BINARY_INDEX_FILENAME).stat().st_size / 1e6:6.1f} MB  (written in {write_time:.2f}s)")
+    print(f"cold first page  json:   {_cold_page('json') * 1000:8.1f} ms")
+    print(f"cold first page  binary: {_cold_page('binary') * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
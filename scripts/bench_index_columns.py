@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Compare the dict-based index entries with the columnar in-memory index.
+
+Generates N synthetic index.json entries (default 100000), then reports the
+memory held by each representation (tracemalloc) and the time to sort them by
+every supported key.
+
+Usage: python scripts/bench_index_columns.py [N]
+"""
+from __future__ import annotations
+
+import gc
+import json
+import random
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from bridge.backends.invoices_columns import ColumnarIndex
+from bridge.backends.invoices_index import _sort_index_entries
+
+SORT_KEYS = ("invoice_date", "due_date", "customer", "invoice_number", "total")
+
+
+def _index_json(count: int) -> str:
+    rng = random.Random(42)
+    customers = [f"Customer {n:04d} GmbH" for n in range(max(count // 50, 1))]
+    start = date(2015, 1, 1)
+    entries = []
+    for number in range(count):
+        invoice_date = start + timedelta(days=rng.randrange(3650))
+        entries.append(
+            {
+                "id": f"{invoice_date.year}-{number:06d}",
+                "invoice_number": f"{invoice_date.year}-{number:06d}",
+                "status": rng.choice(("draft", "final")),
+                "invoice_date": invoice_date.isoformat(),
+                "due_date": (invoice_date + timedelta(days=14)).isoformat(),
+                "customer": rng.choice(customers),
+                "total": round(rng.uniform(50, 5000), 2),
+                "currency": "EUR",
+                "payment_status": rng.choice(("open", "paid", "overdue", "cancelled")),
+                "vat_rate": rng.choice((0.19, 0.07)),
+                "small_business": False,
+                "language": rng.choice(("de", "en")),
+                "date_style": None,
+            }
+        )
+    # Parse from JSON text like IndexCache does, so strings are not pre-shared.
+    return json.dumps({"count": count, "invoices": entries})
+
+
+def _measure(build):
+    gc.collect()
+    tracemalloc.start()
+    value = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return value, current
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    raw = _index_json(count)
+
+    entries, dict_bytes = _measure(lambda: json.loads(raw)["invoices"])
+
+    def _columns() -> ColumnarIndex:
+        return ColumnarIndex.from_entries(json.loads(raw)["invoices"])
+
+    columns, column_bytes = _measure(_columns)
+
+    start = time.perf_counter()
+    ColumnarIndex.from_entries(entries)
+    convert_time = time.perf_counter() - start
+
+    print(f"entries: {count}")
+    print(f"memory  dicts:    {dict_bytes / 1e6:8.1f} MB")
+    print(f"memory  columnar: {column_bytes / 1e6:8.1f} MB")
+    print(f"columnar build from parsed entries: {convert_time:.2f}s (untraced)")
+    print(f"{'sort_by':<16}{'dicts':>10}{'columnar':>10}")
+    for sort_by in SORT_KEYS:
+        start = time.perf_counter()
+        _sort_index_entries(entries, sort_by, "desc")
+        dict_time = time.perf_counter() - start
+        start = time.perf_counter()
+        columns.sorted_positions(sort_by, "desc")
+        column_time = time.perf_counter() - start
+        print(f"{sort_by:<16}{dict_time:>9.3f}s{column_time:>9.3f}s")
+
+
+if __name__ == "__main__":
+    main()
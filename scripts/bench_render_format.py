@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Compare per-render wall time with and without the precompiled preamble format.
+
+Renders one sample invoice N times (default 5) per mode under a temp
+MAD_INVOICE_ROOT. render.json is removed before every run so the render cache
+does not short-circuit pdflatex; the .aux file is kept, so every timed run is a
+warm single-pass render. The one-off format build is timed separately.
+Requires pdflatex.
+
+Usage: python scripts/bench_render_format.py [N]
+"""
+from __future__ import annotations
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from bridge.backends import invoices
+from bridge.backends.invoices_latex_format import PRECOMPILED_PREAMBLE_ENV_VAR, ensure_format
+from bridge.backends.invoices_models import Invoice, LineItem, Party
+from bridge.backends.invoices_render_cache import RENDER_MANIFEST_FILENAME, pdflatex_version
+from bridge.backends.invoices_storage import get_invoice_root
+
+
+def _sample_invoice(invoice_id: str) -> Invoice:
+    today = date.today()
+    return Invoice(
+        id=invoice_id,
+        invoice_number=invoice_id,
+        invoice_date=today,
+        due_date=today + timedelta(days=14),
+        supplier=Party(
+            name="Max Mustermann",
+            business_name="M.A.D. Solutions",
+            street="Main St 1",
+            postal_code="12345",
+            city="Berlin",
+            tax_id="DE123456789",
+        ),
+        customer=Party(name="ACME GmbH", street="Exampleweg 5", postal_code="54321", city="Hamburg"),
+        items=[LineItem(description=f"Consulting block {n}", quantity=4, unit_price=95.0) for n in range(8)],
+    )
+
+
+def _time_renders(invoice: Invoice, runs: int, *, precompiled: bool) -> list[float]:
+    os.environ[PRECOMPILED_PREAMBLE_ENV_VAR] = "1" if precompiled else "0"
+    manifest = get_invoice_root() / "build" / invoice.id / RENDER_MANIFEST_FILENAME
+    invoices._render_invoice(invoice)  # warm-up: writes the .aux file
+    timings = []
+    for _ in range(runs):
+        manifest.unlink(missing_ok=True)
+        start = time.perf_counter()
+        result = invoices._render_invoice(invoice)
+        timings.append(time.perf_counter() - start)
+        assert result["precompiled_preamble"] is precompiled, result
+    return timings
+
+
+def main() -> None:
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    if not invoices._PDFLATEX_PATH:
+        raise SystemExit("pdflatex not found; set PDFLATEX_PATH")
+    os.environ["MAD_INVOICE_ROOT"] = tempfile.mkdtemp(prefix="mad-invoice-bench-")
+
+    os.environ[PRECOMPILED_PREAMBLE_ENV_VAR] = "1"
+    start = time.perf_counter()
+    fmt = ensure_format(
+        invoices._PDFLATEX_PATH,
+        invoices._TEMPLATE_PATH.read_text(encoding="utf-8"),
+        pdflatex_version(invoices._PDFLATEX_PATH),
+    )
+    if fmt is None:
+        raise SystemExit("building the preamble format failed; see the log for pdflatex output")
+    print(f"format build: {time.perf_counter() - start:6.2f} s  ({fmt.path.stat().st_size / 1e6:.1f} MB)")
+
+    for label, precompiled in (("full preamble", False), ("precompiled  ", True)):
+        timings = _time_renders(_sample_invoice(f"bench-{int(precompiled)}"), runs, precompiled=precompiled)
+        print(
+            f"{label}: median {statistics.median(timings) * 1000:7.1f} ms"
+            f"  min {min(timings) * 1000:7.1f} ms  ({runs} renders)"
+        )
+
+
+if __name__ == "__main__":
+    main()
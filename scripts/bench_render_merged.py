@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Compare one merged multi-invoice render against N separate renders.
+
+Creates N sample invoices (default 12) under a temp MAD_INVOICE_ROOT, then
+times rendering them one by one and rendering them as a single merged PDF.
+render.json is removed before every timed run so the render cache does not
+short-circuit pdflatex. Both modes use the precompiled preamble format, which
+is built before timing. Requires pdflatex.
+
+Usage: python scripts/bench_render_merged.py [N] [ROUNDS]
+"""
+from __future__ import annotations
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from bridge.backends import invoices
+from bridge.backends.invoices_latex_format import ensure_format
+from bridge.backends.invoices_render_cache import RENDER_MANIFEST_FILENAME, pdflatex_version
+from bridge.backends.invoices_storage import get_invoice_root
+from bridge.backends.invoices_store import get_store
+from scripts.bench_render_format import _sample_invoice
+
+
+def _forget_renders() -> None:
+    root = get_invoice_root()
+    for directory in (root / "build", root / invoices.MERGED_DIRNAME):
+        for manifest in directory.glob(f"*/{RENDER_MANIFEST_FILENAME}"):
+            manifest.unlink()
+
+
+def _time(render, rounds: int) -> list[float]:
+    render()  # warm-up: writes the .aux files
+    timings = []
+    for _ in range(rounds):
+        _forget_renders()
+        start = time.perf_counter()
+        render()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 12
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    if not invoices._PDFLATEX_PATH:
+        raise SystemExit("pdflatex not found; set PDFLATEX_PATH")
+    os.environ["MAD_INVOICE_ROOT"] = tempfile.mkdtemp(prefix="mad-invoice-bench-")
+
+    store = get_store()
+    ids = [f"bench-{n:04d}" for n in range(count)]
+    for invoice_id in ids:
+        store.save_invoice(_sample_invoice(invoice_id))
+    ensure_format(
+        invoices._PDFLATEX_PATH,
+        invoices._load_template().source,
+        pdflatex_version(invoices._PDFLATEX_PATH),
+    )
+
+    def separate() -> None:
+        for invoice_id in ids:
+            invoices._render_invoice(invoices.get_invoice(invoice_id))
+
+    def merged() -> None:
+        invoices.render_invoices_merged(ids)
+
+    for label, render in ((f"{count} separate renders", separate), ("one merged render  ", merged)):
+        timings = _time(render, rounds)
+        print(
+            f"{label}: median {statistics.median(timings) * 1000:8.1f} ms"
+            f"  min {min(timings) * 1000:8.1f} ms  ({rounds} rounds)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Measure JSON-RPC messages/sec through the OpenWebUI shim.
+
+Starts a stub upstream MCP server (answers POST /messages/ with 202 like the
+SSE transport) and two shims on loopback ports, each under its own uvicorn:
+
+* pooled: ``bridge.shim.build_openwebui_shim`` with its shared keep-alive client
+* per-message client: the previous proxy, which opened a new ``httpx.AsyncClient``
+  (and TCP connection) for every message
+
+and posts N messages (default 2000) with C concurrent senders (default 16) to each.
+
+Usage: python scripts/bench_shim_messages.py [N] [C]
+"""
+from __future__ import annotations
+
+import asyncio
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import httpx
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response
+from starlette.routing import Route
+
+from bridge.shim import build_openwebui_shim
+
+_MESSAGE = b'{"jsonrpc": "2.0", "id": 1, "method": "tools/list"}'
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _serve(app: Starlette) -> tuple[str, uvicorn.Server]:
+    port = _free_port()
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="on")
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}", server
+
+
+def _upstream_app() -> Starlette:
+    async def messages(request: Request) -> Response:
+        await request.body()
+        return Response("Accepted", status_code=202)
+
+    return Starlette(routes=[Route("/messages/", messages, methods=["POST"])])
+
+
+def _per_message_client_shim(upstream_base: str) -> Starlette:
+    async def messages(request: Request) -> Response:
+        data = await request.body()
+        async with httpx.AsyncClient(timeout=120, follow_redirects=True) as client:
+            resp = await client.post(
+                upstream_base + request.url.path,
+                content=data,
+                headers={"content-type": "application/json"},
+                params=dict(request.query_params),
+            )
+            return PlainTextResponse(resp.text, status_code=resp.status_code)
+
+    return Starlette(routes=[Route("/messages/", messages, methods=["POST"])])
+
+
+async def _drive(base_url: str, total: int, concurrency: int) -> float:
+    remaining = iter(range(total))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+
+        async def sender() -> None:
+            for _ in remaining:
+                response = await client.post(
+                    "/messages/?session_id=bench",
+                    content=_MESSAGE,
+                    headers={"content-type": "application/json"},
+                )
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(sender() for _ in range(concurrency)))
+        return time.perf_counter() - start
+
+
+def main() -> None:
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+
+    upstream_base, upstream = _serve(_upstream_app())
+    shims = [
+        ("per-message client", _per_message_client_shim(upstream_base)),
+        ("pooled            ", build_openwebui_shim(upstream_base)),
+    ]
+    for label, app in shims:
+        base_url, server = _serve(app)
+        asyncio.run(_drive(base_url, min(total, 200), concurrency))  # warm-up
+        elapsed = asyncio.run(_drive(base_url, total, concurrency))
+        print(f"{label}: {total / elapsed:8.1f} messages/s  ({total} messages, {concurrency} senders)")
+        server.should_exit = True
+    upstream.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
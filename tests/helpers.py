@@ -0,0 +1,151 @@
+"""Fixtures shared by the test modules: invoice factories and a fake pdflatex."""
+import os
+import sys
+import tempfile
+import unittest
+import unittest.mock
+from datetime import date, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from bridge.backends.invoices_models import Invoice, LineItem, Party
+
+
+def make_invoice(
+    invoice_id: str,
+    *,
+    customer_name: str = "Bob GmbH",
+    description: str = "Consulting",
+    **kwargs,
+) -> Invoice:
+    """A valid single-item invoice; keyword arguments override any model field.
+
+    Without an explicit ``due_date`` the invoice is due 14 days after ``invoice_date``.
+    """
+
+    invoice_date = kwargs.pop("invoice_date", date(2024, 1, 10))
+    base = dict(
+        id=invoice_id,
+        invoice_number=invoice_id,
+        invoice_date=invoice_date,
+        due_date=invoice_date + timedelta(days=14),
+        supplier=Party(name="Alice", street="Street 1", postal_code="12345", city="Berlin"),
+        customer=Party(name=customer_name, street="Ave 2", postal_code="54321", city="Hamburg"),
+        items=[LineItem(description=description, quantity=2, unit_price=150.0)],
+    )
+    base.update(kwargs)
+    return Invoice(**base)
+
+
+def index_entries() -> list[dict]:
+    """Index entries with repeated, missing and malformed values (columnar round trips)."""
+
+    customers = ["Acme GmbH", "ACME Labs", "acme gmbh", "Beta LLC"]
+    entries = []
+    for number in range(60):
+        entries.append(
+            {
+                "id": f"2024-{number:04d}",
+                "invoice_number": f"2024-{number % 7:04d}",
+                "status": "final" if number % 3 else "draft",
+                "invoice_date": date(2024, 1 + number % 12, 1 + number % 5).isoformat(),
+                "due_date": date(2024, 2, 1 + number % 9).isoformat(),
+                "customer": customers[number % len(customers)],
+                "total": float(number % 11),
+                "currency": "EUR",
+                "payment_status": ["open", "paid", "overdue"][number % 3],
+                "vat_rate": 0.19,
+                "small_business": bool(number % 2),
+                "language": "de",
+                "date_style": None if number % 4 else "iso",
+            }
+        )
+    entries.append({"id": "broken", "invoice_number": "x", "invoice_date": "n/a", "total": "12"})
+    entries.append({"id": "extra", "invoice_number": "y", "total": 3, "note": "kept"})
+    return entries
+
+
+_FAKE_PDFLATEX = r"""#!PYTHON
+import os
+import sys
+from pathlib import Path
+
+args = sys.argv[1:]
+if "--version" in args:
+    print("pdfTeX 3.141592653-2.6-1.40.26 (fake)")
+    raise SystemExit(0)
+options = dict(arg[1:].split("=", 1) for arg in args if arg.startswith("-") and "=" in arg)
+tex = Path(args[-1])
+jobname = options.get("jobname", tex.stem)
+log_dir = Path(LOG_DIR)
+
+if "-ini" in args:
+    with open(log_dir / "formats.log", "a") as log:
+        log.write(jobname + "\n")
+    Path(jobname + ".fmt").write_bytes(tex.read_bytes())
+    raise SystemExit(0)
+
+source = tex.read_bytes()
+if "fmt" in options:
+    search = os.environ.get("TEXFORMATS", "").split(os.pathsep)
+    found = [Path(d) / (options["fmt"] + ".fmt") for d in search if d]
+    found = [path for path in found if path.is_file()]
+    if not found:
+        raise SystemExit(1)
+    source = found[0].read_bytes().replace(b"\n\\dump\n", b"") + source
+
+with open(log_dir / "runs.log", "a") as log:
+    log.write("%s fmt=%s\n" % (Path.cwd() / tex.name, options.get("fmt", "")))
+Path(jobname + ".pdf").write_bytes(b"%PDF-fake\n" + source)
+# One page per 4 KB of source, recorded like \label{LastPage} would be.
+pages = len(source) // 4096 + 1
+Path(jobname + ".aux").write_text("\\newlabel{LastPage}{{%d}}\n" % pages)
+"""
+
+
+def fake_pdflatex(directory: Path) -> Path:
+    """Write a pdflatex stand-in that logs runs, copies the source to a .pdf and writes an .aux.
+
+    It understands ``-ini`` (dumps the input as the format), ``-fmt`` (looked up via
+    ``TEXFORMATS`` and prepended to the source) and ``-jobname``.
+    """
+
+    script = directory / "pdflatex"
+    script.write_text(
+        _FAKE_PDFLATEX.replace("PYTHON", sys.executable, 1).replace(
+            "LOG_DIR", repr(str(directory)), 1
+        ),
+        encoding="utf-8",
+    )
+    script.chmod(0o755)
+    return script
+
+
+def pdflatex_runs(directory: Path) -> int:
+    log = directory / "runs.log"
+    return len(log.read_text().splitlines()) if log.exists() else 0
+
+
+class RenderTestCase(unittest.TestCase):
+    """Temporary invoice root with a fake pdflatex patched in."""
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.tmp = Path(self.tempdir.name)
+
+        self.invoice_root = self.tmp / ".mad_invoice"
+        self.invoice_root.mkdir(parents=True, exist_ok=True)
+
+        env_patch = unittest.mock.patch.dict(os.environ, {"MAD_INVOICE_ROOT": str(self.invoice_root)})
+        env_patch.start()
+        self.addCleanup(env_patch.stop)
+
+        pdflatex_patch = unittest.mock.patch(
+            "bridge.backends.invoices._PDFLATEX_PATH", str(fake_pdflatex(self.tmp))
+        )
+        pdflatex_patch.start()
+        self.addCleanup(pdflatex_patch.stop)
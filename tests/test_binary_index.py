@@ -0,0 +1,165 @@
+import itertools
+import os
+import sys
+import tempfile
+import unittest
+from datetime import date
+from pathlib import Path
+from unittest.mock import patch
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from bridge.backends.invoices import list_invoices_impl
+from bridge.backends.invoices_binindex import BinaryIndex, encode_binary_index
+from bridge.backends.invoices_index import INDEX_CACHE
+from bridge.backends.invoices_models import Invoice, LineItem
+from bridge.backends import invoices_index
+from bridge.backends.invoices_storage import with_index_lock
+from bridge.backends.invoices_store import FilesystemInvoiceStore
+from tests.helpers import index_entries, make_invoice
+
+
+def _numbered_invoice(number: int) -> Invoice:
+    return make_invoice(
+        f"2024-{number:04d}",
+        invoice_date=date(2024, 1 + number % 12, 1 + number % 7),
+        due_date=date(2025, 1, 1 + number % 5),
+        customer_name=["Bob GmbH", "carol AG", "Dave"][number % 3],
+        items=[LineItem(description="Consulting", quantity=1 + number % 4, unit_price=100.0)],
+        payment_status=["open", "paid"][number % 2],
+    )
+
+
+class BinaryIndexFormatTests(unittest.TestCase):
+    def test_round_trips_entries_and_columns(self):
+        entries = index_entries()
+        binary = BinaryIndex(Path("index.bin"), encode_binary_index(entries))
+
+        self.assertEqual(len(binary), len(entries))
+        self.assertEqual([binary.entry(pos) for pos in range(len(entries))], entries)
+        self.assertEqual(binary.to_columns().to_dicts(), entries)
+
+    def test_rejects_foreign_files(self):
+        with self.assertRaises(ValueError):
+            BinaryIndex(Path("index.bin"), b"{" + b" " * 80)
+
+
+class BinaryIndexStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+
+        self.invoice_root = Path(self.tempdir.name) / ".mad_invoice"
+        self.invoice_root.mkdir(parents=True, exist_ok=True)
+
+        self.env_patch = patch.dict(
+            os.environ,
+            {"MAD_INVOICE_ROOT": str(self.invoice_root), "MAD_INVOICE_INDEX_FORMAT": "binary"},
+        )
+        self.env_patch.start()
+        self.addCleanup(self.env_patch.stop)
+        # Background encodings must finish before the directory is removed.
+        self.addCleanup(INDEX_CACHE.wait_for_binary)
+
+        store = FilesystemInvoiceStore()
+        for number in range(1, 31):
+            store.save_invoice(_numbered_invoice(number))
+        INDEX_CACHE.snapshot()
+        INDEX_CACHE.wait_for_binary()
+
+    def _walk(self, **kwargs) -> list[str]:
+        ids: list[str] = []
+        cursor = None
+        while True:
+            result = list_invoices_impl(limit=7, cursor=cursor, **kwargs)
+            ids.extend(invoice["id"] for invoice in result["invoices"])
+            cursor = result["next_cursor"]
+            if cursor is None:
+                return ids
+
+    def test_pages_match_json_index(self):
+        self.assertIsNotNone(INDEX_CACHE.snapshot().binary)
+
+        for sort_by, direction, filters in itertools.product(
+            ["invoice_date", "customer", "total", "due_date"],
+            ["asc", "desc"],
+            [{}, {"payment_status": "paid"}],
+        ):
+            with self.subTest(sort_by=sort_by, direction=direction, filters=filters):
+                from_binary = self._walk(sort_by=sort_by, direction=direction, **filters)
+                offset_page = list_invoices_impl(
+                    limit=5, offset=3, sort_by=sort_by, direction=direction, **filters
+                )
+                with patch.dict(os.environ, {"MAD_INVOICE_INDEX_FORMAT": "json"}):
+                    self.assertEqual(
+                        from_binary, self._walk(sort_by=sort_by, direction=direction, **filters)
+                    )
+                    self.assertEqual(
+                        offset_page,
+                        list_invoices_impl(
+                            limit=5, offset=3, sort_by=sort_by, direction=direction, **filters
+                        ),
+                    )
+
+    def test_unfiltered_pages_decode_without_building_columns(self):
+        snapshot = INDEX_CACHE.snapshot()
+        self.assertIsNotNone(snapshot.binary)
+
+        result = list_invoices_impl(limit=5)
+        self.assertEqual(result["total_count"], 30)
+        self.assertFalse(snapshot.has_columns)
+
+        store = FilesystemInvoiceStore()
+        for direction in ("asc", "desc"):
+            everything = store.query_index(limit=None, offset=5, direction=direction)
+            self.assertEqual(len(everything.entries), 25)
+            self.assertFalse(everything.has_more)
+        self.assertFalse(snapshot.has_columns)
+
+        list_invoices_impl(limit=5, payment_status="open")
+        self.assertTrue(snapshot.has_columns)
+
+    def test_writes_leave_a_stale_file_that_reads_ignore_until_reencoded(self):
+        stale = (self.invoice_root / "index.bin").read_bytes()
+        with patch(
+            "bridge.backends.invoices_index.write_binary_index",
+            wraps=invoices_index.write_binary_index,
+        ) as write:
+            store = FilesystemInvoiceStore()
+            store.save_invoice(_numbered_invoice(31))
+            store.save_invoice(_numbered_invoice(32))
+            self.assertEqual((self.invoice_root / "index.bin").read_bytes(), stale)
+            write.assert_not_called()
+
+            self.assertEqual(list_invoices_impl(limit=1)["total_count"], 32)
+            list_invoices_impl(limit=1)
+            INDEX_CACHE.wait_for_binary()
+            self.assertEqual(write.call_count, 1)
+        snapshot = INDEX_CACHE.snapshot()
+        self.assertIsNotNone(snapshot.binary)
+        self.assertEqual(snapshot.count, 32)
+
+    def test_encoding_does_not_wait_for_the_index_lock(self):
+        FilesystemInvoiceStore().save_invoice(_numbered_invoice(31))
+        with with_index_lock():
+            self.assertEqual(list_invoices_impl(limit=1)["total_count"], 31)
+            INDEX_CACHE.wait_for_binary(timeout=10)
+            self.assertEqual(INDEX_CACHE.snapshot().binary.count, 31)
+
+    def test_binary_index_from_an_older_format_is_replaced(self):
+        (self.invoice_root / "index.bin").write_bytes(b"MADINDEX\x01\x00" + b"\x00" * 80)
+        self.assertEqual(list_invoices_impl(limit=1)["total_count"], 30)
+        INDEX_CACHE.wait_for_binary()
+        self.assertIsNotNone(INDEX_CACHE.snapshot().binary)
+
+    def test_json_writes_drop_stale_binary_index(self):
+        with patch.dict(os.environ, {"MAD_INVOICE_INDEX_FORMAT": "json"}):
+            FilesystemInvoiceStore().save_invoice(_numbered_invoice(31))
+        self.assertFalse((self.invoice_root / "index.bin").exists())
+        self.assertEqual(list_invoices_impl(limit=1)["total_count"], 31)
+
+
+if __name__ == "__main__":
+    unittest.main()
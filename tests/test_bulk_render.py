@@ -0,0 +1,109 @@
+import io
+import json
+import os
+import sys
+import unittest
+import unittest.mock
+from contextlib import redirect_stdout
+from datetime import date
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+os.environ.setdefault("MCP_ENABLE_WRITES", "1")
+
+from mcp.server.fastmcp.exceptions import ToolError
+
+from bridge import maintenance
+from bridge.backends.invoices import (
+    render_invoices_bulk_impl,
+    render_invoices_merged,
+    select_invoice_ids,
+)
+from bridge.backends.invoices_store import get_store
+from tests.helpers import RenderTestCase, make_invoice, pdflatex_runs
+
+
+class BulkRenderTests(RenderTestCase):
+    def setUp(self):
+        super().setUp()
+        store = get_store()
+        for number, month in ((1, 1), (2, 2), (3, 2)):
+            store.save_invoice(
+                make_invoice(
+                    f"2024-000{number}",
+                    invoice_date=date(2024, month, 10),
+                    due_date=date(2024, month, 24),
+                    payment_status="paid" if number == 3 else "open",
+                )
+            )
+
+    def test_selects_by_ids_or_filters(self):
+        self.assertEqual(
+            select_invoice_ids(["2024-0002", "2024-0001", "2024-0002"]), ["2024-0002", "2024-0001"]
+        )
+        self.assertEqual(
+            select_invoice_ids(invoice_date_from="2024-02-01", invoice_date_to="2024-02-29"),
+            ["2024-0002", "2024-0003"],
+        )
+        self.assertEqual(select_invoice_ids(payment_status="paid"), ["2024-0003"])
+        with self.assertRaises(ToolError):
+            select_invoice_ids()
+        with self.assertRaises(ToolError):
+            select_invoice_ids(["2024-0001"], status="draft")
+
+    def test_reports_per_invoice_results_and_keeps_going_after_errors(self):
+        result = render_invoices_bulk_impl(["2024-0001", "missing", "2024-0002"])
+
+        self.assertEqual([item["status"] for item in result["results"]], ["ok", "error", "ok"])
+        self.assertEqual(result["results"][1]["invoice_id"], "missing")
+        self.assertEqual((result["count"], result["rendered"], result["failed"]), (3, 2, 1))
+
+        again = render_invoices_bulk_impl(["2024-0001", "2024-0002"])
+        self.assertEqual((again["rendered"], again["cached"]), (0, 2))
+
+    def test_parallel_workers_render_into_separate_build_dirs(self):
+        result = render_invoices_bulk_impl(status="draft", workers=2)
+
+        self.assertEqual(result["workers"], 2)
+        self.assertEqual(result["failed"], 0, result)
+        pdfs = [Path(item["pdf_path"]) for item in result["results"]]
+        self.assertEqual([pdf.parent.name for pdf in pdfs], ["2024-0001", "2024-0002", "2024-0003"])
+        self.assertTrue(all(pdf.is_file() for pdf in pdfs))
+
+    def test_merged_render_is_one_pdflatex_job_with_per_invoice_page_numbers(self):
+        result = render_invoices_bulk_impl(["2024-0002", "2024-0001"], merge=True)
+
+        self.assertTrue(result["merged"])
+        self.assertEqual(result["invoice_ids"], ["2024-0002", "2024-0001"])
+        pdf = Path(result["pdf_path"])
+        self.assertEqual(pdf.name, "statement.pdf")
+        self.assertEqual(pdf.parent.parent, self.invoice_root / "merged")
+        source = Path(result["tex_path"]).read_text(encoding="utf-8")
+        self.assertEqual(source.count("\\documentclass"), 1)
+        self.assertEqual(source.count("\\begin{document}"), 1)
+        self.assertEqual(source.count("\\setcounter{page}{1}"), 2)
+        self.assertLess(source.index("% 2024-0002"), source.index("% 2024-0001"))
+        self.assertIn("\\pageref{LastPage-1}", source)
+        self.assertIn("\\label{LastPage-2}", source)
+        self.assertNotIn("{LastPage}", source)
+        # Every pdflatex run belongs to the single merged job.
+        self.assertEqual(pdflatex_runs(self.tmp), result["passes"])
+
+        self.assertTrue(render_invoices_merged(["2024-0002", "2024-0001"])["cached"])
+        with self.assertRaises(ToolError):
+            render_invoices_merged(["2024-0001", "missing"])
+
+    def test_cli_subcommand(self):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            maintenance.main(["render-invoices", "--payment-status", "open"])
+
+        result = json.loads(output.getvalue())
+        self.assertEqual([item["invoice_id"] for item in result["results"]], ["2024-0001", "2024-0002"])
+
+
+if __name__ == "__main__":
+    unittest.main()
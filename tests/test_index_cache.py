@@ -0,0 +1,72 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from bridge.backends.invoices_index import IndexCache
+from bridge.backends.invoices_storage import save_index
+
+
+class IndexCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+
+        self.invoice_root = Path(self.tempdir.name) / ".mad_invoice"
+        self.invoice_root.mkdir(parents=True, exist_ok=True)
+
+        self.env_patch = patch.dict(os.environ, {"MAD_INVOICE_ROOT": str(self.invoice_root)})
+        self.env_patch.start()
+        self.addCleanup(self.env_patch.stop)
+
+        self.cache = IndexCache()
+
+    def test_missing_index_returns_empty_payload(self):
+        payload = self.cache.load()
+
+        self.assertEqual(payload, {"count": 0, "invoices": []})
+        self.assertEqual(self.cache.stats()["misses"], 0)
+
+    def test_unchanged_file_is_served_from_cache(self):
+        save_index({"count": 1, "invoices": [{"id": "1"}]})
+
+        first = self.cache.load()
+        second = self.cache.load()
+
+        self.assertIs(first, second)
+        stats = self.cache.stats()
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hits"], 1)
+
+    def test_replaced_file_is_reparsed(self):
+        save_index({"count": 1, "invoices": [{"id": "1"}]})
+        self.cache.load()
+
+        save_index({"count": 2, "invoices": [{"id": "1"}, {"id": "2"}]})
+        payload = self.cache.load()
+
+        self.assertEqual(payload["count"], 2)
+        self.assertEqual(self.cache.stats()["misses"], 2)
+
+    def test_in_place_edit_with_new_size_is_detected(self):
+        index_path = self.invoice_root / "index.json"
+        index_path.write_text(json.dumps({"count": 0, "invoices": []}), encoding="utf-8")
+        self.cache.load()
+
+        index_path.write_text(
+            json.dumps({"count": 1, "invoices": [{"id": "edited"}]}), encoding="utf-8"
+        )
+        payload = self.cache.load()
+
+        self.assertEqual(payload["invoices"][0]["id"], "edited")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import itertools
+import sys
+import unittest
+from datetime import date
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from bridge.backends.invoices_columns import ColumnarIndex, IndexRow
+from bridge.backends.invoices_index import (
+    _filter_index_entries,
+    _sort_index_entries,
+    index_sort_key,
+)
+from tests.helpers import index_entries
+
+
+class ColumnarIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.entries = index_entries()
+        self.columns = ColumnarIndex.from_entries(self.entries)
+
+    def test_round_trips_entries(self):
+        self.assertEqual(self.columns.to_dicts(), self.entries)
+        row = self.columns.row(len(self.entries) - 1)
+        self.assertIsInstance(row, IndexRow)
+        self.assertEqual(row["note"], "kept")
+        self.assertIsNone(row.get("status"))
+        self.assertNotIn("status", row)
+
+    def test_repeated_values_share_codes(self):
+        currency = self.columns.columns["currency"]
+        self.assertEqual(len(currency.values), 2)  # "EUR" plus the missing marker
+        self.assertEqual(currency.codes.typecode, "H")
+
+    def test_sort_matches_dict_entries(self):
+        for sort_by, direction in itertools.product(
+            ["invoice_date", "due_date", "customer", "invoice_number", "total", "bogus"],
+            ["asc", "desc"],
+        ):
+            with self.subTest(sort_by=sort_by, direction=direction):
+                expected = _sort_index_entries(self.entries, sort_by, direction)
+                self.assertEqual(_sort_index_entries(self.columns, sort_by, direction), expected)
+                key = self.columns.sort_key(sort_by)
+                self.assertEqual(
+                    [key(pos) for pos in range(len(self.entries))],
+                    [index_sort_key(sort_by)(entry) for entry in self.entries],
+                )
+
+    def test_filter_matches_dict_entries(self):
+        for filters in [
+            {},
+            {"status": "final"},
+            {"payment_status": "paid", "customer_query": "acme"},
+            {"invoice_date_from": date(2024, 3, 1), "invoice_date_to": date(2024, 8, 31)},
+            {"status": "missing"},
+        ]:
+            with self.subTest(filters=filters):
+                self.assertEqual(
+                    _filter_index_entries(self.columns, **filters),
+                    _filter_index_entries(self.entries, **filters),
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
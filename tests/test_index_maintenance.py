@@ -0,0 +1,146 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from bridge.backends.invoices_rebuild import scan_invoices
+from bridge.backends.invoices_storage import (
+    rebuild_index,
+    remove_index_entry,
+    save_invoice,
+    upsert_index_entry,
+)
+from bridge.backends.invoices_store import FilesystemInvoiceStore
+from tests.helpers import make_invoice
+
+
+class IndexMaintenanceTests(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+
+        self.invoice_root = Path(self.tempdir.name) / ".mad_invoice"
+        self.invoice_root.mkdir(parents=True, exist_ok=True)
+
+        self.env_patch = patch.dict(os.environ, {"MAD_INVOICE_ROOT": str(self.invoice_root)})
+        self.env_patch.start()
+        self.addCleanup(self.env_patch.stop)
+
+    def _read_index(self) -> dict:
+        return json.loads((self.invoice_root / "index.json").read_text(encoding="utf-8"))
+
+    def test_upsert_keeps_entries_sorted_and_replaces_existing(self):
+        for invoice_id in ("2024-0002", "2024-0003", "2024-0001"):
+            invoice = make_invoice(invoice_id)
+            save_invoice(invoice)
+            upsert_index_entry(invoice.to_index_entry())
+
+        paid = make_invoice("2024-0002", payment_status="paid")
+        save_invoice(paid)
+        upsert_index_entry(paid.to_index_entry())
+
+        index = self._read_index()
+        self.assertEqual(index["count"], 3)
+        self.assertEqual(
+            [entry["id"] for entry in index["invoices"]],
+            ["2024-0001", "2024-0002", "2024-0003"],
+        )
+        self.assertEqual(index["invoices"][1]["payment_status"], "paid")
+
+    def test_remove_drops_only_matching_entry(self):
+        for invoice_id in ("2024-0001", "2024-0002"):
+            invoice = make_invoice(invoice_id)
+            save_invoice(invoice)
+            upsert_index_entry(invoice.to_index_entry())
+
+        remove_index_entry("2024-0001")
+        remove_index_entry("missing")
+
+        index = self._read_index()
+        self.assertEqual(index["count"], 1)
+        self.assertEqual([entry["id"] for entry in index["invoices"]], ["2024-0002"])
+
+    def test_updates_reuse_the_last_written_index_until_the_file_changes(self):
+        first = make_invoice("2024-0001")
+        upsert_index_entry(first.to_index_entry())
+
+        with patch("bridge.backends.invoices_storage._read_json") as read:
+            upsert_index_entry(make_invoice("2024-0002").to_index_entry())
+            remove_index_entry("2024-0001")
+        read.assert_not_called()
+
+        # Written by another process: the new file is parsed, not the stale copy.
+        (self.invoice_root / "index.json").write_text(
+            json.dumps({"count": 1, "invoices": [first.to_index_entry()]}), encoding="utf-8"
+        )
+        upsert_index_entry(make_invoice("2024-0003").to_index_entry())
+        self.assertEqual(
+            [entry["id"] for entry in self._read_index()["invoices"]], ["2024-0001", "2024-0003"]
+        )
+
+    def test_upsert_rebuilds_missing_index_once(self):
+        existing = make_invoice("2024-0001")
+        save_invoice(existing)
+
+        new = make_invoice("2024-0002")
+        save_invoice(new)
+        upsert_index_entry(new.to_index_entry())
+
+        index = self._read_index()
+        self.assertEqual(
+            [entry["id"] for entry in index["invoices"]], ["2024-0001", "2024-0002"]
+        )
+
+    def test_rebuild_index_repairs_stale_index(self):
+        invoice = make_invoice("2024-0001")
+        save_invoice(invoice)
+        (self.invoice_root / "index.json").write_text(
+            json.dumps({"count": 0, "invoices": []}), encoding="utf-8"
+        )
+
+        index = rebuild_index()
+
+        self.assertEqual(index["count"], 1)
+        self.assertEqual(self._read_index()["invoices"][0]["id"], "2024-0001")
+
+    def test_parallel_scan_matches_sequential_and_reports_invalid_files(self):
+        for number in range(1, 41):
+            save_invoice(make_invoice(f"2024-{number:04d}", payment_status="paid" if number % 2 else "open"))
+        invoices_dir = self.invoice_root / "invoices"
+        (invoices_dir / "broken.json").write_text("{not json", encoding="utf-8")
+        (invoices_dir / "invalid.json").write_text(json.dumps({"id": "invalid"}), encoding="utf-8")
+
+        sequential = scan_invoices(chunk_size=7)
+        parallel = scan_invoices(workers=3, chunk_size=7)
+
+        self.assertEqual(parallel.entries, sequential.entries)
+        self.assertEqual(parallel.documents, sequential.documents)
+        self.assertEqual(parallel.errors, sequential.errors)
+        self.assertEqual(len(parallel.entries), 40)
+        self.assertEqual(
+            [Path(error["path"]).name for error in parallel.errors], ["broken.json", "invalid.json"]
+        )
+        self.assertTrue(parallel.errors[0]["error"].startswith("JSONDecodeError"))
+        self.assertTrue(parallel.errors[1]["error"].startswith("ValidationError"))
+
+    def test_store_rebuild_skips_invalid_files(self):
+        save_invoice(make_invoice("2024-0001"))
+        (self.invoice_root / "invoices" / "broken.json").write_text("{", encoding="utf-8")
+
+        result = FilesystemInvoiceStore().rebuild_index(workers=2)
+
+        self.assertEqual(result["count"], 1)
+        self.assertEqual(len(result["errors"]), 1)
+        self.assertNotIn("errors", self._read_index())
+        self.assertTrue((self.invoice_root / "search_index.json").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -67,3 +67,18 @@ def test_invoice_replacements_use_language_labels():
     assert "Phone:" in replacements["SENDER_CONTACT"]
     assert replacements["VAT_LABEL"] == "VAT"
     assert "(incl. VAT)" in replacements["TOTAL_LABEL"]
+
+
+def test_footer_tax_escapes_supplier_tax_id_once():
+    invoice = _build_invoice(
+        language="en",
+        supplier=Party(
+            name="Max Mustermann",
+            street="Main Street 1",
+            postal_code="10115",
+            city="Berlin",
+            tax_id="DE_123",
+        ),
+    )
+
+    assert _invoice_replacements(invoice)["FOOTER_TAX"] == r"Tax ID: DE\_123"
@@ -0,0 +1,96 @@
+import os
+import sys
+import tempfile
+import unittest
+import unittest.mock
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+os.environ.setdefault("MCP_ENABLE_WRITES", "1")
+
+from mcp.server.fastmcp.exceptions import ToolError
+from starlette.applications import Starlette
+from starlette.testclient import TestClient
+
+from bridge.backends.invoices import invoice_preview_html, preview_invoice_html_impl
+from bridge.backends.invoices_models import LineItem, Party
+from bridge.backends.invoices_storage import save_invoice
+from bridge.web import register_routes
+from tests.helpers import make_invoice
+
+
+class InvoicePreviewTests(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        env_patch = unittest.mock.patch.dict(
+            os.environ, {"MAD_INVOICE_ROOT": str(Path(self.tempdir.name) / ".mad_invoice")}
+        )
+        env_patch.start()
+        self.addCleanup(env_patch.stop)
+
+    def test_preview_uses_language_labels_and_escapes_html(self):
+        invoice = make_invoice(
+            "2024-0001",
+            language="en",
+            date_style="locale",
+            small_business=False,
+            vat_rate=0.19,
+            supplier=Party(
+                name="Alice",
+                business_name="A & B <Studio>",
+                street="Street 1",
+                postal_code="12345",
+                city="Berlin",
+                tax_id="DE123",
+            ),
+            items=[LineItem(description="<script>x</script>", quantity=2, unit="h", unit_price=150.0)],
+        )
+
+        html = invoice_preview_html(invoice)
+
+        self.assertIn("Invoice No.: <strong>2024-0001</strong>", html)
+        self.assertIn("January 10, 2024", html)
+        self.assertIn("A &amp; B &lt;Studio&gt;", html)
+        self.assertIn("&lt;script&gt;x&lt;/script&gt;", html)
+        self.assertNotIn("<script>x", html)
+        self.assertIn("2 h", html)
+        self.assertIn("VAT (19.0%):", html)
+        self.assertIn("Total (incl. VAT):", html)
+        self.assertIn("357.00 EUR", html)
+
+    def test_small_business_invoice_has_note_and_no_vat_row(self):
+        html = invoice_preview_html(make_invoice("2024-0001", small_business=True))
+
+        self.assertIn("Rechnungsnummer", html)
+        self.assertIn("300,00 EUR", html)
+        self.assertIn("§ 19 UStG", html)
+        self.assertNotIn("USt (", html)
+
+    def test_tool_and_web_route_render_without_pdflatex(self):
+        save_invoice(make_invoice("2024-0001"))
+        client = TestClient(self._app())
+
+        with unittest.mock.patch("subprocess.run", side_effect=AssertionError("pdflatex called")):
+            result = preview_invoice_html_impl("2024-0001")
+            response = client.get("/invoices/2024-0001/preview")
+
+        self.assertEqual(result["invoice_id"], "2024-0001")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.text, result["html"])
+        self.assertEqual(client.get("/invoices/missing/preview").status_code, 404)
+        with self.assertRaises(ToolError):
+            preview_invoice_html_impl("missing")
+
+    @staticmethod
+    def _app() -> Starlette:
+        app = Starlette()
+        register_routes(app)
+        return app
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,7 +6,8 @@ ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-from bridge.web import DEFAULT_DIRECTION, DEFAULT_SORT, _normalize_sort, _sort_index_entries
+from bridge.backends.invoices_index import _sort_index_entries
+from bridge.web import DEFAULT_DIRECTION, DEFAULT_SORT, _normalize_sort
 
 
 class InvoiceSortingTests(unittest.TestCase):
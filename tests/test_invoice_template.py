@@ -0,0 +1,70 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+os.environ.setdefault("MCP_ENABLE_WRITES", "1")
+
+from bridge.backends.invoices import (
+    _TEMPLATE_KEYS,
+    _TEMPLATE_PATH,
+    _invoice_replacements,
+    _template_values,
+)
+from bridge.backends.invoices_template import ParsedTemplate, TemplateCache
+from tests.helpers import make_invoice
+
+
+def _replace_all(source: str, values: dict[str, str]) -> str:
+    for key, value in values.items():
+        source = source.replace(f"%%{key}%%", value)
+    return source
+
+
+class ParsedTemplateTests(unittest.TestCase):
+    def test_render_matches_sequential_replace_on_shipped_template(self):
+        invoice = make_invoice("2024-0001")
+        data = _TEMPLATE_PATH.read_bytes()
+        template = ParsedTemplate.parse(_TEMPLATE_PATH, data, _TEMPLATE_KEYS)
+        values = _template_values(invoice)
+
+        self.assertEqual(template.render(values), _replace_all(data.decode("utf-8"), values))
+        self.assertEqual(template.unknown, frozenset())
+        self.assertEqual(set(_invoice_replacements(invoice)) | {"VAT_LINE"}, _TEMPLATE_KEYS)
+
+    def test_values_are_not_rescanned_and_missing_slots_stay_verbatim(self):
+        template = ParsedTemplate.parse(Path("t.tex"), b"%%A%%-%%B%%-%%C%%", {"A", "B", "D"})
+
+        self.assertEqual(template.render({"A": "%%B%%", "B": "b"}), "%%B%%-b-%%C%%")
+        self.assertEqual(template.unknown, {"C"})
+        self.assertEqual(template.unused, {"D"})
+
+
+class TemplateCacheTests(unittest.TestCase):
+    def test_reloads_only_when_file_changes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "invoice.tex"
+            path.write_text("Hello %%NAME%%", encoding="utf-8")
+            cache = TemplateCache()
+
+            first = cache.get(path, {"NAME"})
+            self.assertIs(cache.get(path, {"NAME"}), first)
+            self.assertEqual(cache.stats()["loads"], 1)
+
+            path.write_text("Goodbye %%NAME%%!", encoding="utf-8")
+            os.utime(path, ns=(0, path.stat().st_mtime_ns + 1_000_000))
+            self.assertEqual(cache.get(path, {"NAME"}).render({"NAME": "Ada"}), "Goodbye Ada!")
+            self.assertEqual(cache.stats()["loads"], 2)
+
+            path.unlink()
+            with self.assertRaises(FileNotFoundError):
+                cache.get(path, {"NAME"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,4 @@
+import base64
 import json
 import os
 import sys
@@ -10,6 +11,8 @@ ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
+from mcp.server.fastmcp.exceptions import ToolError
+
 from bridge.backends.invoices import list_invoices_impl
 
 
@@ -193,6 +196,98 @@ class ListInvoicesTests(unittest.TestCase):
         self.assertFalse(response["has_more"])
         self.assertIsNone(response["next_offset"])
 
+    def _numbered_entries(self, count: int) -> list[dict]:
+        return [
+            {
+                "id": f"2024-{number:04d}",
+                "invoice_number": f"2024-{number:04d}",
+                "invoice_date": f"2024-01-{(number % 3) + 1:02d}",
+                "customer": "Alpha GmbH",
+                "currency": "EUR",
+                "total": float(number),
+                "status": "final",
+                "payment_status": "open",
+            }
+            for number in range(1, count + 1)
+        ]
+
+    def test_cursor_walk_visits_every_entry_once(self):
+        entries = self._numbered_entries(7)
+        self._write_index(entries)
+
+        seen: list[str] = []
+        cursor = None
+        while True:
+            response = list_invoices_impl(limit=3, cursor=cursor)
+            if cursor is not None:
+                self.assertIsNone(response["next_offset"])
+            seen.extend(entry["id"] for entry in response["invoices"])
+            cursor = response["next_cursor"]
+            if cursor is None:
+                self.assertFalse(response["has_more"])
+                break
+
+        expected = list_invoices_impl(limit=100)["invoices"]
+        self.assertEqual(seen, [entry["id"] for entry in expected])
+
+    def test_cursor_is_stable_when_invoices_are_inserted(self):
+        entries = self._numbered_entries(4)
+        self._write_index(entries)
+
+        first = list_invoices_impl(limit=2, sort_by="invoice_number", direction="asc")
+        self.assertEqual(
+            [entry["id"] for entry in first["invoices"]], ["2024-0001", "2024-0002"]
+        )
+
+        entries.insert(0, {**entries[0], "id": "2023-0099", "invoice_number": "2023-0099"})
+        self._write_index(entries)
+
+        second = list_invoices_impl(
+            limit=2, sort_by="invoice_number", direction="asc", cursor=first["next_cursor"]
+        )
+        self.assertEqual(
+            [entry["id"] for entry in second["invoices"]], ["2024-0003", "2024-0004"]
+        )
+
+    def test_cursor_rejects_mismatched_sort_and_offset(self):
+        self._write_index(self._numbered_entries(3))
+        cursor = list_invoices_impl(limit=1)["next_cursor"]
+
+        with self.assertRaises(ToolError):
+            list_invoices_impl(limit=1, cursor=cursor, sort_by="total")
+        with self.assertRaises(ToolError):
+            list_invoices_impl(limit=1, cursor=cursor, offset=1)
+        with self.assertRaises(ToolError):
+            list_invoices_impl(limit=1, cursor="not-a-cursor")
+
+    def test_cursor_rejects_malformed_sort_keys(self):
+        self._write_index(self._numbered_entries(3))
+
+        def cursor(sort_by: str, direction: str, key: object) -> str:
+            payload = json.dumps({"s": sort_by, "d": direction, "k": key})
+            return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+        malformed = [
+            ("invoice_date", [1]),
+            ("invoice_date", [None, None, None]),
+            ("invoice_date", [[1]]),
+            ("invoice_date", ["2024-01-01", "2024-0001"]),
+            ("invoice_number", ["2024-0001", "2024-0001", "2024-0001"]),
+            ("total", ["1.0", "2024-0001", "2024-0001"]),
+            ("total", [True, "2024-0001", "2024-0001"]),
+            ("customer", {"k": 1}),
+        ]
+        for sort_by, key in malformed:
+            with self.subTest(sort_by=sort_by, key=key):
+                with self.assertRaisesRegex(ToolError, "Invalid cursor"):
+                    list_invoices_impl(
+                        limit=1, sort_by=sort_by, direction="asc", cursor=cursor(sort_by, "asc", key)
+                    )
+
+        valid = cursor("total", "asc", [1, "2024-0001", "2024-0001"])
+        page = list_invoices_impl(limit=5, sort_by="total", direction="asc", cursor=valid)
+        self.assertEqual([entry["id"] for entry in page["invoices"]], ["2024-0002", "2024-0003"])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,183 @@
+import os
+import sys
+import unittest
+import unittest.mock
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+os.environ.setdefault("MCP_ENABLE_WRITES", "1")
+
+from bridge.backends import invoices, invoices_latex_format
+from bridge.backends.invoices_latex_format import static_preamble
+from bridge.backends.invoices_models import LineItem
+from tests.helpers import RenderTestCase, make_invoice, pdflatex_runs
+
+
+class RenderCacheTests(RenderTestCase):
+    def test_unchanged_invoice_reuses_pdf(self):
+        first = invoices._render_invoice(make_invoice("2024-0001"))
+        runs = pdflatex_runs(self.tmp)
+        second = invoices._render_invoice(make_invoice("2024-0001"))
+
+        self.assertFalse(first["cached"])
+        self.assertTrue(second["cached"])
+        self.assertEqual(second["pdf_path"], first["pdf_path"])
+        self.assertEqual(pdflatex_runs(self.tmp), runs)
+        self.assertEqual(second["passes"], 0)
+
+    def test_changed_content_or_missing_pdf_renders_again(self):
+        invoices._render_invoice(make_invoice("2024-0001"))
+        changed = invoices._render_invoice(make_invoice("2024-0001", project="Relaunch"))
+        self.assertFalse(changed["cached"])
+
+        Path(changed["pdf_path"]).unlink()
+        self.assertFalse(invoices._render_invoice(make_invoice("2024-0001", project="Relaunch"))["cached"])
+
+    def test_pdflatex_version_is_part_of_the_key(self):
+        invoices._render_invoice(make_invoice("2024-0001"))
+        with unittest.mock.patch.object(invoices, "pdflatex_version", return_value="pdfTeX newer"):
+            self.assertFalse(invoices._render_invoice(make_invoice("2024-0001"))["cached"])
+
+
+class AdaptivePassesTests(RenderTestCase):
+    def test_first_render_runs_two_passes_then_one_when_aux_is_stable(self):
+        first = invoices._render_invoice(make_invoice("2024-0001"))
+        self.assertEqual(first["passes"], 2)
+        self.assertEqual(pdflatex_runs(self.tmp), 2)
+
+        changed = invoices._render_invoice(make_invoice("2024-0001", project="Relaunch"))
+        self.assertEqual(changed["passes"], 1)
+        self.assertEqual(pdflatex_runs(self.tmp), 3)
+
+    def test_changed_page_references_trigger_another_pass(self):
+        invoices._render_invoice(make_invoice("2024-0001"))
+        items = [LineItem(description="Consulting " * 40, quantity=1, unit_price=10.0)] * 20
+        longer = make_invoice("2024-0001", items=items)
+
+        self.assertEqual(invoices._render_invoice(longer)["passes"], 2)
+
+
+class PrecompiledPreambleTests(RenderTestCase):
+    def _format_builds(self) -> int:
+        log = self.tmp / "formats.log"
+        return len(log.read_text().splitlines()) if log.exists() else 0
+
+    def test_static_preamble_stops_at_first_placeholder(self):
+        preamble = static_preamble(invoices._TEMPLATE_PATH.read_text(encoding="utf-8"))
+
+        self.assertTrue(preamble.startswith("\\documentclass"))
+        self.assertIn("\\usepackage{microtype}", preamble)
+        self.assertNotIn("%%", preamble)
+        self.assertNotIn("\\begin{document}", preamble)
+
+    def test_format_is_built_once_and_used_for_every_render(self):
+        first = invoices._render_invoice(make_invoice("2024-0001"))
+        second = invoices._render_invoice(make_invoice("2024-0002"))
+
+        self.assertTrue(first["precompiled_preamble"])
+        self.assertTrue(second["precompiled_preamble"])
+        self.assertEqual(self._format_builds(), 1)
+        self.assertEqual(len(list((self.invoice_root / "formats").glob("*.fmt"))), 1)
+        runs = (self.tmp / "runs.log").read_text().splitlines()
+        self.assertTrue(all(" fmt=invoice-preamble-" in line for line in runs))
+        # Format plus body compile to the same document as the full source.
+        self.assertEqual(
+            Path(first["pdf_path"]).read_bytes(),
+            b"%PDF-fake\n" + Path(first["tex_path"]).read_bytes(),
+        )
+
+    def test_disabled_or_failed_format_falls_back_to_full_source(self):
+        with unittest.mock.patch.dict(os.environ, {"MAD_INVOICE_PRECOMPILED_PREAMBLE": "0"}):
+            self.assertFalse(invoices._render_invoice(make_invoice("2024-0001"))["precompiled_preamble"])
+        self.assertEqual(self._format_builds(), 0)
+
+        with unittest.mock.patch.object(
+            invoices_latex_format, "_build_format", return_value=False
+        ) as build:
+            self.assertFalse(invoices._render_invoice(make_invoice("2024-0002"))["precompiled_preamble"])
+            self.assertFalse(invoices._render_invoice(make_invoice("2024-0003"))["precompiled_preamble"])
+        # The failure is remembered instead of retried on every render.
+        self.assertEqual(build.call_count, 1)
+
+    def test_failed_format_build_is_retried_after_its_delay(self):
+        cases = [
+            (False, invoices_latex_format.RETRY_REJECTED_AFTER_S),
+            (None, invoices_latex_format.RETRY_ERROR_AFTER_S),
+        ]
+        for outcome, delay in cases:
+            with self.subTest(outcome=outcome):
+                for marker in (self.invoice_root / "formats").glob("*.failed"):
+                    marker.unlink()
+                now = 1_000_000.0
+                with unittest.mock.patch.object(
+                    invoices_latex_format, "_build_format", return_value=outcome
+                ) as build, unittest.mock.patch.object(
+                    invoices_latex_format.time, "time", side_effect=lambda: now
+                ):
+                    invoices._render_invoice(make_invoice("2024-0001", project=f"a{outcome}"))
+                    now += delay - 1
+                    invoices._render_invoice(make_invoice("2024-0001", project=f"b{outcome}"))
+                    self.assertEqual(build.call_count, 1)
+                    now += 2
+                    invoices._render_invoice(make_invoice("2024-0001", project=f"c{outcome}"))
+                    self.assertEqual(build.call_count, 2)
+
+        # Once the environment is fixed the retry builds the format and clears the marker.
+        for marker in (self.invoice_root / "formats").glob("*.failed"):
+            marker.write_text("", encoding="utf-8")  # pre-retry marker without a retry time
+        result = invoices._render_invoice(make_invoice("2024-0001", project="fixed"))
+        self.assertTrue(result["precompiled_preamble"])
+        self.assertEqual(list((self.invoice_root / "formats").glob("*.failed")), [])
+
+
+class ScratchRenderTests(RenderTestCase):
+    def setUp(self):
+        super().setUp()
+        self.scratch = self.tmp / "tmpfs"
+        env_patch = unittest.mock.patch.dict(
+            os.environ, {"MAD_INVOICE_RENDER_SCRATCH": str(self.scratch)}
+        )
+        env_patch.start()
+        self.addCleanup(env_patch.stop)
+
+    def test_only_the_pdf_lands_in_the_build_dir(self):
+        result = invoices._render_invoice(make_invoice("2024-0001"))
+
+        build_dir = self.invoice_root / "build" / "2024-0001"
+        self.assertEqual(
+            sorted(p.name for p in build_dir.iterdir()),
+            ["invoice.aux", "invoice.pdf", "render.json"],
+        )
+        self.assertIsNone(result["tex_path"])
+        self.assertTrue(Path(result["pdf_path"]).read_bytes().startswith(b"%PDF-fake\n"))
+        runs = (self.tmp / "runs.log").read_text().splitlines()
+        self.assertTrue(all(line.startswith(str(self.scratch)) for line in runs))
+        # The per-render scratch directory is removed afterwards.
+        self.assertEqual(list(self.scratch.iterdir()), [])
+
+        self.assertTrue(invoices._render_invoice(make_invoice("2024-0001"))["cached"])
+
+    def test_rerender_reuses_the_previous_aux(self):
+        first = invoices._render_invoice(make_invoice("2024-0001"))
+        second = invoices._render_invoice(make_invoice("2024-0001", project="Relaunch"))
+
+        # The first render creates the .aux and needs a second pass; the re-render
+        # starts from it and its page references did not move.
+        self.assertEqual((first["passes"], second["passes"]), (2, 1))
+        self.assertFalse(second["cached"])
+
+    def test_keep_sources_copies_intermediates(self):
+        with unittest.mock.patch.dict(os.environ, {"MAD_INVOICE_KEEP_RENDER_SOURCES": "1"}):
+            result = invoices._render_invoice(make_invoice("2024-0001"))
+
+        build_dir = self.invoice_root / "build" / "2024-0001"
+        names = {p.name for p in build_dir.iterdir()}
+        self.assertTrue({"invoice.tex", "invoice.aux", "invoice.pdf"} <= names)
+        self.assertEqual(result["tex_path"], str(build_dir / "invoice.tex"))
+
+
+if __name__ == "__main__":
+    unittest.main()
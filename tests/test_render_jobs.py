@@ -0,0 +1,197 @@
+import os
+import sys
+import threading
+import time
+import unittest
+import unittest.mock
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+os.environ.setdefault("MCP_ENABLE_WRITES", "1")
+
+from mcp.server.fastmcp.exceptions import ToolError
+from starlette.applications import Starlette
+from starlette.testclient import TestClient
+
+from bridge.backends.invoices import get_render_job_impl, render_invoice_pdf_impl
+from bridge.backends.invoices_render_jobs import (
+    RenderQueue,
+    RenderQueueFull,
+    RenderSingleFlight,
+    get_render_queue,
+    reset_render_queue,
+)
+from bridge.backends.invoices_storage import save_invoice
+from bridge.web import register_routes
+from tests.helpers import RenderTestCase, make_invoice
+
+
+class RenderQueueTests(unittest.TestCase):
+    def setUp(self):
+        self.queue = RenderQueue(workers=1, max_pending=2)
+        self.addCleanup(self.queue.shutdown)
+
+    def test_reports_depth_utilization_and_rejects_when_full(self):
+        release = threading.Event()
+        started = threading.Event()
+
+        def blocked():
+            started.set()
+            release.wait(5)
+            return {"pdf_path": "/tmp/x.pdf"}
+
+        running = self.queue.submit("2024-0001", blocked)
+        queued = self.queue.submit("2024-0002", lambda: {"pdf_path": "/tmp/y.pdf"})
+        started.wait(5)
+
+        stats = self.queue.stats()
+        self.assertEqual((stats["running"], stats["queued"], stats["utilization"]), (1, 1, 1.0))
+        with self.assertRaises(RenderQueueFull):
+            self.queue.submit("2024-0003", blocked)
+        self.assertEqual(self.queue.stats()["rejected"], 1)
+
+        release.set()
+        self.assertEqual(self.queue.wait(running.id, timeout=5).status, "succeeded")
+        done = self.queue.wait(queued.id, timeout=5).to_dict()
+        self.assertEqual(done["pdf_path"], "/tmp/y.pdf")
+        self.assertIsNotNone(done["run_s"])
+        self.assertEqual(self.queue.stats()["utilization"], 0.0)
+
+    def test_failures_are_recorded_on_the_job(self):
+        def broken():
+            raise ToolError("pdflatex failed with exit code 1")
+
+        job = self.queue.wait(self.queue.submit("2024-0001", broken).id, timeout=5)
+
+        self.assertEqual(job.status, "failed")
+        self.assertEqual(job.error, "pdflatex failed with exit code 1")
+        self.assertEqual(self.queue.stats()["failed"], 1)
+
+
+class SingleFlightTests(unittest.TestCase):
+    def test_concurrent_calls_for_same_content_share_one_render(self):
+        flights = RenderSingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def render():
+            calls.append(1)
+            release.wait(5)
+            return {"pdf_path": "/tmp/x.pdf"}
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(flights.run("2024-0001", "abc", render)))
+            for _ in range(3)
+        ]
+        for thread in threads:
+            thread.start()
+        while flights.stats()["coalesced"] < 2:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(result["coalesced"] for result in results), [False, True, True])
+        self.assertEqual(flights.stats(), {"in_flight": 0, "renders": 1, "coalesced": 2})
+
+    def test_different_content_for_same_invoice_runs_serially(self):
+        flights = RenderSingleFlight()
+        active = []
+        overlaps = []
+
+        def render():
+            active.append(1)
+            overlaps.append(len(active))
+            time.sleep(0.05)
+            active.pop()
+            return {}
+
+        threads = [
+            threading.Thread(target=flights.run, args=("2024-0001", key, render))
+            for key in ("a", "b", "c")
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(overlaps, [1, 1, 1])
+        self.assertEqual(flights.stats()["coalesced"], 0)
+
+    def test_errors_propagate_to_waiters(self):
+        flights = RenderSingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+
+        def broken():
+            started.set()
+            release.wait(5)
+            raise ToolError("pdflatex failed with exit code 1")
+
+        errors = []
+
+        def call():
+            try:
+                flights.run("2024-0001", "abc", broken)
+            except ToolError as exc:
+                errors.append(str(exc))
+
+        leader = threading.Thread(target=call)
+        leader.start()
+        started.wait(5)
+        follower = threading.Thread(target=call)
+        follower.start()
+        while flights.stats()["coalesced"] < 1:
+            time.sleep(0.01)
+        release.set()
+        leader.join(5)
+        follower.join(5)
+
+        self.assertEqual(errors, ["pdflatex failed with exit code 1"] * 2)
+
+
+class BackgroundRenderTests(RenderTestCase):
+    def setUp(self):
+        super().setUp()
+        reset_render_queue()
+        self.addCleanup(reset_render_queue)
+        save_invoice(make_invoice("2024-0001"))
+
+    def test_background_render_returns_job_and_completes(self):
+        job = render_invoice_pdf_impl("2024-0001", background=True)
+        self.assertIn(job["status"], ("queued", "running", "succeeded"))
+
+        get_render_queue().wait(job["job_id"], timeout=10)
+        finished = get_render_job_impl(job["job_id"])
+        self.assertEqual(finished["status"], "succeeded")
+        self.assertTrue(Path(finished["pdf_path"]).is_file())
+        self.assertFalse(finished["result"]["cached"])
+
+        with self.assertRaises(ToolError):
+            get_render_job_impl("unknown")
+
+    def test_web_render_redirects_to_polling_detail_page(self):
+        app = Starlette()
+        register_routes(app)
+        client = TestClient(app)
+
+        response = client.post("/invoices/2024-0001/render", follow_redirects=False)
+        self.assertEqual(response.status_code, 303)
+        location = response.headers["location"]
+        self.assertTrue(location.startswith("/invoices/2024-0001?render_job="))
+        job_id = location.rsplit("=", 1)[1]
+
+        get_render_queue().wait(job_id, timeout=10)
+        status = client.get(f"/render-jobs/{job_id}").json()
+        self.assertEqual(status["status"], "succeeded")
+        self.assertIn("Render job succeeded", client.get(location).text)
+        self.assertEqual(client.get("/render-jobs/missing").status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
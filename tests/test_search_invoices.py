@@ -0,0 +1,166 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from mcp.server.fastmcp.exceptions import ToolError
+
+from bridge.backends.invoices import search_invoices_impl
+from bridge.backends import invoices_search as search_module
+from bridge.backends.invoices_search import (
+    SEARCH_INDEX_FILENAME,
+    SEARCH_JOURNAL_FILENAME,
+    SearchIndex,
+    load_search_index,
+    trigrams,
+)
+from bridge.backends.invoices_storage import save_invoice
+from bridge.backends.invoices_store import FilesystemInvoiceStore
+from bridge.backends.invoices_sqlite import SqliteInvoiceStore
+from tests.helpers import make_invoice
+
+
+class SearchInvoicesTests(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+
+        self.invoice_root = Path(self.tempdir.name) / ".mad_invoice"
+        self.invoice_root.mkdir(parents=True, exist_ok=True)
+
+        self.env_patch = patch.dict(os.environ, {"MAD_INVOICE_ROOT": str(self.invoice_root)})
+        self.env_patch.start()
+        self.addCleanup(self.env_patch.stop)
+
+    def _seed(self, store):
+        store.save_invoice(
+            make_invoice("2024-0001", customer_name="Bob GmbH", description="XYZ migration work")
+        )
+        store.save_invoice(
+            make_invoice(
+                "2024-0002",
+                customer_name="Carol AG",
+                description="Hosting",
+                project="Website relaunch",
+            )
+        )
+        partner = make_invoice("2024-0003", customer_name="Dave", description="Consulting")
+        partner.customer.business_name = "Migration Partners"
+        store.save_invoice(partner)
+
+    def test_trigrams_are_padded_and_normalized(self):
+        self.assertEqual(trigrams("  AB  "), {"  a", " ab", "ab "})
+        self.assertEqual(trigrams(""), set())
+
+    def test_ranks_line_items_project_and_business_name(self):
+        for store in (FilesystemInvoiceStore(), SqliteInvoiceStore()):
+            with self.subTest(engine=store.name):
+                with patch.dict(os.environ, {"MAD_INVOICE_STORAGE": store.name}):
+                    self._seed(store)
+
+                    result = search_invoices_impl("xyz migration")
+                    self.assertEqual(result["ids"][0], "2024-0001")
+                    self.assertEqual(result["results"][0]["score"], 1.0)
+
+                    self.assertEqual(
+                        set(search_invoices_impl("migraton")["ids"]), {"2024-0001", "2024-0003"}
+                    )
+                    self.assertEqual(search_invoices_impl("relaunch")["ids"], ["2024-0002"])
+                    self.assertEqual(search_invoices_impl("nothing like it")["ids"], [])
+
+    def test_index_follows_updates_and_deletes(self):
+        store = FilesystemInvoiceStore()
+        self._seed(store)
+        self.assertTrue((self.invoice_root / SEARCH_INDEX_FILENAME).exists())
+
+        store.save_invoice(
+            make_invoice("2024-0002", customer_name="Carol AG", description="Kubernetes upgrade")
+        )
+        self.assertEqual(search_invoices_impl("kubernetes")["ids"], ["2024-0002"])
+        self.assertEqual(search_invoices_impl("relaunch")["ids"], [])
+
+        store.delete_invoice("2024-0002")
+        self.assertEqual(search_invoices_impl("kubernetes")["ids"], [])
+        self.assertNotIn("2024-0002", load_search_index().documents)
+
+        # A fresh reader (another process) sees the journaled changes too.
+        payload = json.loads((self.invoice_root / SEARCH_INDEX_FILENAME).read_text())
+        fresh = SearchIndex.from_payload(payload)
+        search_module._replay_journal(
+            search_module._CachedSearchIndex((0, 0, 0), fresh),
+            self.invoice_root / SEARCH_JOURNAL_FILENAME,
+        )
+        self.assertEqual(sorted(fresh.documents), ["2024-0001", "2024-0003"])
+        self.assertEqual(fresh.search("kubernetes", limit=5), [])
+        self.assertEqual(fresh.search("xyz migration", limit=5)[0][0], "2024-0001")
+
+    def test_unchanged_search_text_skips_the_index(self):
+        store = FilesystemInvoiceStore()
+        self._seed(store)
+        journal = self.invoice_root / SEARCH_JOURNAL_FILENAME
+        index_file = self.invoice_root / SEARCH_INDEX_FILENAME
+        before = (index_file.stat().st_mtime_ns, journal.exists() and journal.stat().st_size)
+
+        store.save_invoice(
+            make_invoice(
+                "2024-0001",
+                customer_name="Bob GmbH",
+                description="XYZ migration work",
+                payment_status="paid",
+            )
+        )
+
+        self.assertEqual(
+            (index_file.stat().st_mtime_ns, journal.exists() and journal.stat().st_size), before
+        )
+
+    def test_journal_is_folded_into_the_index_file(self):
+        store = FilesystemInvoiceStore()
+        self._seed(store)
+        with patch.object(search_module, "JOURNAL_COMPACT_MIN_BYTES", 0):
+            store.save_invoice(
+                make_invoice("2024-0004", customer_name="Erin", description="Database tuning")
+            )
+
+        self.assertFalse((self.invoice_root / SEARCH_JOURNAL_FILENAME).exists())
+        payload = json.loads((self.invoice_root / SEARCH_INDEX_FILENAME).read_text())
+        self.assertIn("2024-0004", payload["documents"])
+        self.assertEqual(search_invoices_impl("database")["ids"], ["2024-0004"])
+
+    def test_missing_index_is_built_from_invoice_files(self):
+        save_invoice(
+            make_invoice("2024-0001", customer_name="Bob GmbH", description="XYZ migration work")
+        )
+        save_invoice(make_invoice("2024-0002", customer_name="Carol AG", description="Hosting"))
+
+        # The first search builds the index once and persists it.
+        with patch.object(
+            FilesystemInvoiceStore, "_iter_invoices", wraps=FilesystemInvoiceStore()._iter_invoices
+        ) as scan:
+            self.assertEqual(search_invoices_impl("xyz migration")["ids"], ["2024-0001"])
+            self.assertEqual(search_invoices_impl("hosting")["ids"], ["2024-0002"])
+        self.assertEqual(scan.call_count, 1)
+        payload = json.loads((self.invoice_root / SEARCH_INDEX_FILENAME).read_text())
+        self.assertEqual(sorted(payload["documents"]), ["2024-0001", "2024-0002"])
+
+        FilesystemInvoiceStore().save_invoice(
+            make_invoice("2024-0003", customer_name="Dave", description="Support")
+        )
+        self.assertEqual(
+            sorted(load_search_index().documents), ["2024-0001", "2024-0002", "2024-0003"]
+        )
+
+    def test_empty_query_is_rejected(self):
+        with self.assertRaises(ToolError):
+            search_invoices_impl("   ")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import itertools
+import sys
+import unittest
+from datetime import date
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from bridge.backends.invoices_index import (
+    IndexSnapshot,
+    _filter_index_entries,
+    _sort_index_entries,
+    query_index_snapshot,
+)
+
+
+def _entries(count: int) -> list[dict]:
+    customers = ["Acme GmbH", "ACME Labs", "Beta LLC", "Gamma AG"]
+    statuses = ["draft", "final"]
+    payment = ["open", "paid", "overdue", "cancelled"]
+    entries = []
+    for number in range(count):
+        entries.append(
+            {
+                "id": f"2024-{number:04d}",
+                "invoice_number": f"2024-{number:04d}",
+                "invoice_date": date(2024, 1 + number % 12, 1 + number % 28).isoformat(),
+                "customer": customers[number % len(customers)],
+                "status": statuses[number % 3 % 2],
+                "payment_status": payment[number % 5 % 4],
+                "total": float(number % 17),
+            }
+        )
+    entries.append({"id": "broken", "invoice_number": "x", "invoice_date": "n/a"})
+    return entries
+
+
+class SecondaryIndexTests(unittest.TestCase):
+    def test_matches_linear_filter_and_sort(self):
+        entries = _entries(200)
+        snapshot = IndexSnapshot(payload={"count": len(entries), "invoices": entries})
+
+        filter_sets = [
+            {},
+            {"status": "final"},
+            {"payment_status": "overdue"},
+            {"customer_query": "acme"},
+            {"status": "final", "payment_status": "open", "customer_query": "lab"},
+            {"invoice_date_from": date(2024, 4, 1), "invoice_date_to": date(2024, 6, 30)},
+            {"payment_status": "open", "invoice_date_from": date(2024, 10, 1)},
+            {"status": "missing"},
+        ]
+        for filters, sort_by, direction in itertools.product(
+            filter_sets, ["invoice_date", "customer", "total"], ["asc", "desc"]
+        ):
+            expected = _sort_index_entries(
+                _filter_index_entries(entries, **filters), sort_by, direction
+            )
+            page = query_index_snapshot(
+                snapshot,
+                **filters,
+                sort_by=sort_by,
+                direction=direction,
+                limit=15,
+                offset=5,
+            )
+            with self.subTest(filters=filters, sort_by=sort_by, direction=direction):
+                self.assertEqual(page.entries, expected[5:20])
+                self.assertEqual(page.total_count, len(expected))
+                self.assertEqual(page.has_more, len(expected) > 20)
+
+    def test_cursor_resumes_within_sparse_candidates(self):
+        entries = _entries(200)
+        snapshot = IndexSnapshot(payload={"count": len(entries), "invoices": entries})
+
+        first = query_index_snapshot(snapshot, payment_status="cancelled", limit=2)
+        second = query_index_snapshot(
+            snapshot, payment_status="cancelled", limit=2, after=first.next_key
+        )
+
+        expected = _sort_index_entries(
+            _filter_index_entries(entries, payment_status="cancelled"), "invoice_date", "desc"
+        )
+        self.assertEqual(first.entries + second.entries, expected[:4])
+
+    def test_unbounded_query_returns_every_match(self):
+        entries = _entries(50)
+        snapshot = IndexSnapshot(payload={"count": len(entries), "invoices": entries})
+
+        page = query_index_snapshot(snapshot, payment_status="paid", limit=None, offset=2)
+
+        expected = _sort_index_entries(
+            _filter_index_entries(entries, payment_status="paid"), "invoice_date", "desc"
+        )
+        self.assertEqual(page.entries, expected[2:])
+        self.assertEqual(page.total_count, len(expected))
+        self.assertFalse(page.has_more)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from datetime import date
+from pathlib import Path
+from unittest.mock import patch
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from bridge.backends.invoices_storage import (
+    iter_invoice_paths,
+    load_invoice,
+    save_invoice,
+    shard_invoice_files,
+)
+from bridge.backends.invoices_store import FilesystemInvoiceStore
+from tests.helpers import make_invoice
+
+
+class ShardedLayoutTests(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+
+        self.invoice_root = Path(self.tempdir.name) / ".mad_invoice"
+        self.invoices_dir = self.invoice_root / "invoices"
+        self.invoice_root.mkdir(parents=True, exist_ok=True)
+
+        self.env_patch = patch.dict(os.environ, {"MAD_INVOICE_ROOT": str(self.invoice_root)})
+        self.env_patch.start()
+        self.addCleanup(self.env_patch.stop)
+
+    def _sharded(self):
+        return patch.dict(os.environ, {"MAD_INVOICE_LAYOUT": "sharded"})
+
+    def test_flat_layout_stays_default(self):
+        save_invoice(make_invoice("2024-0001"))
+
+        self.assertTrue((self.invoices_dir / "2024-0001.json").is_file())
+        self.assertFalse((self.invoices_dir / "2024").exists())
+
+    def test_sharded_save_files_by_invoice_year_and_moves_stale_copy(self):
+        save_invoice(make_invoice("2024-0001"))
+        with self._sharded():
+            save_invoice(make_invoice("2024-0001", payment_status="paid"))
+            save_invoice(
+                make_invoice("2024-0002", invoice_date=date(2023, 12, 30), due_date=date(2024, 1, 5))
+            )
+
+        self.assertFalse((self.invoices_dir / "2024-0001.json").exists())
+        self.assertTrue((self.invoices_dir / "2024" / "2024-0001.json").is_file())
+        self.assertTrue((self.invoices_dir / "2023" / "2024-0002.json").is_file())
+
+        # Lookups find files in any shard, with or without the sharded setting.
+        self.assertEqual(load_invoice("2024-0001").payment_status, "paid")
+        self.assertEqual(load_invoice("2024-0002").invoice_date, date(2023, 12, 30))
+
+    def test_store_operations_span_both_layouts(self):
+        store = FilesystemInvoiceStore()
+        store.save_invoice(make_invoice("2024-0001"))
+        with self._sharded():
+            store.save_invoice(make_invoice("2024-0002"))
+
+        self.assertTrue(store.invoice_exists("2024-0002"))
+        self.assertEqual(
+            store.invoice_location("2024-0002"),
+            str(self.invoices_dir / "2024" / "2024-0002.json"),
+        )
+        self.assertEqual(store.rebuild_index()["count"], 2)
+
+        store.delete_invoice("2024-0002")
+        self.assertFalse(store.invoice_exists("2024-0002"))
+        self.assertEqual(store.index_payload()["count"], 1)
+
+    def test_date_range_lists_only_overlapping_shards(self):
+        with self._sharded():
+            for year in (2022, 2023, 2024):
+                save_invoice(
+                    make_invoice(
+                        f"{year}-0001",
+                        invoice_date=date(year, 6, 1),
+                        due_date=date(year, 6, 15),
+                    )
+                )
+        save_invoice(make_invoice("legacy", invoice_date=date(2021, 1, 1), due_date=date(2021, 1, 2)))
+
+        names = [
+            path.name
+            for path in iter_invoice_paths(
+                invoice_date_from=date(2023, 1, 1), invoice_date_to=date(2023, 12, 31)
+            )
+        ]
+        # Flat files are not grouped by year, so they are always listed.
+        self.assertEqual(names, ["2023-0001.json", "legacy.json"])
+        self.assertEqual(len(list(iter_invoice_paths())), 4)
+
+    def test_flat_store_lookups_never_list_the_invoices_directory(self):
+        store = FilesystemInvoiceStore()
+        store.save_invoice(make_invoice("2024-0001"))
+
+        with patch.object(Path, "iterdir", side_effect=AssertionError("invoices/ listed")):
+            store.save_invoice(make_invoice("2024-0002"))
+            self.assertFalse(store.invoice_exists("missing"))
+            with self.assertRaises(FileNotFoundError):
+                load_invoice("2099-0001")
+
+        self.assertFalse((self.invoices_dir / ".sharded").exists())
+
+    def test_other_shards_are_searched_once_the_store_is_sharded(self):
+        with self._sharded():
+            # The id's year prefix does not name the shard holding the file.
+            save_invoice(make_invoice("A-1", invoice_date=date(2022, 3, 1), due_date=date(2022, 3, 2)))
+
+        self.assertTrue((self.invoices_dir / ".sharded").is_file())
+        self.assertEqual(load_invoice("A-1").invoice_date, date(2022, 3, 1))
+
+    def test_migration_moves_files_and_skips_unreadable_ones(self):
+        save_invoice(make_invoice("2024-0001"))
+        save_invoice(make_invoice("2024-0002", invoice_date=date(2023, 5, 1), due_date=date(2023, 5, 2)))
+        (self.invoices_dir / "broken.json").write_text("{", encoding="utf-8")
+
+        result = shard_invoice_files()
+
+        self.assertEqual(result["moved"], 2)
+        self.assertEqual(result["shards"], ["2023", "2024"])
+        self.assertEqual([Path(item["path"]).name for item in result["skipped"]], ["broken.json"])
+        self.assertTrue((self.invoices_dir / "2023" / "2024-0002.json").is_file())
+        self.assertEqual(
+            json.loads((self.invoices_dir / "2024" / "2024-0001.json").read_text())["id"],
+            "2024-0001",
+        )
+
+        # Re-running is a no-op apart from the still unreadable file.
+        self.assertEqual(shard_invoice_files()["moved"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,195 @@
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import socket
+import sys
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import httpx
+import uvicorn
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+from starlette.testclient import TestClient
+
+from bridge import cli
+from bridge.app import MCP_SERVER
+from bridge.shim import build_openwebui_shim
+
+
+async def _chunks(*parts: bytes):
+    for part in parts:
+        yield part
+
+
+class _Upstream:
+    """Records upstream requests and answers like the MCP SSE server."""
+
+    def __init__(self):
+        self.requests: list[httpx.Request] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if request.url.path == "/sse":
+            return httpx.Response(
+                200,
+                headers={"content-type": "text/event-stream"},
+                content=_chunks(b"event: endpoint\ndata: /messages/?session_id=abc\n\n"),
+            )
+        if request.url.params.get("session_id") == "gone":
+            return httpx.Response(
+                404,
+                headers={
+                    "content-type": "application/json",
+                    "content-encoding": "gzip",
+                    "x-upstream": "mcp",
+                },
+                content=_chunks(gzip.compress(b'{"error": "Could not find session"}')),
+            )
+        # Streamed bodies, as from a real connection (bytes content counts as already read).
+        return httpx.Response(
+            202, headers={"content-type": "application/json"}, content=_chunks(b"Accep", b"ted")
+        )
+
+
+class ShimTests(unittest.TestCase):
+    def setUp(self):
+        self.upstream = _Upstream()
+        self.app = build_openwebui_shim(
+            "http://mcp.test", transport=httpx.MockTransport(self.upstream)
+        )
+
+    def _message(self, client: TestClient, method: str) -> httpx.Response:
+        return client.post(
+            "/messages/?session_id=abc",
+            content=json.dumps({"jsonrpc": "2.0", "id": 1, "method": method}),
+            headers={"content-type": "application/json"},
+        )
+
+    def test_messages_share_one_pooled_client_closed_on_shutdown(self):
+        with TestClient(self.app) as client:
+            upstream_client = self.app.state.upstream
+            for _ in range(3):
+                response = self._message(client, "tools/list")
+                self.assertEqual((response.status_code, response.text), (202, "Accepted"))
+            self.assertIs(self.app.state.upstream, upstream_client)
+            self.assertFalse(upstream_client.is_closed)
+
+        self.assertTrue(upstream_client.is_closed)
+        self.assertEqual(len(self.upstream.requests), 3)
+        self.assertEqual(
+            str(self.upstream.requests[0].url), "http://mcp.test/messages/?session_id=abc"
+        )
+
+    def test_initialize_is_followed_by_initialized_notification(self):
+        with TestClient(self.app) as client:
+            self._message(client, "initialize")
+
+        methods = [json.loads(request.content)["method"] for request in self.upstream.requests]
+        self.assertEqual(methods, ["initialize", "initialized"])
+
+    def test_message_response_bytes_status_and_headers_pass_through(self):
+        with TestClient(self.app) as client:
+            with client.stream(
+                "POST",
+                "/messages/?session_id=gone",
+                content=b"{}",
+                headers={"content-type": "application/json", "accept-encoding": "gzip"},
+            ) as response:
+                raw = b"".join(response.iter_raw())
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertEqual(response.headers["x-upstream"], "mcp")
+        # Still compressed: the shim forwards upstream bytes without decoding them.
+        self.assertEqual(gzip.decompress(raw), b'{"error": "Could not find session"}')
+
+    def test_sse_is_proxied(self):
+        with TestClient(self.app) as client:
+            response = client.get("/sse")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("session_id=abc", response.text)
+        self.assertEqual(self.upstream.requests[0].url.path, "/sse")
+
+
+class InProcessShimTests(unittest.TestCase):
+    def _serve(self, app) -> str:
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        server = uvicorn.Server(
+            uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+        )
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+
+        def stop() -> None:
+            server.should_exit = True
+            thread.join(timeout=10)
+
+        self.addCleanup(stop)
+        deadline = time.monotonic() + 10
+        while not server.started:
+            self.assertLess(time.monotonic(), deadline, "shim did not start")
+            time.sleep(0.01)
+        return f"http://127.0.0.1:{port}"
+
+    def test_mcp_session_runs_against_the_shim_without_upstream(self):
+        app = build_openwebui_shim(mcp_app=MCP_SERVER.sse_app())
+        base_url = self._serve(app)
+
+        async def session() -> tuple[list[str], bool]:
+            async with sse_client(f"{base_url}/sse") as (read, write):
+                async with ClientSession(read, write) as client:
+                    await client.initialize()
+                    tools = await client.list_tools()
+                    result = await client.call_tool("get_invoice_template", {"language": "en"})
+                    return [tool.name for tool in tools.tools], result.isError
+
+        names, is_error = asyncio.run(asyncio.wait_for(session(), timeout=30))
+
+        self.assertIn("get_invoice_template", names)
+        self.assertFalse(is_error)
+        self.assertFalse(hasattr(app.state, "upstream"))
+        with httpx.Client(base_url=base_url) as client:
+            self.assertEqual(client.get("/openapi.json").json()["x-openwebui-mcp"]["sse_url"], "/sse")
+
+    def test_requires_exactly_one_of_upstream_or_mcp_app(self):
+        with self.assertRaises(ValueError):
+            build_openwebui_shim()
+        with self.assertRaises(ValueError):
+            build_openwebui_shim("http://mcp.test", mcp_app=MCP_SERVER.sse_app())
+
+    def test_cli_in_process_serves_one_app_without_sse_thread(self):
+        args = cli.build_parser().parse_args(["--in-process", "--shim-port", "65000"])
+        app = object()
+        start_sse = mock.Mock()
+
+        with mock.patch.object(cli.uvicorn, "run") as uvicorn_run, mock.patch.object(
+            socket.socket, "bind"
+        ):
+            cli.run(
+                args,
+                logger=logging.getLogger("bridge.cli"),
+                start_sse=start_sse,
+                run_stdio=mock.Mock(),
+                shim_factory=mock.Mock(side_effect=AssertionError("proxy mode used")),
+                inprocess_shim_factory=lambda: app,
+            )
+
+        start_sse.assert_not_called()
+        uvicorn_run.assert_called_once_with(app, host="127.0.0.1", port=65000)
+
+
+if __name__ == "__main__":
+    unittest.main()
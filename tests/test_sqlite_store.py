@@ -0,0 +1,135 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from datetime import date
+from pathlib import Path
+from unittest.mock import patch
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from bridge.backends.invoices import get_invoice, list_invoices_impl
+from bridge.backends.invoices_models import Party
+from bridge.backends.invoices_sqlite import SqliteInvoiceStore, migrate_to_sqlite
+from bridge.backends.invoices_storage import save_invoice
+from bridge.backends.invoices_store import FilesystemInvoiceStore, get_store
+from tests.helpers import make_invoice
+
+
+class SqliteStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+
+        self.invoice_root = Path(self.tempdir.name) / ".mad_invoice"
+        self.invoice_root.mkdir(parents=True, exist_ok=True)
+
+        self.env_patch = patch.dict(
+            os.environ,
+            {"MAD_INVOICE_ROOT": str(self.invoice_root), "MAD_INVOICE_STORAGE": "sqlite"},
+        )
+        self.env_patch.start()
+        self.addCleanup(self.env_patch.stop)
+
+    def test_engine_selected_by_env_var(self):
+        self.assertIsInstance(get_store(), SqliteInvoiceStore)
+        with patch.dict(os.environ, {"MAD_INVOICE_STORAGE": "json"}):
+            self.assertIsInstance(get_store(), FilesystemInvoiceStore)
+        with patch.dict(os.environ, {"MAD_INVOICE_STORAGE": "bogus"}):
+            with self.assertRaises(ValueError):
+                get_store()
+
+    def test_save_load_and_delete_roundtrip(self):
+        store = SqliteInvoiceStore()
+        invoice = make_invoice("2024-0001")
+        store.save_invoice(invoice)
+
+        self.assertTrue(store.invoice_exists("2024-0001"))
+        self.assertEqual(get_invoice("2024-0001"), invoice)
+
+        store.save_invoice(invoice.model_copy(update={"payment_status": "paid"}))
+        self.assertEqual(store.index_payload()["invoices"][0]["payment_status"], "paid")
+
+        store.delete_invoice("2024-0001")
+        self.assertFalse(store.invoice_exists("2024-0001"))
+        with self.assertRaises(FileNotFoundError):
+            store.load_invoice("2024-0001")
+
+    def test_list_invoices_uses_sql_query(self):
+        store = SqliteInvoiceStore()
+        store.save_invoice(make_invoice("2024-0001", invoice_date=date(2024, 1, 10)))
+        store.save_invoice(
+            make_invoice(
+                "2024-0002",
+                invoice_date=date(2024, 2, 10),
+                customer=Party(name="Acme Corp", street="S", postal_code="1", city="C"),
+            )
+        )
+        store.save_invoice(
+            make_invoice("2024-0003", invoice_date=date(2024, 3, 10), payment_status="paid")
+        )
+
+        response = list_invoices_impl(limit=2)
+        self.assertEqual(
+            [entry["id"] for entry in response["invoices"]], ["2024-0003", "2024-0002"]
+        )
+        self.assertTrue(response["has_more"])
+        self.assertEqual(response["total_count"], 3)
+
+        everything = store.query_index(limit=None)
+        self.assertEqual(len(everything.entries), 3)
+        self.assertEqual(everything.total_count, 3)
+        self.assertFalse(everything.has_more)
+
+        response = list_invoices_impl(customer_query="ACME", payment_status="open")
+        self.assertEqual([entry["id"] for entry in response["invoices"]], ["2024-0002"])
+
+        response = list_invoices_impl(
+            invoice_date_from="2024-02-01", sort_by="total", direction="asc"
+        )
+        self.assertEqual(
+            [entry["id"] for entry in response["invoices"]], ["2024-0002", "2024-0003"]
+        )
+
+    def test_cursor_pagination_uses_keyset(self):
+        store = SqliteInvoiceStore()
+        for number in range(1, 6):
+            store.save_invoice(make_invoice(f"2024-{number:04d}"))
+
+        seen: list[str] = []
+        cursor = None
+        while True:
+            response = list_invoices_impl(limit=2, cursor=cursor)
+            seen.extend(entry["id"] for entry in response["invoices"])
+            cursor = response["next_cursor"]
+            if cursor is None:
+                break
+
+        self.assertEqual(seen, [f"2024-{number:04d}" for number in range(5, 0, -1)])
+
+    def test_sequence_is_per_year(self):
+        store = SqliteInvoiceStore()
+        self.assertEqual(store.next_invoice_number(year=2024), "2024-0001")
+        self.assertEqual(store.next_invoice_number(year=2024), "2024-0002")
+        self.assertEqual(store.next_invoice_number(year=2025, separator=None), "20250001")
+
+    def test_migrate_from_json_tree(self):
+        save_invoice(make_invoice("2024-0001"))
+        save_invoice(make_invoice("2024-0002"))
+        (self.invoice_root / "sequence.json").write_text(
+            json.dumps({"counters": {"2024": 2}}), encoding="utf-8"
+        )
+
+        result = migrate_to_sqlite()
+
+        self.assertEqual(result["invoices"], 2)
+        store = SqliteInvoiceStore()
+        self.assertEqual(store.index_payload()["count"], 2)
+        self.assertEqual(store.next_invoice_number(year=2024), "2024-0003")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+import unittest.mock
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+os.environ.setdefault("MCP_ENABLE_WRITES", "1")
+
+from mcp.server.fastmcp import FastMCP
+
+from bridge.backends import invoices
+from bridge.backends.invoices_store import get_store
+from bridge.backends.invoices_tool_limits import get_tool_limits, reset_tool_limits
+from tests.helpers import make_invoice
+
+
+class ToolConcurrencyTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        env_patch = unittest.mock.patch.dict(
+            os.environ,
+            {
+                "MAD_INVOICE_ROOT": str(Path(self.tempdir.name) / ".mad_invoice"),
+                "MAD_INVOICE_RENDER_CONCURRENCY": "1",
+            },
+        )
+        env_patch.start()
+        self.addCleanup(env_patch.stop)
+        reset_tool_limits()
+        self.addCleanup(reset_tool_limits)
+        get_store().save_invoice(make_invoice("2024-0001"))
+
+        self.server = FastMCP("test")
+        invoices.register(self.server)
+
+    async def test_reads_do_not_queue_behind_renders(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def blocking_render(invoice_id, background=False):
+            started.set()
+            release.wait(5)
+            return {"invoice_id": invoice_id}
+
+        with unittest.mock.patch.object(invoices, "render_invoice_pdf_impl", blocking_render):
+            first = asyncio.create_task(
+                self.server.call_tool("render_invoice_pdf", {"invoice_id": "2024-0001"})
+            )
+            second = asyncio.create_task(
+                self.server.call_tool("render_invoice_pdf", {"invoice_id": "2024-0001"})
+            )
+            while not started.is_set():
+                await asyncio.sleep(0.005)
+            await asyncio.sleep(0.05)
+
+            listing = await asyncio.wait_for(self.server.call_tool("list_invoices", {}), timeout=2)
+            invoice = await asyncio.wait_for(
+                self.server.call_tool("get_invoice", {"invoice_id": "2024-0001"}), timeout=2
+            )
+
+            stats = get_tool_limits().stats()
+            self.assertEqual(stats["render"], {"limit": 1, "running": 1, "waiting": 1})
+            self.assertFalse(first.done() or second.done())
+            release.set()
+            await asyncio.wait_for(asyncio.gather(first, second), timeout=5)
+
+        self.assertEqual(json.loads(listing[0].text)["total_count"], 1)
+        self.assertEqual(json.loads(invoice[0].text)["id"], "2024-0001")
+        self.assertEqual(get_tool_limits().stats()["read"]["running"], 0)
+
+    def test_limits_come_from_the_environment_with_defaults_for_bad_values(self):
+        reset_tool_limits()
+        with unittest.mock.patch.dict(
+            os.environ, {"MAD_INVOICE_READ_CONCURRENCY": "0", "MAD_INVOICE_WRITE_CONCURRENCY": "x"}
+        ):
+            limits = get_tool_limits().limits
+        self.assertEqual(limits, {"read": 8, "write": 2, "render": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+import unittest.mock
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+os.environ.setdefault("MCP_ENABLE_WRITES", "1")
+
+import httpx
+from starlette.applications import Starlette
+
+import bridge.web
+from bridge.backends.invoices_storage import save_invoice
+from bridge.backends.invoices_store import FilesystemInvoiceStore
+from bridge.web import register_routes
+from tests.helpers import make_invoice
+
+
+class WebEventLoopTests(unittest.IsolatedAsyncioTestCase):
+    """A blocking render or status update must not stall other requests."""
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        env_patch = unittest.mock.patch.dict(
+            os.environ, {"MAD_INVOICE_ROOT": str(Path(self.tempdir.name) / ".mad_invoice")}
+        )
+        env_patch.start()
+        self.addCleanup(env_patch.stop)
+        writes_patch = unittest.mock.patch.object(bridge.web, "ENABLE_WRITES", True)
+        writes_patch.start()
+        self.addCleanup(writes_patch.stop)
+        save_invoice(make_invoice("2024-0001"))
+
+    async def test_overview_stays_responsive_while_a_handler_blocks(self):
+        app = Starlette()
+        register_routes(app)
+        transport = httpx.ASGITransport(app=app)
+
+        for path, target in (
+            ("/invoices/2024-0001/mark-paid", "update_invoice_status_impl"),
+            ("/invoices/2024-0001/render", "render_invoice_pdf_impl"),
+        ):
+            with self.subTest(path=path):
+                started = threading.Event()
+                release = threading.Event()
+
+                def blocking(*_args, **_kwargs):
+                    # Stands in for pdflatex or a locked index rebuild.
+                    started.set()
+                    release.wait(5)
+                    return {"job_id": "job"}
+
+                with unittest.mock.patch.object(bridge.web, target, blocking):
+                    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                        slow = asyncio.create_task(client.post(path))
+                        while not started.is_set():
+                            await asyncio.sleep(0.005)
+
+                        before = time.perf_counter()
+                        await asyncio.sleep(0.01)
+                        loop_lag = time.perf_counter() - before - 0.01
+                        overview = await asyncio.wait_for(client.get("/invoices"), timeout=2)
+
+                        self.assertEqual(overview.status_code, 200)
+                        self.assertLess(loop_lag, 0.5)
+                        self.assertFalse(slow.done())
+                        release.set()
+                        self.assertEqual((await slow).status_code, 303)
+
+
+    async def test_overview_rows_do_not_depend_on_a_separate_count(self):
+        store = FilesystemInvoiceStore()
+        for invoice_id in ("2024-0001", "2024-0002", "2024-0003"):
+            store.save_invoice(make_invoice(invoice_id))
+        app = Starlette()
+        register_routes(app)
+        transport = httpx.ASGITransport(app=app)
+
+        # A count taken before the last saves landed must not cut the listing short.
+        with unittest.mock.patch.object(FilesystemInvoiceStore, "invoice_count", return_value=1):
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                for query in ("", "?payment_status=open"):
+                    with self.subTest(query=query):
+                        page = (await client.get(f"/invoices{query}")).text
+                        for invoice_id in ("2024-0001", "2024-0002", "2024-0003"):
+                            self.assertIn(f"/invoices/{invoice_id}", page)
+
+
+if __name__ == "__main__":
+    unittest.main()